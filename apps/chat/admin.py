@@ -16,6 +16,16 @@ class ThreadAdmin(admin.ModelAdmin):  # type: ignore
 
     inlines = [ThreadInline]
     list_filter = ["created"]
+    list_display = ["id", "created", "last_message_at", "message_count"]
+    readonly_fields = [
+        "min_user",
+        "max_user",
+        "last_message",
+        "last_message_at",
+        "message_count",
+        "version",
+        "versioned_at",
+    ]
 
 
 @admin.register(Message)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from drf_spectacular.utils import OpenApiExample, inline_serializer
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, OpenApiResponse, inline_serializer
 
 from apps.chat.api.serializers import CreateThreadSerializer, ThreadSerializer, CreateMessageSerializer, \
-    MessageSerializer
+    MessageSerializer, ReadThreadSerializer, InboxSerializer, SearchMessageSerializer, BroadcastSerializer
 from apps.utils import SwaggerWrapper
 
 
@@ -72,6 +73,51 @@ class CreateThreadSwagger(SwaggerWrapper):
         ),
     ]
 
+class BroadcastSwagger(SwaggerWrapper):
+    """Broadcast Documentation"""
+
+    summary = "Broadcast message"
+    description = (
+        "Send one message to direct threads of the admin with every recipient, "
+        "missing threads are created. Available to staff users only."
+    )
+    tags = ["Chat"]
+
+    responses = {
+        "201": BroadcastSerializer(),
+        "400": BroadcastSerializer(),
+        "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
+        "403": inline_serializer(name="Permission Error", fields={'detail': serializers.CharField()}),
+    }
+    request = BroadcastSerializer()
+
+    examples = [
+        OpenApiExample(
+            name="Success",
+            value={"recipients": [2, 3, 4], "text": "Maintenance tonight at 23:00"},
+            summary="Example",
+            description="Success example",
+            request_only=True,
+        ),
+        OpenApiExample(
+            name="Success",
+            summary="Example",
+            description="Success example",
+            value={"messages": 3, "created_threads": 1},
+            response_only=True,
+            status_codes=["201"]
+        ),
+        OpenApiExample(
+            name="Validation Error",
+            value={"recipients": ["Users do not exist: 10"]},
+            summary="Validation error",
+            description="Errors",
+            response_only=True,
+            status_codes=["400"]
+        ),
+    ]
+
+
 class DeleteThreadSwagger(SwaggerWrapper):
     """Delete Thread Documentation"""
 
@@ -128,11 +174,16 @@ class ListThreadByUserSwagger(SwaggerWrapper):
     """List thread by user"""
 
     summary = "List thread by user"
-    description = "List thread by user"
+    description = (
+        "List thread by user. "
+        "Send the `ETag` of a previous response in `If-None-Match` to receive `304 Not Modified` "
+        "while the thread list of the user is unchanged."
+    )
     tags = ["Chat"]
 
     responses = {
         "200": ThreadSerializer(),
+        "304": OpenApiResponse(description="Thread list is not modified"),
         "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
 
     }
@@ -240,11 +291,40 @@ class CreateMessageForThreadSwagger(SwaggerWrapper):
 class GetMessageForThreadSwagger(SwaggerWrapper):
     """Create message for thread swagger"""
     summary = "Get message for thread"
-    description = "Get message for thread by user"
+    description = (
+        "Get message for thread by user. "
+        "Pass `cursor` (empty for the first page) to switch to keyset pagination "
+        "and follow `next` links to scroll back through the history. "
+        "Pass `after` to receive only messages newer than the given one in ascending order, "
+        "with `wait` the request is held until such a message appears or the timeout elapses. "
+        "Send the `ETag` of a previous page in `If-None-Match` to receive `304 Not Modified` "
+        "while messages of the thread are unchanged."
+    )
     tags = ["Chat"]
+    parameters = [
+        OpenApiParameter(
+            name="cursor",
+            type=str,
+            required=False,
+            description="Opaque position returned in `next`; empty value requests the newest page",
+        ),
+        OpenApiParameter(
+            name="after",
+            type=int,
+            required=False,
+            description="Return messages with id greater than this one",
+        ),
+        OpenApiParameter(
+            name="wait",
+            type=int,
+            required=False,
+            description="Seconds to wait for a new message when used with `after`, up to 30",
+        ),
+    ]
 
     responses = {
         "200": MessageSerializer(),
+        "304": OpenApiResponse(description="Messages are not modified"),
         "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
         "403": inline_serializer(name="Permission Error", fields={'detail': serializers.CharField()}),
         "404": inline_serializer(name="Not found", fields={'detail': serializers.CharField()})
@@ -282,6 +362,28 @@ class GetMessageForThreadSwagger(SwaggerWrapper):
             response_only=True,
             status_codes=["200"]
         ),
+        OpenApiExample(
+            name="Cursor",
+            summary="Cursor example",
+            description="Success example with `cursor` parameter",
+            value={
+                "next": (
+                    "http://localhost:8080/api/v1/chat/thread/1/message/"
+                    "?cursor=MjAyNC0wNC0wNVQxMDoxODozMi41NjIzMTUrMDA6MDB8MTQ"
+                ),
+                "results": [
+                    {
+                        "id": 15,
+                        "sender": "John Smith",
+                        "text": "Test Message",
+                        "created": "2024-04-05T13:18:33.198295+03:00",
+                        "is_read": False
+                    },
+                ]
+            },
+            response_only=True,
+            status_codes=["200"]
+        ),
         OpenApiExample(
             name="Authentication error",
             value={"detail": "No active account found with the given credentials"},
@@ -312,7 +414,7 @@ class GetMessageForThreadSwagger(SwaggerWrapper):
 class ReadMessageSwagger(SwaggerWrapper):
     """Read message for thread swagger"""
     summary = "Read message"
-    description = "Read message"
+    description = "Mark the message and every earlier message of the thread as read"
     tags = ["Chat"]
 
     responses = {
@@ -360,6 +462,121 @@ class ReadMessageSwagger(SwaggerWrapper):
     ]
 
 
+class ExportThreadSwagger(SwaggerWrapper):
+    """Export thread"""
+
+    summary = "Export thread"
+    description = (
+        "Stream every message of the thread, oldest first, including archived ones. "
+        "`format=ndjson` (default) returns one JSON object per line, `format=csv` a CSV file with header. "
+        "Dates are formatted like in the other endpoints, CSV text starting with `=`, `+`, `-` or `@` "
+        "is prefixed with `'`."
+    )
+    tags = ["Chat"]
+    parameters = [
+        OpenApiParameter(name="format", type=str, enum=["ndjson", "csv"], required=False, description="Export format"),
+    ]
+
+    responses = {
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+        (200, "text/csv"): OpenApiTypes.STR,
+        "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
+        "403": inline_serializer(name="Permission Error", fields={'detail': serializers.CharField()}),
+        "404": inline_serializer(name="Not found", fields={'detail': serializers.CharField()}),
+    }
+
+    request = None
+
+    examples = [
+        OpenApiExample(
+            name="NDJSON",
+            summary="NDJSON line",
+            description="One message",
+            value={
+                "id": 15,
+                "sender_id": 2,
+                "sender": "John Smith",
+                "text": "Test Message",
+                "created": "2024-04-05T13:18:33.198295+03:00",
+                "is_read": True
+            },
+            response_only=True,
+            status_codes=["200"]
+        ),
+    ]
+
+
+class ReadThreadSwagger(SwaggerWrapper):
+    """Read thread swagger"""
+    summary = "Read thread"
+    description = "Mark thread as read up to the message, the latest message by default"
+    tags = ["Chat"]
+
+    responses = {
+        "200": ReadThreadSerializer(),
+        "400": ReadThreadSerializer(),
+        "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
+        "403": inline_serializer(name="Permission Error", fields={'detail': serializers.CharField()}),
+        "404": inline_serializer(name="Not found", fields={'detail': serializers.CharField()})
+    }
+
+    request = ReadThreadSerializer
+
+    examples = [
+        OpenApiExample(
+            name="Success",
+            summary="Example",
+            description="Success request example",
+            value={"message": 15},
+            request_only=True,
+        ),
+        OpenApiExample(
+            name="Success",
+            summary="Example",
+            description="Success example",
+            value={
+                "last_read_message_id": 15,
+                "last_read_at": "2024-04-05T13:20:01.120315+03:00",
+                "unread_count": 0
+            },
+            response_only=True,
+            status_codes=["200"]
+        ),
+        OpenApiExample(
+            name="Validation Error",
+            value={"message": ["Message does not belong to the thread."]},
+            summary="Validation error",
+            description="Errors",
+            response_only=True,
+            status_codes=["400"]
+        ),
+        OpenApiExample(
+            name="Authentication error",
+            value={"detail": "No active account found with the given credentials"},
+            summary="Authentication error",
+            description="This error occurs in cases when any input data doesn't meet existing ones in DB.",
+            response_only=True,
+            status_codes=["401"]
+        ),
+        OpenApiExample(
+            name="Permission Denied",
+            value={"detail": "You do not have permission to perform this action."},
+            summary="Permission Denied",
+            description="You do not have permission to perform this action.",
+            response_only=True,
+            status_codes=["403"]
+        ),
+        OpenApiExample(
+            name="Not found",
+            value={"detail": "No Thread matches the given query."},
+            summary="Not found",
+            description="Not found",
+            response_only=True,
+            status_codes=["404"]
+        )
+    ]
+
+
 class GetCountUnReadMessageSwagger(SwaggerWrapper):
     """Get count of unread message for user """
     summary = "Count unread messsage"
@@ -392,3 +609,112 @@ class GetCountUnReadMessageSwagger(SwaggerWrapper):
             status_codes=["401"]
         ),
     ]
+
+
+class InboxSwagger(SwaggerWrapper):
+    """Inbox of user"""
+
+    summary = "Inbox"
+    description = "Threads of user ordered by last activity with last message preview and unread count"
+    tags = ["Chat"]
+
+    responses = {
+        "200": InboxSerializer(many=True),
+        "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
+    }
+
+    request = None
+
+    examples = [
+        OpenApiExample(
+            name="Success",
+            summary="Example",
+            description="Success example",
+            value={
+                "count": 1,
+                "next": None,
+                "previous": None,
+                "results": [
+                    {
+                        "id": 1,
+                        "participant": 2,
+                        "participant_name": "John Doe",
+                        "last_message": {
+                            "id": 15,
+                            "sender": 2,
+                            "text": "Hello",
+                            "created": "2024-04-04T13:35:30+03:00"
+                        },
+                        "last_activity": "2024-04-04T13:35:30+03:00",
+                        "unread_count": 3
+                    }
+                ]
+            },
+            response_only=True,
+            status_codes=["200"]
+        ),
+        OpenApiExample(
+            name="Authentication error",
+            value={"detail": "No active account found with the given credentials"},
+            summary="Authentication error",
+            description="This error occurs in cases when any input data doesn't meet existing ones in DB.",
+            response_only=True,
+            status_codes=["401"]
+        ),
+    ]
+
+
+class SearchMessageSwagger(SwaggerWrapper):
+    """Search messages"""
+
+    summary = "Search messages"
+    description = (
+        "Full-text search over messages of threads the user participates in. "
+        "Results are ordered by relevance, follow `next` links for further pages."
+    )
+    tags = ["Chat"]
+    parameters = [
+        OpenApiParameter(name="q", type=str, required=True, description="Words to search for"),
+        OpenApiParameter(name="cursor", type=str, required=False, description="Opaque position returned in `next`"),
+        OpenApiParameter(name="limit", type=int, required=False, description="Page size, up to 100"),
+    ]
+
+    responses = {
+        "200": SearchMessageSerializer(many=True),
+        "400": inline_serializer(name="Validation Error", fields={'q': serializers.ListField()}),
+        "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
+        "404": inline_serializer(name="Not found", fields={'detail': serializers.CharField()}),
+    }
+
+    request = None
+
+    examples = [
+        OpenApiExample(
+            name="Success",
+            summary="Example",
+            description="Success example",
+            value={
+                "next": "http://localhost:8080/api/v1/chat/search/?q=hello&cursor=LTEuNXwxNA%3D%3D",
+                "results": [
+                    {
+                        "id": 15,
+                        "thread": 1,
+                        "sender": "John Smith",
+                        "text": "Hello there",
+                        "created": "2024-04-05T13:18:33.198295+03:00",
+                        "is_read": False
+                    }
+                ]
+            },
+            response_only=True,
+            status_codes=["200"]
+        ),
+        OpenApiExample(
+            name="Validation error",
+            value={"q": ["This field is required."]},
+            summary="Validation error",
+            description="Missing search query",
+            response_only=True,
+            status_codes=["400"]
+        ),
+    ]
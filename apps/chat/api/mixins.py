@@ -0,0 +1,110 @@
+from typing import Any, Optional
+
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from apps.chat.api.serializers import MessageRowSerializer
+from apps.chat.models import Thread
+from apps.chat.services.message import MessageService
+from apps.chat.services.response_cache import ResponseCacheService
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET of API views
+
+    The view computes the ETag from version stamps before running its queries
+    and returns `not_modified()` when the client copy is current, the ETag
+    is added to the successful response. No `Last-Modified` is sent, its whole
+    seconds cannot tell versions of the same second apart.
+    """
+
+    cache_control = "private, no-cache"
+
+    def not_modified(self, etag: str) -> Optional[HttpResponse]:
+        """
+        Get 304 Not Modified response when the client copy is current
+
+        Args:
+            etag: str, quoted entity tag
+        Return:
+            HttpResponseNotModified or None
+        """
+        self.etag = etag
+        return get_conditional_response(self.request, etag=etag)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Add ETag to successful and not modified responses"""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "etag", None) and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            response["Cache-Control"] = self.cache_control
+        return response
+
+
+class CachedResponseMixin:
+    """
+    Response cache of API views
+
+    The view looks up `get_cached_response()` with the version of the resource
+    after permission checks and stores the fresh response with `cache_response()`,
+    `X-Cache` tells whether the response came from the cache.
+    """
+
+    def get_cached_response(self, version: str) -> Optional[Response]:
+        """
+        Get response from cache
+
+        Args:
+            version: str, unique version of the resource
+        Return:
+            Response or None on miss
+        """
+        self.cache_key = ResponseCacheService.get_key(version, self.request.build_absolute_uri())
+        data = ResponseCacheService.get(self.cache_key)
+        self.cache_status = "MISS" if data is None else "HIT"
+        return None if data is None else Response(data)
+
+    def cache_response(self, response: Response) -> Response:
+        """Store successful response in cache"""
+        if getattr(self, "cache_key", None) and response.status_code == 200:
+            ResponseCacheService.set(self.cache_key, response.data)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Add cache status header"""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "cache_status", None):
+            response["X-Cache"] = self.cache_status
+        return response
+
+
+class MessageRowsMixin:
+    """
+    Message reads of API views
+
+    With `row_serializer_class` messages are read as rows and serialized without
+    model instances, `None` selects model instances and the `serializer_class`.
+    """
+
+    row_serializer_class = MessageRowSerializer
+
+    def get_messages(self, thread: Thread) -> QuerySet:
+        """Get messages of thread"""
+        if self.row_serializer_class is not None:
+            return MessageService.get_thread_message_rows(thread)
+        return MessageService.get_thread_messages(thread)
+
+    def get_archived_messages(self, thread: Thread) -> QuerySet:
+        """Get archived messages of thread"""
+        if self.row_serializer_class is not None:
+            return MessageService.get_archived_thread_message_rows(thread)
+        return MessageService.get_archived_thread_messages(thread)
+
+    def serialize(self, messages) -> Any:
+        """Serialize messages"""
+        if self.row_serializer_class is not None:
+            return self.row_serializer_class(messages, many=True).data
+        return self.get_serializer(messages, many=True).data
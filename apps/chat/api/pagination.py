@@ -0,0 +1,214 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from django.db.models import BooleanField, Q, QuerySet, Value
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from apps.utils import decode_uid, encode_uid
+
+if TYPE_CHECKING:
+    from apps.chat.services.search import MessageSearch
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    Keyset pagination for thread messages
+
+    Pages are ordered by `(created, id)` descending and the cursor is the opaque
+    position of the last row of the previous page, so every page is a single
+    index range scan on `(thread_id, created DESC, id DESC)` without OFFSET or COUNT.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    ordering = ("-created", "-id")
+    invalid_cursor_message = _("Invalid cursor")
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Any]:
+        """
+        Return one page of rows after the requested cursor
+
+        When the view has `archive_queryset`, the page is merged from both
+        tables, so scrolling continues into archived history.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        rows = self.get_rows(queryset, position)
+        archive_queryset = getattr(view, "archive_queryset", None)
+        if archive_queryset is not None:
+            rows += self.get_rows(archive_queryset, position)
+            rows.sort(key=lambda row: (row.created, row.id), reverse=True)
+            rows = rows[: self.page_size + 1]
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_rows(self, queryset: QuerySet, position: Optional[Tuple[datetime, int]]) -> List[Any]:
+        """Fetch at most one row more than the page size after position"""
+        if position is not None:
+            created, pk = position
+            queryset = queryset.filter(Q(created__lt=created) | Q(created=created, id__lt=pk))
+        return list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+
+    def get_paginated_response(self, data) -> Response:
+        """Get paginated response"""
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        """Get paginated response schema"""
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request) -> int:
+        """Get page size from the `limit` query parameter"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        """Get link to the next (older) page"""
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(last.created, last.id))
+
+    @staticmethod
+    def encode_cursor(created: datetime, pk: int) -> str:
+        """
+        Encode position
+
+        Args:
+            created: datetime
+            pk: int
+        Return:
+            cursor: str
+        """
+        return encode_uid("%s|%s" % (created.isoformat(), pk))
+
+    def decode_cursor(self, request) -> Optional[Tuple[datetime, int]]:
+        """
+        Decode position from request
+
+        Return:
+            position: Tuple[datetime, int] or None for the first page
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            created, pk = decode_uid(cursor).split("|")
+            return datetime.fromisoformat(created), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+
+class MessageLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination for thread messages
+
+    When the view has `archive_queryset`, `count` covers both tables and pages
+    continue into archived history like cursors do, so archiving changes neither.
+    Threads without archived messages are paginated by the hot table alone,
+    otherwise the page window is cut by the database from the union of both tables.
+    """
+
+    ordering = MessageCursorPagination.ordering
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> Optional[List[Any]]:
+        """Return the page at the requested offset of both tables"""
+        archive_queryset = getattr(view, "archive_queryset", None)
+        archive_count = self.get_count(archive_queryset) if archive_queryset is not None else 0
+        if not archive_count:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = self.get_count(queryset) + archive_count
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.offset > self.count:
+            return []
+        start, stop = self.offset, self.offset + self.limit
+        keys = list(
+            self.get_keys(queryset, False)
+            .union(self.get_keys(archive_queryset, True), all=True)
+            .order_by(*self.ordering)[start:stop]
+        )
+        rows = {}
+        for in_archive, source in ((False, queryset), (True, archive_queryset)):
+            ids = [pk for _, pk, key_in_archive in keys if key_in_archive == in_archive]
+            if ids:
+                rows.update(((in_archive, row.id), row) for row in source.filter(id__in=ids))
+        return [rows[in_archive, pk] for _, pk, in_archive in keys if (in_archive, pk) in rows]
+
+    @staticmethod
+    def get_keys(queryset: QuerySet, in_archive: bool) -> QuerySet:
+        """Sort keys of rows tagged with their table, `(created, id, in_archive)`"""
+        return (
+            queryset.order_by()
+            .values_list("created", "id")
+            .annotate(in_archive=Value(in_archive, output_field=BooleanField()))
+        )
+
+
+class SearchCursorPagination(MessageCursorPagination):
+    """
+    Keyset pagination of ranked search results
+
+    The cursor is the `(score, id)` of the last match of the previous page,
+    so deep pages cost the same as the first one.
+    """
+
+    def paginate_queryset(self, queryset: "MessageSearch", request, view=None) -> List[Any]:
+        """Return one page of matches after the requested cursor"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        rows = queryset.fetch(self.decode_cursor(request), self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return [message for _, message in self.page]
+
+    def get_next_link(self) -> Optional[str]:
+        """Get link to the next (worse ranked) page"""
+        if not self.has_next:
+            return None
+        score, message = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_uid("%r|%s" % (score, message.id)))
+
+    def decode_cursor(self, request) -> Optional[Tuple[float, int]]:
+        """
+        Decode position from request
+
+        Return:
+            position: Tuple[float, int] or None for the first page
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            score, pk = decode_uid(cursor).split("|")
+            return float(score), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
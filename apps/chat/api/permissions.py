@@ -1,6 +1,7 @@
 from rest_framework.permissions import BasePermission
 
 from apps.chat.services import ThreadService
+from apps.chat.services.membership import MembershipService
 from apps.chat.services.message import MessageService
 
 
@@ -17,7 +18,7 @@ class IsMessageOfTheadPermission(BasePermission):
 
     def has_object_permission(self, request, view, obj) -> bool:
         """Has object permission"""
-        return ThreadService.is_participant_of_thread(obj.thread, request.user)
+        return MembershipService.is_participant(obj.thread_id, request.user.pk)
 
 
 class IsMessageCannotReadPermission(BasePermission):
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON
+
+    Exports stream their body themselves, the renderer selects the format
+    and renders error responses.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        """Render one line per item"""
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(item, cls=JSONEncoder) + "\n" for item in items).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Comma separated values
+
+    Exports stream their body themselves, the renderer selects the format
+    and renders error responses.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        """Render header of the first item keys and one row per item"""
+        if not data:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(items[0].keys()))
+        writer.writeheader()
+        writer.writerows(items)
+        return buffer.getvalue().encode()
@@ -1,8 +1,14 @@
+from typing import Any, Dict, Optional
+
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from apps.chat.models.archive import ArchivedMessage
 from apps.chat.models.message import Message
-from apps.chat.models.threads import Thread, User
+from apps.chat.models.threads import Thread, ThreadUserRelation, User
 from apps.chat.services import ThreadService
+from apps.chat.services.broadcast import BroadcastService
 from apps.chat.services.message import MessageService
 
 
@@ -24,7 +30,79 @@ class ThreadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Thread
-        fields = "__all__"
+        exclude = [
+            "min_user",
+            "max_user",
+            "last_message",
+            "last_message_at",
+            "message_count",
+            "version",
+            "versioned_at",
+        ]
+
+
+class InboxLastMessageSerializer(serializers.Serializer):
+    """Last message preview of inbox thread"""
+
+    id = serializers.IntegerField(source="last_message_id")
+    sender = serializers.IntegerField(source="last_message_sender_id")
+    text = serializers.CharField(source="last_message_text")
+    created = serializers.DateTimeField(source="last_message_created")
+
+
+class InboxSerializer(serializers.ModelSerializer):
+    """Inbox thread serializer, reads annotations of `ThreadService.get_inbox`"""
+
+    id = serializers.IntegerField(source="thread_id")
+    participant = serializers.IntegerField(source="participant_id", allow_null=True)
+    participant_name = serializers.CharField(allow_null=True)
+    last_message = serializers.SerializerMethodField()
+    last_activity = serializers.DateTimeField()
+
+    class Meta:
+        """Metaclass for InboxSerializer"""
+        model = ThreadUserRelation
+        fields = ["id", "participant", "participant_name", "last_message", "last_activity", "unread_count"]
+
+    @extend_schema_field(InboxLastMessageSerializer(allow_null=True))
+    def get_last_message(self, obj: ThreadUserRelation) -> Optional[Dict[str, Any]]:
+        """
+        Get last message preview
+
+        Return:
+            last_message: dict or None for thread without messages
+        """
+        if obj.last_message_id is None:
+            return None
+        return InboxLastMessageSerializer(obj).data
+
+
+class BroadcastSerializer(serializers.Serializer):
+    """Broadcast message serializer"""
+
+    max_recipients = 10000
+
+    recipients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=max_recipients, write_only=True
+    )
+    text = serializers.CharField(max_length=1000, write_only=True)
+    messages = serializers.IntegerField(read_only=True)
+    created_threads = serializers.IntegerField(read_only=True)
+
+    def validate_recipients(self, value):
+        """Validate recipients exist, with one query"""
+        recipients = set(value)
+        existing = set(User.objects.filter(pk__in=recipients).values_list("pk", flat=True))
+        missing = sorted(recipients - existing)
+        if missing:
+            raise serializers.ValidationError(_("Users do not exist: %s") % ", ".join(map(str, missing[:10])))
+        return sorted(recipients)
+
+    def create(self, validated_data):
+        """Create method"""
+        return BroadcastService.broadcast(
+            validated_data["sender"], validated_data["recipients"], validated_data["text"]
+        )
 
 
 class CreateMessageSerializer(serializers.ModelSerializer):
@@ -59,3 +137,81 @@ class MessageSerializer(serializers.ModelSerializer):
             full_name(str)
         """
         return "%s %s" % (obj.sender.first_name, obj.sender.last_name)
+
+
+class MessageRowSerializer:
+    """
+    Serializer of message rows of `MessageService.get_thread_message_rows`
+
+    Output equals `MessageSerializer` without building `Message` and `User` instances,
+    the sender name comes from the database. Read only, the schema is `MessageSerializer`.
+    """
+
+    created_to_representation = serializers.DateTimeField().to_representation
+
+    def __init__(self, instance, many: bool = False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def to_representation(cls, row) -> Dict[str, Any]:
+        """Serialize one row, archived rows carry compressed text"""
+        text = row.text if isinstance(row.text, str) else ArchivedMessage.decompress(row.text)
+        return {
+            "id": row.id,
+            "sender": row.sender_name,
+            "text": text,
+            "created": cls.created_to_representation(row.created),
+            "is_read": row.is_read,
+        }
+
+    @property
+    def data(self):
+        """Serialized rows"""
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+class SearchMessageSerializer(MessageSerializer):
+    """Search result serializer"""
+
+    class Meta(MessageSerializer.Meta):
+        """Metaclass for SearchMessageSerializer"""
+        fields = ["id", "thread", "sender", "text", "created", "is_read"]
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Query parameters of message search"""
+
+    q = serializers.CharField(max_length=200)
+
+
+class ReadThreadSerializer(serializers.ModelSerializer):
+    """Read thread serializer"""
+
+    message = serializers.IntegerField(write_only=True, required=False, min_value=1)
+
+    class Meta:
+        """Metaclass for ReadThreadSerializer"""
+        model = ThreadUserRelation
+        fields = ["message", "last_read_message_id", "last_read_at", "unread_count"]
+        read_only_fields = ["last_read_message_id", "last_read_at", "unread_count"]
+
+    def create(self, validated_data):
+        """Create method"""
+        thread = validated_data["thread"]
+        message_id = validated_data.get("message")
+        if message_id is not None and not Message.objects.filter(thread=thread, id=message_id).exists():
+            raise serializers.ValidationError({"message": [_("Message does not belong to the thread.")]})
+        return MessageService.read_up_to(thread, validated_data["user"], message_id)
+
+
+class NewMessageQuerySerializer(serializers.Serializer):
+    """Query parameters of waiting for new messages"""
+
+    # Below the 60 s read timeout of reverse proxies, the request ends with an empty result first
+    max_wait = 30
+
+    after = serializers.IntegerField(min_value=0)
+    wait = serializers.IntegerField(min_value=0, max_value=max_wait, default=0)
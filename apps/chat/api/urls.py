@@ -8,8 +8,14 @@ urlpatterns = [
     path("thread/", views.ThreadAPIView.as_view(), name="thread"),
     path("thread/<int:pk>/", views.ThreadDetailAPIView.as_view(), name="thread_detail"),
     path("thread/user/<int:user_id>/", views.ThreadUserAPIView.as_view(), name="thread_user"),
+    path("inbox/", views.InboxAPIView.as_view(), name="inbox"),
+    path("broadcast/", views.BroadcastAPIView.as_view(), name="broadcast"),
 
-    path("thread/<int:pk>/message/", views.ThreadMessageAPIViews.as_view(), name="message"),
+    path("thread/<int:pk>/message/", views.thread_message_view, name="message"),
+    path("thread/<int:pk>/export/", views.ThreadExportAPIView.as_view(), name="thread_export"),
+    path("thread/<int:pk>/read/", views.ReadThreadAPIView.as_view(), name="thread_read"),
     path("message/<int:pk>/read/", views.ReadMessageApiView.as_view(), name="message_read"),
-    path("message/user/unread/", views.UserMessageAPIView.as_view(), name="message_user")
+    path("message/user/unread/", views.UserMessageAPIView.as_view(), name="message_user"),
+    path("search/", views.SearchMessageAPIView.as_view(), name="search"),
+    path("stream/", views.inbox_stream_view, name="stream"),
 ]
@@ -1,33 +1,64 @@
-from django.db.models import QuerySet
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections, transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
 from rest_framework.generics import GenericAPIView, ListAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
 from apps.chat.api.docs import (
+    BroadcastSwagger,
     CreateMessageForThreadSwagger,
     CreateThreadSwagger,
     DeleteThreadSwagger,
+    ExportThreadSwagger,
     GetCountUnReadMessageSwagger,
     GetMessageForThreadSwagger,
+    InboxSwagger,
     ListThreadByUserSwagger,
     ReadMessageSwagger,
+    ReadThreadSwagger,
+    SearchMessageSwagger,
 )
+from apps.chat.api.mixins import CachedResponseMixin, ConditionalGetMixin, MessageRowsMixin
+from apps.chat.api.pagination import MessageCursorPagination, MessageLimitOffsetPagination, SearchCursorPagination
 from apps.chat.api.permissions import (
     IsMessageCannotReadPermission,
     IsMessageOfTheadPermission,
     IsParticipantOfThreadPermission,
 )
+from apps.chat.api.renderers import CSVRenderer, NDJSONRenderer
 from apps.chat.api.serializers import (
+    BroadcastSerializer,
     CreateMessageSerializer,
     CreateThreadSerializer,
+    InboxSerializer,
     MessageSerializer,
+    NewMessageQuerySerializer,
+    ReadThreadSerializer,
+    SearchMessageSerializer,
+    SearchQuerySerializer,
     ThreadSerializer,
 )
 from apps.chat.models import Message, Thread
 from apps.chat.services import ThreadService
+from apps.chat.services.export import ExportService
 from apps.chat.services.message import MessageService
+from apps.chat.services.realtime import RealtimeService
+from apps.chat.services.search import SearchService
+from apps.chat.services.version import VersionService
+from apps.core.api.mixins import NonAtomicRequestsMixin
+from apps.core.db.routers import use_replica
+from apps.users.authentication import get_user_by_request
 
 
 class ThreadAPIView(GenericAPIView):
@@ -53,6 +84,24 @@ class ThreadAPIView(GenericAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK)
 
 
+class BroadcastAPIView(GenericAPIView):
+    """
+    Endpoint for broadcast
+
+    Method post - send one message to direct threads of many users
+    """
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAdminUser]
+
+    @BroadcastSwagger.extend_schema
+    def post(self, request, *args, **kwargs):
+        """Post method"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(sender=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 class ThreadDetailAPIView(GenericAPIView):
     """
     Endpoint for thread detail
@@ -72,8 +121,12 @@ class ThreadDetailAPIView(GenericAPIView):
 
 
 @method_decorator(ListThreadByUserSwagger.extend_schema, name="get")
-class ThreadUserAPIView(ListAPIView):
-    """Receive all thread by user id"""
+class ThreadUserAPIView(NonAtomicRequestsMixin, ConditionalGetMixin, CachedResponseMixin, ListAPIView):
+    """
+    Receive all thread by user id
+
+    Answers 304 while the thread list version is unchanged, responses of the current version are cached.
+    """
     queryset = Thread.objects.all()
     serializer_class = ThreadSerializer
     permission_classes = [IsAuthenticated]
@@ -82,26 +135,54 @@ class ThreadUserAPIView(ListAPIView):
     def get_queryset(self):
         """Get queryset"""
         user_id = self.kwargs.get("user_id")
-        return Thread.objects.filter(participants=user_id)
+        return Thread.objects.filter(participants=user_id).prefetch_related("participants")
+
+    def list(self, request, *args, **kwargs):
+        """List method"""
+        etag = VersionService.get_user_etag(self.kwargs["user_id"])
+        response = self.not_modified(etag) or self.get_cached_response(etag)
+        if response is not None:
+            return response
+        return self.cache_response(super().list(request, *args, **kwargs))
+
+
+@method_decorator(InboxSwagger.extend_schema, name="get")
+class InboxAPIView(NonAtomicRequestsMixin, ListAPIView):
+    """Threads of the authenticated user ordered by last activity"""
+    serializer_class = InboxSerializer
+    permission_classes = [IsAuthenticated]
+    service_class = ThreadService
+
+    def get_queryset(self):
+        """Get queryset"""
+        return self.service_class.get_inbox(self.request.user)
 
 
-class ThreadMessageAPIViews(GenericAPIView):
+class ThreadMessageAPIViews(
+    NonAtomicRequestsMixin, ConditionalGetMixin, CachedResponseMixin, MessageRowsMixin, GenericAPIView
+):
     """
     Thread Message
 
-    post - Create message for thread
-    get - Receive all messsages by thread
+    post - Create message for thread, atomic in `MessageService.create`
+    get - Receive all messsages by thread, 304 while the thread version is unchanged,
+          the first page of every version is cached
     """
     permission_classes = [IsAuthenticated, IsParticipantOfThreadPermission]
+    pagination_class = MessageLimitOffsetPagination
+    cursor_pagination_class = MessageCursorPagination
 
-    def get_queryset(self):
-        """Get queryset"""
-        queryset = Thread.objects.all()
-        if self.request.method == "GET":
-            queryset = queryset.prefetch_related("messages__sender")
-        elif self.request.method == "POST":
-            queryset = queryset.prefetch_related("participants")
-        return queryset
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client sends a `cursor` parameter"""
+        if not hasattr(self, "_paginator"):
+            if self.cursor_pagination_class.cursor_query_param in self.request.query_params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    queryset = Thread.objects.all()
 
     def get_serializer_class(self, *args, **kwargs):
         """Get serializer class"""
@@ -109,6 +190,13 @@ class ThreadMessageAPIViews(GenericAPIView):
             return CreateMessageSerializer
         return MessageSerializer
 
+    def is_first_page(self) -> bool:
+        """Is the newest page requested, polling clients request it over and over"""
+        params = self.request.query_params
+        return not params.get(self.cursor_pagination_class.cursor_query_param) and params.get(
+            LimitOffsetPagination.offset_query_param, "0"
+        ) in ("", "0")
+
     @CreateMessageForThreadSwagger.extend_schema
     def post(self, request, *args, **kwargs):
         """Post method"""
@@ -122,18 +210,165 @@ class ThreadMessageAPIViews(GenericAPIView):
     def get(self, request, *args, **kwargs):
         """Get method"""
         thread = self.get_object()
-        messages = thread.messages.all()
+        etag = VersionService.get_thread_etag(thread)
+        response = self.not_modified(etag)
+        if response is None and self.is_first_page():
+            response = self.get_cached_response(etag)
+        if response is not None:
+            return response
+        messages = self.get_messages(thread)
+        # Keyset and offset pages both continue into the archive
+        self.archive_queryset = self.get_archived_messages(thread)
         page = self.paginate_queryset(messages)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.cache_response(self.get_paginated_response(self.serialize(page)))
+        return self.cache_response(Response(self.serialize(messages)))
 
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+
+class ThreadExportAPIView(NonAtomicRequestsMixin, GenericAPIView):
+    """
+    Export every message of thread
+
+    `format` query parameter selects NDJSON (default) or CSV,
+    the body is streamed while it is read from the database,
+    in bounded chunks of an async iterator under ASGI.
+    """
+    queryset = Thread.objects.all()
+    permission_classes = [IsAuthenticated, IsParticipantOfThreadPermission]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    pagination_class = None
+    service_class = ExportService
+
+    @ExportThreadSwagger.extend_schema
+    def get(self, request, *args, **kwargs):
+        """Get method"""
+        thread = self.get_object()
+        renderer = request.accepted_renderer
+        messages = self.service_class.iter_messages(thread)
+        if renderer.format == CSVRenderer.format:
+            content = self.service_class.to_csv(messages)
+        else:
+            content = self.service_class.to_ndjson(messages)
+        if isinstance(request._request, ASGIRequest):
+            content = self.service_class.aiter_chunks(content)
+        response = StreamingHttpResponse(content, content_type="%s; charset=utf-8" % renderer.media_type)
+        response["Content-Disposition"] = 'attachment; filename="thread-%s.%s"' % (thread.pk, renderer.format)
+        return response
+
+
+class ThreadNewMessageAPIView(NonAtomicRequestsMixin, MessageRowsMixin, GenericAPIView):
+    """
+    Messages of thread created after the given message
+
+    Backend of `thread_message_view` long polling, not routed directly.
+    """
+    queryset = Thread.objects.all()
+    serializer_class = MessageSerializer
+    permission_classes = [IsAuthenticated, IsParticipantOfThreadPermission]
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        """Get method"""
+        query = NewMessageQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        thread = self.get_object()
+        messages = self.get_messages(thread).filter(id__gt=query.validated_data["after"])
+        messages = messages.order_by("id")[: MessageCursorPagination.max_page_size]
+        return Response({"results": self.serialize(messages)})
+
+
+thread_message_api_view = ThreadMessageAPIViews.as_view()
+thread_new_message_api_view = ThreadNewMessageAPIView.as_view()
+
+
+def thread_message_sync_view(request, pk):
+    """Thread messages without waiting, `after` selects messages newer than the given one"""
+    if request.method == "GET" and "after" in request.GET:
+        return thread_new_message_api_view(request, pk=pk)
+    return thread_message_api_view(request, pk=pk)
+
+
+def _release_connections():
+    """Return database connections before parking a request"""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def _receive_message_event(channel_layer, channel: str):
+    """Wait for a new message event, other thread events are skipped"""
+    while True:
+        event = await channel_layer.receive(channel)
+        if event["type"] == "chat.message":
+            return event
+
+
+@csrf_exempt
+@transaction.non_atomic_requests
+async def thread_message_view(request, pk):
+    """
+    Thread messages with long polling
+
+    `GET ?after=<id>&wait=<seconds>` answers immediately when newer messages exist,
+    otherwise parks the request on the channel layer without a worker thread
+    or a database connection until a message is created in the thread
+    or the timeout elapses. Every other request is served by `ThreadMessageAPIViews`.
+    """
+    # Invalid parameters are rejected by the synchronous view, after authentication
+    serializer = NewMessageQuerySerializer(data=request.GET)
+    channel_layer = get_channel_layer()
+    if request.method != "GET" or "after" not in request.GET or not serializer.is_valid() or channel_layer is None:
+        return await sync_to_async(thread_message_sync_view)(request, pk=pk)
+    wait = serializer.validated_data["wait"]
+    if not wait:
+        return await sync_to_async(thread_message_sync_view)(request, pk=pk)
+
+    # Subscribe before the first check, so a message created in between is not missed
+    group = RealtimeService.get_thread_group(pk)
+    channel = await channel_layer.new_channel()
+    await channel_layer.group_add(group, channel)
+    try:
+        response = await sync_to_async(thread_new_message_api_view)(request, pk=pk)
+        if response.status_code != status.HTTP_200_OK or response.data["results"]:
+            return response
+        await sync_to_async(_release_connections)()
+        try:
+            await asyncio.wait_for(_receive_message_event(channel_layer, channel), timeout=wait)
+        except asyncio.TimeoutError:
+            return response
+        # The event is published after the primary commits, a lagging replica may not have the message yet
+        with use_replica(None):
+            return await sync_to_async(thread_new_message_api_view)(request, pk=pk)
+    finally:
+        await channel_layer.group_discard(group, channel)
+
+
+# Keep the endpoint in the API schema, it is documented by the DRF view
+thread_message_view.cls = ThreadMessageAPIViews  # type: ignore[attr-defined]
+thread_message_view.initkwargs = {}  # type: ignore[attr-defined]
+# Used by batch requests, which run sub-requests synchronously
+thread_message_view.sync_view = thread_message_sync_view  # type: ignore[attr-defined]
+
+
+class SearchMessageAPIView(NonAtomicRequestsMixin, GenericAPIView):
+    """Full-text search over messages of the user threads"""
+    serializer_class = SearchMessageSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchCursorPagination
+    service_class = SearchService
+
+    @SearchMessageSwagger.extend_schema
+    def get(self, request, *args, **kwargs):
+        """Get method"""
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        search = self.service_class.search(request.user, query.validated_data["q"])
+        page = self.paginate_queryset(search)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
 
 class ReadMessageApiView(GenericAPIView):
-    """Mark message as read"""
+    """Mark message as read, advances the read watermark of the thread"""
     queryset = Message.objects.select_related("thread").all()
     permission_classes = [IsAuthenticated, IsMessageOfTheadPermission, IsMessageCannotReadPermission]
     service_class = MessageService
@@ -142,25 +377,170 @@ class ReadMessageApiView(GenericAPIView):
     def post(self, request, *args, **kwargs):
         """Post method"""
         instance = self.get_object()
-        self.service_class.read(instance)
+        self.service_class.read(instance, request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UserMessageAPIView(ListAPIView):
+class ReadThreadAPIView(GenericAPIView):
+    """Mark thread as read up to a message"""
+    queryset = Thread.objects.all()
+    serializer_class = ReadThreadSerializer
+    permission_classes = [IsAuthenticated, IsParticipantOfThreadPermission]
+
+    @ReadThreadSwagger.extend_schema
+    def post(self, request, *args, **kwargs):
+        """Post method"""
+        thread = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(thread=thread, user=request.user)
+        return Response(serializer.data)
+
+
+class UserMessageAPIView(NonAtomicRequestsMixin, GenericAPIView):
     """Receive count of unread message for user"""
     permission_classes = [IsAuthenticated]
-    serializer_class = MessageSerializer
-
-    def get_queryset(self) -> QuerySet["Message"]:
-        """Get queryset"""
-        messages = Message.objects.filter(
-            is_read=False,
-            thread__in=Thread.objects.filter(participants=self.request.user).values_list("id", flat=True)
-        ).exclude(sender=self.request.user)
-        return messages
+    service_class = MessageService
 
     @GetCountUnReadMessageSwagger.extend_schema
     def get(self, request, *args, **kwargs):
         """Get method"""
-        queryset = self.get_queryset()
-        return Response({"count": queryset.count()})
+        return Response({"count": self.service_class.get_unread_count(request.user)})
+
+
+class InboxStream:
+    """
+    Server-Sent Events of every thread of the user
+
+    Emits `message`, `read`, `unread` and `thread` events. Only `message` events
+    carry an id, so `Last-Event-ID` of a reconnecting client is the last
+    delivered message and every missed one is replayed, page by page, before live events.
+    """
+
+    keep_alive = 15
+    replay_page_size = 500
+    retry = 3000
+
+    def __init__(self, user, last_event_id: int = 0):
+        self.user = user
+        self.last_message_id = last_event_id
+        self.channel_layer = get_channel_layer()
+        self.groups = [RealtimeService.get_user_group(user.id)]
+
+    @staticmethod
+    def format_event(event: str, data, event_id=None) -> str:
+        """Format Server-Sent Event"""
+        lines = ["event: %s" % event, "data: %s" % json.dumps(data, cls=JSONEncoder, separators=(",", ":"))]
+        if event_id is not None:
+            lines.insert(0, "id: %s" % event_id)
+        return "\n".join(lines) + "\n\n"
+
+    def format_message(self, thread_id: int, message) -> str:
+        """Format message event"""
+        self.last_message_id = message["id"]
+        return self.format_event("message", {"thread": thread_id, "message": message}, message["id"])
+
+    def get_backlog_page(self):
+        """Get next page of missed messages, after the last delivered one"""
+        queryset = MessageService.get_user_messages_after(self.user, self.last_message_id)
+        messages = [
+            (message.thread_id, MessageSerializer(message).data) for message in queryset[: self.replay_page_size]
+        ]
+        _release_connections()
+        return messages
+
+    def get_unread_count(self) -> int:
+        """Get unread counter of the user"""
+        count = MessageService.get_unread_count(self.user)
+        _release_connections()
+        return count
+
+    async def subscribe(self):
+        """Subscribe to user and thread groups"""
+        self.channel = await self.channel_layer.new_channel()
+        for thread_id in await sync_to_async(ThreadService.get_thread_ids)(self.user):
+            self.groups.append(RealtimeService.get_thread_group(thread_id))
+        for group in self.groups:
+            await self.channel_layer.group_add(group, self.channel)
+
+    async def unsubscribe(self):
+        """Unsubscribe from groups"""
+        for group in self.groups:
+            await self.channel_layer.group_discard(group, self.channel)
+
+    async def handle(self, event):
+        """Convert channel layer event to Server-Sent Event"""
+        if event["type"] == "chat.message":
+            if event["message"]["id"] > self.last_message_id:
+                return self.format_message(event["thread"], event["message"])
+        elif event["type"] == "chat.read":
+            return self.format_event(
+                "read",
+                {
+                    "thread": event["thread"],
+                    "user": event["user"],
+                    "last_read_message_id": event["last_read_message_id"],
+                },
+            )
+        elif event["type"] == "chat.unread":
+            return self.format_event("unread", {"count": event["count"]})
+        elif event["type"] == "chat.thread":
+            group = RealtimeService.get_thread_group(event["thread"])
+            if group not in self.groups:
+                self.groups.append(group)
+                await self.channel_layer.group_add(group, self.channel)
+            return self.format_event("thread", {"thread": event["thread"]})
+        return None
+
+    async def __aiter__(self):
+        """Stream events until the client disconnects"""
+        # Subscribe before loading the backlog, so nothing is lost in between
+        await self.subscribe()
+        try:
+            yield "retry: %s\n\n" % self.retry
+            while self.last_message_id:
+                # Formatting a message moves `last_message_id`, so every page starts after the previous one
+                messages = await sync_to_async(self.get_backlog_page)()
+                for thread_id, message in messages:
+                    yield self.format_message(thread_id, message)
+                if len(messages) < self.replay_page_size:
+                    break
+            yield self.format_event("unread", {"count": await sync_to_async(self.get_unread_count)()})
+            while True:
+                try:
+                    event = await asyncio.wait_for(self.channel_layer.receive(self.channel), timeout=self.keep_alive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                chunk = await self.handle(event)
+                if chunk is not None:
+                    yield chunk
+        finally:
+            await self.unsubscribe()
+
+
+@csrf_exempt
+@transaction.non_atomic_requests
+async def inbox_stream_view(request):
+    """
+    Inbox stream of the authenticated user
+
+    Requires the ASGI application, idle streams hold neither a worker
+    nor a database connection. Under WSGI an endless stream would hold
+    a worker, so the endpoint is not implemented there.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": 'Method "%s" not allowed.' % request.method}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Event stream requires the ASGI application."}, status=501)
+    user = await sync_to_async(get_user_by_request)(request)
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    try:
+        last_event_id = max(int(request.headers.get("Last-Event-ID", 0)), 0)
+    except ValueError:
+        last_event_id = 0
+    response = StreamingHttpResponse(InboxStream(user, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -7,3 +7,7 @@ class ChatConfig(AppConfig):
     name = "apps.chat"
     verbose_name = _("Chat")
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        """Connect signal receivers"""
+        from apps.chat import signals  # noqa: F401
@@ -0,0 +1,59 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from apps.chat.services import ThreadService
+from apps.chat.services.realtime import RealtimeService
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Push chat events to the authenticated user
+
+    The connection is subscribed to every thread of the user
+    and to threads created while it is open.
+    """
+
+    unauthorized_code = 4401
+
+    async def connect(self):
+        """Subscribe user to his threads"""
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close(code=self.unauthorized_code)
+            return
+        self.groups = [RealtimeService.get_user_group(user.id)]
+        for thread_id in await database_sync_to_async(ThreadService.get_thread_ids)(user):
+            self.groups.append(RealtimeService.get_thread_group(thread_id))
+        for group in self.groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def receive_json(self, content, **kwargs):
+        """Connection is push only, client messages are ignored"""
+
+    async def chat_message(self, event):
+        """Send new message"""
+        await self.send_json({"type": "message", "thread": event["thread"], "message": event["message"]})
+
+    async def chat_thread(self, event):
+        """Subscribe to a new thread"""
+        group = RealtimeService.get_thread_group(event["thread"])
+        if group not in self.groups:
+            self.groups.append(group)
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.send_json({"type": "thread", "thread": event["thread"]})
+
+    async def chat_read(self, event):
+        """Send read watermark of participant"""
+        await self.send_json(
+            {
+                "type": "read",
+                "thread": event["thread"],
+                "user": event["user"],
+                "last_read_message_id": event["last_read_message_id"],
+            }
+        )
+
+    async def chat_unread(self, event):
+        """Send unread counter"""
+        await self.send_json({"type": "unread", "count": event["count"]})
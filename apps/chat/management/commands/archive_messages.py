@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.chat.services.archive import ArchiveService
+
+
+class Command(BaseCommand):
+    """Move old messages to the compressed archive"""
+
+    help = "Move messages older than the given age to the archive in short batches, safe to interrupt and rerun"
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+            help="Archive messages older than this, CHAT_ARCHIVE_AFTER_DAYS by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Messages moved per transaction")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        archived = batches = 0
+        for count in ArchiveService.archive(cutoff, options["batch_size"]):
+            archived += count
+            batches += 1
+            if options["verbosity"] > 1:
+                self.stdout.write("Archived %s messages" % archived)
+            if options["max_batches"] is not None and batches >= options["max_batches"]:
+                break
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS("Archived %s messages created before %s" % (archived, cutoff)))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.services import ThreadService
+
+
+class Command(BaseCommand):
+    """Backfill denormalized thread activity"""
+
+    help = "Recalculate last message and message count of threads from messages"
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--batch-size", type=int, default=1000, help="Threads updated per statement")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        updated = ThreadService.backfill_activity(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Backfilled activity of %s threads" % updated))
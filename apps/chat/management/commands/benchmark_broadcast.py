@@ -0,0 +1,54 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.chat.services.broadcast import BroadcastService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Benchmark broadcast"""
+
+    help = (
+        "Measure broadcast throughput, first to new direct threads and then to existing ones. "
+        "Creates benchmark users and threads, run it against a dedicated database."
+    )
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--recipients", type=int, default=10000, help="Number of recipients")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        count = options["recipients"]
+        sender, _ = User.objects.get_or_create(username="broadcast-benchmark-sender", defaults={"is_staff": True})
+        User.objects.bulk_create(
+            [User(username="broadcast-benchmark-%s" % index) for index in range(count)], ignore_conflicts=True
+        )
+        recipient_ids = list(
+            User.objects.filter(username__startswith="broadcast-benchmark-")
+            .exclude(pk=sender.pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:count]
+        )
+        for run in range(2):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                result = BroadcastService.broadcast(sender, recipient_ids, "Benchmark broadcast %s" % run)
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "%s recipients, %s new threads: %.2f s, %.0f recipients/s, %s queries"
+                    % (
+                        len(recipient_ids),
+                        result.created_threads,
+                        elapsed,
+                        len(recipient_ids) / elapsed,
+                        len(context.captured_queries),
+                    )
+                )
+            )
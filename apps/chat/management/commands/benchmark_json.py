@@ -0,0 +1,89 @@
+import io
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.chat.api.serializers import MessageSerializer
+from apps.chat.models import Message
+from apps.core.api.parsers import FastJSONParser
+from apps.core.api.renderers import FastJSONRenderer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Benchmark JSON renderers and parsers"""
+
+    help = (
+        "Compare JSONRenderer/JSONParser with FastJSONRenderer/FastJSONParser on a page "
+        "of MessageSerializer output. Messages are built in memory, no database is used."
+    )
+
+    words = ["hello", "привіт", "meeting", "tomorrow", "ok", "👍", "call", "me", "when", "you", "can"]
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--messages", type=int, default=100, help="Messages in the page")
+        parser.add_argument("--repeat", type=int, default=2000, help="Measured calls per implementation")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        data = self.get_page(options["messages"])
+        content = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != content:
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer")
+        if FastJSONParser().parse(io.BytesIO(content)) != JSONParser().parse(io.BytesIO(content)):
+            raise CommandError("FastJSONParser result differs from JSONParser")
+
+        repeat = options["repeat"]
+        results = [
+            ("render", self.measure(lambda: JSONRenderer().render(data), repeat),
+             self.measure(lambda: FastJSONRenderer().render(data), repeat)),
+            ("parse", self.measure(lambda: JSONParser().parse(io.BytesIO(content)), repeat),
+             self.measure(lambda: FastJSONParser().parse(io.BytesIO(content)), repeat)),
+        ]
+        self.stdout.write("Page of %s messages, %s bytes" % (options["messages"], len(content)))
+        for name, stdlib, fast in results:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "%s: json %.1f us, orjson %.1f us, %.1fx faster" % (name, stdlib, fast, stdlib / fast)
+                )
+            )
+
+    def get_page(self, count):
+        """Serialized page of messages, as returned by the message list endpoint"""
+        rng = random.Random(0)
+        senders = [User(id=index, first_name="First%s" % index, last_name="Last%s" % index) for index in range(5)]
+        now = timezone.localtime()
+        messages = [
+            Message(
+                id=index,
+                sender=senders[index % len(senders)],
+                thread_id=1,
+                text=" ".join(rng.choices(self.words, k=rng.randint(3, 30))),
+                created=now - timedelta(seconds=index * 37, microseconds=index),
+                is_read=bool(index % 3),
+            )
+            for index in range(count, 0, -1)
+        ]
+        return {
+            "count": count * 10,
+            "next": "http://example.com/api/v1/chat/thread/1/message/?limit=%s&offset=%s" % (count, count),
+            "previous": None,
+            "results": MessageSerializer(messages, many=True).data,
+        }
+
+    @staticmethod
+    def measure(func, repeat):
+        """Mean duration of one call in microseconds"""
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat * 1_000_000
@@ -0,0 +1,96 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+from django.urls import path
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+from apps.core.middleware import APIExemptMiddlewareMixin
+
+
+@csrf_exempt
+def ping_view(request):
+    """Constant response, like DRF views API views are CSRF exempt"""
+    return JsonResponse({"status": "ok"})
+
+
+class BenchmarkURLConf:
+    """URLs of the benchmark, the view is the same for API and admin paths"""
+
+    urlpatterns = [
+        path("api/v1/ping/", ping_view),
+        path("%sping/" % settings.ADMIN_URL, ping_view),
+    ]
+
+
+class Command(BaseCommand):
+    """Benchmark middleware overhead"""
+
+    help = (
+        "Compare per-request overhead of the Django middleware stack with the stack skipping "
+        "browser middleware for the API. Requests go through the real handler to a constant view, "
+        "no database is used."
+    )
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--repeat", type=int, default=1000, help="Requests per round")
+        parser.add_argument("--rounds", type=int, default=5, help="Alternating rounds, the fastest one counts")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        handlers = [self.get_handler(self.get_full_middleware()), self.get_handler(settings.MIDDLEWARE)]
+        for label, request_path in [("api", "/api/v1/ping/"), ("admin", "/%sping/" % settings.ADMIN_URL)]:
+            best = [float("inf")] * len(handlers)
+            with override_settings(ALLOWED_HOSTS=["*"]):
+                for _ in range(options["rounds"]):
+                    for index, handler in enumerate(handlers):
+                        best[index] = min(best[index], self.measure(handler, request_path, options["repeat"]))
+            full, lean = best
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "%s: full %.1f us, lean %.1f us, %.1f us saved per request" % (label, full, lean, full - lean)
+                )
+            )
+
+    @staticmethod
+    def get_full_middleware():
+        """MIDDLEWARE with the Django classes in place of their API exempt subclasses"""
+        middleware = []
+        for dotted_path in settings.MIDDLEWARE:
+            middleware_class = import_string(dotted_path)
+            if issubclass(middleware_class, APIExemptMiddlewareMixin):
+                base = middleware_class.__bases__[-1]
+                dotted_path = "%s.%s" % (base.__module__, base.__qualname__)
+            middleware.append(dotted_path)
+        return middleware
+
+    @staticmethod
+    def get_handler(middleware):
+        """Request handler with the middleware stack"""
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+        return handler
+
+    @staticmethod
+    def measure(handler, request_path, repeat):
+        """Mean duration of one request through the handler in microseconds"""
+        factory = RequestFactory()
+
+        def request():
+            http_request = factory.get(
+                request_path, HTTP_AUTHORIZATION="Bearer token", HTTP_ACCEPT_LANGUAGE="en-US,en;q=0.9"
+            )
+            http_request.urlconf = BenchmarkURLConf
+            return handler.get_response(http_request)
+
+        request()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            request()
+        return (time.perf_counter() - start) / repeat * 1_000_000
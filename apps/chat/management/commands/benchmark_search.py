@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chat.models import Message
+from apps.chat.services import ThreadService
+from apps.chat.services.search import SearchService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Benchmark message search"""
+
+    help = (
+        "Measure latency of the first page of message search. "
+        "With --seed synthetic messages are inserted first, run it against a dedicated database."
+    )
+
+    vocabulary_size = 5000
+    words_per_message = 12
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--seed", type=int, default=0, help="Synthetic messages to insert before measuring")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Messages inserted per statement")
+        parser.add_argument("--queries", type=int, default=200, help="Number of measured searches")
+        parser.add_argument("--limit", type=int, default=20, help="Page size of every search")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        rng = random.Random(0)
+        vocabulary = ["w%04d" % index for index in range(self.vocabulary_size)]
+        # Zipf-like frequencies, a few words are frequent and most are rare
+        weights = [1.0 / (rank + 1) for rank in range(self.vocabulary_size)]
+        user, _ = User.objects.get_or_create(username="search-benchmark-1")
+        participant, _ = User.objects.get_or_create(username="search-benchmark-2")
+        thread, _ = ThreadService.create(participant, user)
+
+        if options["seed"]:
+            self.seed(thread, [user, participant], options["seed"], options["batch_size"], rng, vocabulary, weights)
+        if not Message.objects.filter(thread=thread).exists():
+            raise CommandError("Benchmark thread is empty, pass --seed")
+
+        timings = []
+        for _ in range(options["queries"]):
+            text = " ".join(rng.choices(vocabulary, weights=weights, k=rng.randint(1, 2)))
+            start = time.perf_counter()
+            SearchService.search(user, text).fetch(None, options["limit"])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "%s searches over %s messages: p50 %.1f ms, p95 %.1f ms, max %.1f ms"
+                % (
+                    len(timings),
+                    Message.objects.count(),
+                    statistics.median(timings),
+                    timings[int(len(timings) * 0.95) - 1],
+                    timings[-1],
+                )
+            )
+        )
+
+    def seed(self, thread, senders, count, batch_size, rng, vocabulary, weights):
+        """Insert synthetic messages and index them"""
+        for offset in range(0, count, batch_size):
+            Message.objects.bulk_create(
+                [
+                    Message(
+                        thread=thread,
+                        sender=senders[index % 2],
+                        text=" ".join(rng.choices(vocabulary, weights=weights, k=self.words_per_message)),
+                    )
+                    for index in range(offset, min(offset + batch_size, count))
+                ]
+            )
+            self.stdout.write("Inserted %s messages" % min(offset + batch_size, count))
+        SearchService.get_backend().rebuild()
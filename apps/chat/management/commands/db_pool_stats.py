@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.services.pool_stats import PoolStatsService
+
+
+class Command(BaseCommand):
+    """Database connection pool statistics"""
+
+    help = (
+        "Show connection checkouts and time spent waiting for pooled database connections, "
+        "summed over all processes. Processes report at most every %s seconds." % PoolStatsService.flush_interval
+    )
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--reset", action="store_true", help="Reset counters after showing them")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        for alias in settings.DATABASES:
+            stats = PoolStatsService.get_stats(alias)
+            mean = stats["wait_us"] / stats["checkouts"] / 1000 if stats["checkouts"] else 0
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "%s: checkouts: %s, mean wait: %.2f ms, slow: %s, timeouts: %s"
+                    % (alias, stats["checkouts"], mean, stats["slow"], stats["timeouts"])
+                )
+            )
+            if options["reset"]:
+                PoolStatsService.reset_stats(alias)
+        if options["reset"]:
+            self.stdout.write("Counters reset")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chat.services.message import MessageService
+
+
+class Command(BaseCommand):
+    """Rebuild or verify denormalized unread counters"""
+
+    help = "Recalculate per-thread and per-user unread counters from messages"
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only verify counters and exit with an error if any of them is stale",
+        )
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        if options["check"]:
+            relations, states = MessageService.check_unread_counters()
+            if relations or states:
+                raise CommandError(
+                    "Stale unread counters: %s thread relations, %s user states" % (relations, states)
+                )
+            self.stdout.write(self.style.SUCCESS("Unread counters are consistent"))
+            return
+        relations, states = MessageService.rebuild_unread_counters()
+        self.stdout.write(
+            self.style.SUCCESS("Rebuilt unread counters: %s thread relations, %s user states" % (relations, states))
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.services.response_cache import ResponseCacheService
+
+
+class Command(BaseCommand):
+    """Response cache statistics"""
+
+    help = "Show hit and miss counters of the chat response cache"
+
+    def add_arguments(self, parser):
+        """Add arguments"""
+        parser.add_argument("--reset", action="store_true", help="Reset counters after showing them")
+
+    def handle(self, *args, **options):
+        """Handle command"""
+        stats = ResponseCacheService.get_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total * 100 if total else 0
+        self.stdout.write(
+            self.style.SUCCESS("Hits: %s, misses: %s, hit ratio: %.1f%%" % (stats["hits"], stats["misses"], ratio))
+        )
+        if options["reset"]:
+            ResponseCacheService.reset_stats()
+            self.stdout.write("Counters reset")
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_alter_thread_created_alter_thread_updated_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='message',
+            options={'ordering': ['-created'], 'verbose_name': 'Message', 'verbose_name_plural': 'Messages'},
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', '-created', '-id'], name='message_thread_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_message_thread_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserChatState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chat_state', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'User chat state',
+                'verbose_name_plural': 'User chat states',
+            },
+        ),
+        migrations.AddField(
+            model_name='threaduserrelation',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_participant_pairs(apps, schema_editor):
+    """Set pair key on existing direct threads, the oldest thread of a pair wins"""
+    Thread = apps.get_model("chat", "Thread")
+    ThreadUserRelation = apps.get_model("chat", "ThreadUserRelation")
+
+    participants = {}
+    relations = ThreadUserRelation.objects.order_by("thread_id", "user_id").values_list("thread_id", "user_id")
+    for thread_id, user_id in relations.iterator():
+        participants.setdefault(thread_id, []).append(user_id)
+
+    seen = set()
+    threads = []
+    for thread_id in sorted(participants):
+        pair = tuple(participants[thread_id])
+        if len(pair) != 2 or pair in seen:
+            continue
+        seen.add(pair)
+        threads.append(Thread(id=thread_id, min_user_id=pair[0], max_user_id=pair[1]))
+    Thread.objects.bulk_update(threads, ["min_user", "max_user"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_unread_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='max_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='min_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(set_participant_pairs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='thread',
+            constraint=models.UniqueConstraint(fields=('min_user', 'max_user'), name='thread_participant_pair_unique'),
+        ),
+    ]
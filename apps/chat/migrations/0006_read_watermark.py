@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:51
+
+from django.db import migrations, models
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_read_watermarks(apps, schema_editor):
+    """Place the watermark right before the first message the user has not read yet"""
+    Message = apps.get_model("chat", "Message")
+    ThreadUserRelation = apps.get_model("chat", "ThreadUserRelation")
+
+    first_unread = (
+        Message.objects.filter(thread=OuterRef("thread"), is_read=False)
+        .exclude(sender=OuterRef("user"))
+        .order_by()
+        .values("thread")
+        .annotate(first=Min("id"))
+        .values("first")
+    )
+    last = (
+        Message.objects.filter(thread=OuterRef("thread"))
+        .order_by()
+        .values("thread")
+        .annotate(last=Max("id"))
+        .values("last")
+    )
+    ThreadUserRelation.objects.update(
+        last_read_message_id=Coalesce(Subquery(first_unread) - 1, Subquery(last))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_thread_participant_pair'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threaduserrelation',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='threaduserrelation',
+            name='last_read_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_read_watermarks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations
+
+# The DDL is frozen here, later changes of the search backends must not change
+# what this migration did. On PostgreSQL adding the stored generated column rewrites
+# the whole chat_message table under an ACCESS EXCLUSIVE lock, reads and writes of
+# messages wait for it, so run it in a maintenance window on large tables.
+INSTALL_SQL = {
+    "postgresql": [
+        "ALTER TABLE chat_message ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, text)) STORED",
+        "CREATE INDEX IF NOT EXISTS chat_message_search_idx ON chat_message USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS chat_message_fts "
+        "USING fts5(text, content='chat_message', content_rowid='id')",
+        "INSERT INTO chat_message_fts (chat_message_fts) VALUES ('rebuild')",
+    ],
+}
+
+UNINSTALL_SQL = {
+    "postgresql": [
+        "DROP INDEX IF EXISTS chat_message_search_idx",
+        "ALTER TABLE chat_message DROP COLUMN IF EXISTS search_vector",
+    ],
+    "sqlite": [
+        "DROP TABLE IF EXISTS chat_message_fts",
+    ],
+}
+
+
+def run_vendor_sql(statements):
+    """Run statements of the database backend"""
+
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor not in statements:
+            raise ImproperlyConfigured("Message search does not support %s database" % vendor)
+        for sql in statements[vendor]:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_thread_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_vendor_sql(INSTALL_SQL), run_vendor_sql(UNINSTALL_SQL)),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0008_message_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('compressed_text', models.BinaryField()),
+                ('created', models.DateTimeField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='chat.thread')),
+            ],
+            options={
+                'verbose_name': 'Archived message',
+                'verbose_name_plural': 'Archived messages',
+                'indexes': [models.Index(fields=['thread', '-created', '-id'], name='archived_thread_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0009_archived_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='versioned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userchatstate',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userchatstate',
+            name='versioned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:01
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_last_activity(apps, schema_editor):
+    """Copy activity of the thread, its last message or its creation, to every relation"""
+    Thread = apps.get_model("chat", "Thread")
+    ThreadUserRelation = apps.get_model("chat", "ThreadUserRelation")
+
+    activity = Thread.objects.filter(pk=OuterRef("thread")).values(last_activity=Coalesce("last_message_at", "created"))
+    ThreadUserRelation.objects.update(last_activity_at=Subquery(activity))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0010_version_stamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='thread',
+            name='thread_last_message_at_idx',
+        ),
+        migrations.AddField(
+            model_name='threaduserrelation',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(set_last_activity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='threaduserrelation',
+            index=models.Index(fields=['user', '-last_activity_at', '-thread'], name='relation_user_activity_idx'),
+        ),
+    ]
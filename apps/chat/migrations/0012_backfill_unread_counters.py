@@ -0,0 +1,54 @@
+from django.db import migrations
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_unread_counters(apps, schema_editor):
+    """
+    Create missing chat states and count unread messages of every user from the read watermarks
+
+    Users of threads created before the counters had no state, so their counters
+    stayed at zero and bumps of their thread list version updated nothing.
+    """
+    Message = apps.get_model("chat", "Message")
+    ThreadUserRelation = apps.get_model("chat", "ThreadUserRelation")
+    UserChatState = apps.get_model("chat", "UserChatState")
+
+    missing = ThreadUserRelation.objects.exclude(user__in=UserChatState.objects.values("user"))
+    UserChatState.objects.bulk_create(
+        [UserChatState(user_id=user_id) for user_id in missing.values_list("user", flat=True).distinct()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    unread = (
+        Message.objects.filter(thread=OuterRef("thread"), id__gt=Coalesce(OuterRef("last_read_message_id"), 0))
+        .exclude(sender=OuterRef("user"))
+        .order_by()
+        .values("thread")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    ThreadUserRelation.objects.update(unread_count=Coalesce(Subquery(unread), Value(0)))
+    total = (
+        ThreadUserRelation.objects.filter(user=OuterRef("user"))
+        .order_by()
+        .values("user")
+        .annotate(total=Sum("unread_count"))
+        .values("total")
+    )
+    # New versions, so thread lists cached or validated with the old counters are not served
+    UserChatState.objects.update(
+        unread_count=Coalesce(Subquery(total), Value(0)), version=F("version") + 1, versioned_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0011_relation_last_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
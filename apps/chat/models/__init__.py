@@ -1,8 +1,12 @@
+from .archive import ArchivedMessage
 from .message import Message
 from .threads import Thread, ThreadUserRelation
+from .user_state import UserChatState
 
 __all__ = [
     "Thread",
     "ThreadUserRelation",
     "Message",
+    "UserChatState",
+    "ArchivedMessage",
 ]
@@ -0,0 +1,46 @@
+import zlib
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from .threads import Thread
+
+User = get_user_model()
+
+
+class ArchivedMessage(models.Model):
+    """
+    Cold copy of an old message
+
+    Keeps the id of the original message, text is stored zlib compressed.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="archived_messages")
+    compressed_text = models.BinaryField()
+    created = models.DateTimeField()
+    is_read = models.BooleanField(default=False)
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Archived message")
+        verbose_name_plural = _("Archived messages")
+        indexes = [
+            models.Index(fields=["thread", "-created", "-id"], name="archived_thread_created_idx"),
+        ]
+
+    @property
+    def text(self) -> str:
+        """Decompressed text"""
+        return self.decompress(self.compressed_text)
+
+    @staticmethod
+    def compress(text: str) -> bytes:
+        """Compress text"""
+        return zlib.compress(text.encode(), 9)
+
+    @staticmethod
+    def decompress(compressed_text: bytes) -> str:
+        """Decompress text"""
+        return zlib.decompress(compressed_text).decode()
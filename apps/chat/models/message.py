@@ -19,3 +19,6 @@ class Message(models.Model):
         verbose_name = _("Message")
         verbose_name_plural = _("Messages")
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["thread", "-created", "-id"], name="message_thread_created_idx"),
+        ]
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
@@ -9,19 +10,43 @@ class ThreadUserRelation(models.Model):
     """Thread user relation model"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="thread")
     thread = models.ForeignKey("chat.Thread", on_delete=models.CASCADE, related_name="user")
+    unread_count = models.PositiveIntegerField(default=0)
+    # Read watermark, every message up to this id is read by the user
+    last_read_message_id = models.BigIntegerField(null=True, blank=True)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    # Last message of the thread or joining the thread, order of the inbox, maintained by MessageService
+    last_activity_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = _("Thread User relation")
         verbose_name_plural = _("Thread User relations")
         unique_together = ("user", "thread")
+        indexes = [
+            models.Index(fields=["user", "-last_activity_at", "-thread"], name="relation_user_activity_idx"),
+        ]
 
 
 class Thread(models.Model):
     """Thread model"""
     participants = models.ManyToManyField(to=User, through=ThreadUserRelation, related_name="threads")
+    # Normalized participant pair of a direct thread, min_user.id < max_user.id
+    min_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    max_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    # Activity of the thread, maintained by MessageService.create
+    last_message = models.ForeignKey(
+        "chat.Message", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    message_count = models.PositiveIntegerField(default=0)
+    # Version stamp of the message list, bumped by VersionService on every visible change
+    version = models.PositiveBigIntegerField(default=0)
+    versioned_at = models.DateTimeField(null=True, blank=True)
     created = models.DateTimeField(auto_now_add=True, db_index=True, editable=False)
     updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = _("Thread")
         verbose_name_plural = _("Threads")
+        constraints = [
+            models.UniqueConstraint(fields=["min_user", "max_user"], name="thread_participant_pair_unique"),
+        ]
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+User = get_user_model()
+
+
+class UserChatState(models.Model):
+    """Denormalized per-user chat counters"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="chat_state")
+    unread_count = models.PositiveIntegerField(default=0)
+    # Version stamp of the thread list of the user, bumped by VersionService
+    version = models.PositiveBigIntegerField(default=0)
+    versioned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("User chat state")
+        verbose_name_plural = _("User chat states")
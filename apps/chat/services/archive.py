@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Iterator
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+
+from apps.chat.models import ArchivedMessage, Message, Thread
+from apps.chat.services.version import VersionService
+
+
+class ArchiveService:
+    """
+    Archive service
+
+    Moves old messages from the hot table to `ArchivedMessage` in short
+    batches, every batch is its own transaction, so an interrupted run
+    is resumed by running it again.
+    """
+
+    @classmethod
+    def get_archivable_messages(cls, cutoff: datetime) -> "QuerySet[Message]":
+        """
+        Messages which can be moved to the archive
+
+        Unread messages stay hot to keep unread counters verifiable from messages,
+        last messages of threads stay hot for inbox previews.
+        Args:
+            cutoff: datetime, messages created before it are archived
+        Return:
+            messages: QuerySet[Message]
+        """
+        return Message.objects.filter(created__lt=cutoff, is_read=True).exclude(
+            Exists(Thread.objects.filter(last_message=OuterRef("pk")))
+        )
+
+    @classmethod
+    @transaction.atomic
+    def archive_batch(cls, cutoff: datetime, batch_size: int = 1000) -> int:
+        """
+        Move one batch of the oldest archivable messages
+
+        Args:
+            cutoff: datetime
+            batch_size: int
+        Return:
+            count of archived messages
+        """
+        messages = list(
+            cls.get_archivable_messages(cutoff)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .only("id", "sender_id", "thread_id", "text", "created", "is_read")[:batch_size]
+        )
+        if not messages:
+            return 0
+        ArchivedMessage.objects.bulk_create(
+            [
+                ArchivedMessage(
+                    id=message.id,
+                    sender_id=message.sender_id,
+                    thread_id=message.thread_id,
+                    compressed_text=ArchivedMessage.compress(message.text),
+                    created=message.created,
+                    is_read=message.is_read,
+                )
+                for message in messages
+            ],
+            ignore_conflicts=True,
+        )
+        Message.objects.filter(id__in=[message.id for message in messages]).delete()
+        # Offset pages of the threads cover hot messages only and have changed
+        VersionService.bump_threads({message.thread_id for message in messages})
+        return len(messages)
+
+    @classmethod
+    def archive(cls, cutoff: datetime, batch_size: int = 1000) -> Iterator[int]:
+        """
+        Move every archivable message
+
+        Args:
+            cutoff: datetime
+            batch_size: int
+        Return:
+            Iterator of batch sizes, stop consuming it to pause the move
+        """
+        while True:
+            count = cls.archive_batch(cutoff, batch_size)
+            if not count:
+                return
+            yield count
@@ -0,0 +1,142 @@
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Tuple
+
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+
+from apps.chat.models import Message, Thread, ThreadUserRelation, UserChatState
+from apps.chat.services.membership import MembershipService
+from apps.chat.services.realtime import RealtimeService
+from apps.chat.services.search import SearchService
+from apps.chat.services.version import VersionService
+
+if TYPE_CHECKING:
+    from django.contrib.auth.models import User
+
+
+class BroadcastResult(NamedTuple):
+    """Result of broadcast"""
+    messages: int
+    created_threads: int
+
+
+class BroadcastService:
+    """
+    Send one message to many users
+
+    Direct threads of all recipients are resolved and created with set-based queries,
+    messages and counters are written per chunk of recipients, so the number
+    of queries grows with the number of chunks and not with the number of recipients.
+    """
+
+    chunk_size = 1000
+
+    @classmethod
+    @transaction.atomic
+    def broadcast(cls, sender: "User", recipient_ids: Iterable[int], text: str) -> BroadcastResult:
+        """
+        Broadcast message
+
+        Args:
+            sender: User
+            recipient_ids: Iterable[int], ids of existing users, the sender is skipped
+            text: str
+        Return:
+            BroadcastResult
+        """
+        recipient_ids = sorted(set(recipient_ids) - {sender.pk})
+        messages: List[Message] = []
+        created: List[Thread] = []
+        for offset in range(0, len(recipient_ids), cls.chunk_size):
+            chunk = recipient_ids[offset: offset + cls.chunk_size]
+            threads, new_threads = cls._get_or_create_threads(sender, chunk)
+            created += new_threads
+            messages += cls._create_messages(sender, threads, text)
+        VersionService.bump_users([sender.pk])
+        transaction.on_commit(lambda: RealtimeService.publish_threads(created), robust=True)
+        transaction.on_commit(lambda: RealtimeService.publish_messages(messages), robust=True)
+        transaction.on_commit(lambda: RealtimeService.publish_unread_counts(recipient_ids), robust=True)
+        return BroadcastResult(messages=len(messages), created_threads=len(created))
+
+    @classmethod
+    def _get_or_create_threads(cls, sender: "User", recipient_ids: List[int]) -> Tuple[List[Thread], List[Thread]]:
+        """
+        Get direct threads of sender with every recipient, missing ones are created
+
+        Args:
+            sender: User
+            recipient_ids: List[int]
+        Return:
+            Tuple(threads of all recipients, created threads)
+        """
+        lookup = cls._get_pair_lookup(sender, recipient_ids)
+        threads = list(Thread.objects.filter(lookup).only("id", "min_user_id", "max_user_id"))
+        existing = {(thread.min_user_id, thread.max_user_id) for thread in threads}
+        missing = [(min(sender.pk, pk), max(sender.pk, pk)) for pk in recipient_ids]
+        missing = [key for key in missing if key not in existing]
+        if not missing:
+            return threads, []
+        # Concurrent thread creation for the same pair is skipped by the unique constraint
+        Thread.objects.bulk_create(
+            [Thread(min_user_id=min_id, max_user_id=max_id) for min_id, max_id in missing], ignore_conflicts=True
+        )
+        threads = list(Thread.objects.filter(lookup).only("id", "min_user_id", "max_user_id"))
+        missing_keys = set(missing)
+        created = [thread for thread in threads if (thread.min_user_id, thread.max_user_id) in missing_keys]
+        ThreadUserRelation.objects.bulk_create(
+            [
+                ThreadUserRelation(thread_id=thread.id, user_id=user_id)
+                for thread in created
+                for user_id in (thread.min_user_id, thread.max_user_id)
+            ],
+            ignore_conflicts=True,
+        )
+        UserChatState.objects.bulk_create(
+            [UserChatState(user_id=pk) for pk in [sender.pk, *recipient_ids]], ignore_conflicts=True
+        )
+        MembershipService.invalidate_many(thread.id for thread in created)
+        return threads, created
+
+    @staticmethod
+    def _get_pair_lookup(sender: "User", recipient_ids: List[int]) -> Q:
+        """Filter of direct threads between sender and recipients"""
+        lower = [pk for pk in recipient_ids if pk < sender.pk]
+        higher = [pk for pk in recipient_ids if pk > sender.pk]
+        return Q(min_user_id=sender.pk, max_user_id__in=higher) | Q(max_user_id=sender.pk, min_user_id__in=lower)
+
+    @classmethod
+    def _create_messages(cls, sender: "User", threads: List[Thread], text: str) -> List[Message]:
+        """
+        Insert one message per thread and update denormalized state
+
+        Args:
+            sender: User
+            threads: List[Thread]
+            text: str
+        Return:
+            messages: List[Message]
+        """
+        messages = Message.objects.bulk_create(
+            [Message(sender=sender, thread_id=thread.id, text=text) for thread in threads]
+        )
+        SearchService.index_many(messages)
+        thread_ids = [thread.id for thread in threads]
+        created = max(message.created for message in messages)
+        last_message = Message.objects.filter(thread=OuterRef("pk")).order_by("-created", "-id").values("id")[:1]
+        Thread.objects.filter(pk__in=thread_ids).update(
+            last_message=Subquery(last_message),
+            last_message_at=created,
+            message_count=F("message_count") + 1,
+            updated=created,
+            **VersionService.get_bump(),
+        )
+        ThreadUserRelation.objects.filter(thread_id__in=thread_ids).update(
+            unread_count=F("unread_count") + Case(When(user_id=sender.pk, then=Value(0)), default=Value(1)),
+            last_activity_at=created,
+        )
+        recipient_ids = [
+            thread.max_user_id if thread.min_user_id == sender.pk else thread.min_user_id for thread in threads
+        ]
+        UserChatState.objects.filter(user_id__in=recipient_ids).update(
+            unread_count=F("unread_count") + 1, **VersionService.get_bump()
+        )
+        return messages
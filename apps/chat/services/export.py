@@ -0,0 +1,154 @@
+import csv
+import heapq
+import json
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.chat.models import ArchivedMessage, Message, Thread
+from apps.utils import LRUCache
+
+User = get_user_model()
+
+
+class _Echo:
+    """File-like object returning what is written, for `csv.writer`"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ExportService:
+    """
+    Thread export service
+
+    Messages of hot and archive tables are read through server-side cursors and merged
+    in `(created, id)` order, sender names come from a bounded cache filled once per chunk,
+    so memory does not depend on the thread size. Dates are rendered like the API renders them.
+    """
+
+    chunk_size = 2000
+    sender_cache_size = 1024
+    fields = ["id", "sender_id", "sender", "text", "created", "is_read"]
+    datetime_field = serializers.DateTimeField()
+    # Spreadsheets evaluate cells starting with these as formulas
+    formula_prefixes = ("=", "+", "-", "@", "\t", "\r")
+
+    @classmethod
+    def iter_messages(cls, thread: Thread) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over every message of thread, oldest first
+
+        Args:
+            thread: Thread
+        Return:
+            Iterator of message dicts with `fields` keys
+        """
+        columns = ["id", "sender_id", "created", "is_read"]
+        hot = (
+            Message.objects.filter(thread=thread)
+            .order_by("created", "id")
+            .values_list(*columns, "text")
+            .iterator(chunk_size=cls.chunk_size)
+        )
+        archived = (
+            (pk, sender_id, created, is_read, ArchivedMessage.decompress(text))
+            for pk, sender_id, created, is_read, text in ArchivedMessage.objects.filter(thread=thread)
+            .order_by("created", "id")
+            .values_list(*columns, "compressed_text")
+            .iterator(chunk_size=cls.chunk_size)
+        )
+        rows = heapq.merge(hot, archived, key=lambda row: (row[2], row[0]))
+        senders = LRUCache(maxsize=cls.sender_cache_size)
+        while True:
+            chunk = list(islice(rows, cls.chunk_size))
+            if not chunk:
+                return
+            names = cls._resolve_senders(senders, {row[1] for row in chunk})
+            for pk, sender_id, created, is_read, text in chunk:
+                yield {
+                    "id": pk,
+                    "sender_id": sender_id,
+                    "sender": names.get(sender_id, ""),
+                    "text": text,
+                    "created": cls.datetime_field.to_representation(created),
+                    "is_read": is_read,
+                }
+
+    @classmethod
+    def _resolve_senders(cls, senders: LRUCache, sender_ids: Iterable[int]) -> Dict[int, str]:
+        """Get names of senders, the ones missing in cache are loaded with one query"""
+        names, missing = {}, []
+        for pk in sender_ids:
+            name = senders.get(pk)
+            if name is None:
+                missing.append(pk)
+            else:
+                names[pk] = name
+        if missing:
+            queryset = User.objects.filter(pk__in=missing).annotate(
+                name=Concat(F("first_name"), Value(" "), F("last_name"))
+            )
+            for pk, name in queryset.values_list("pk", "name"):
+                senders.set(pk, name)
+                names[pk] = name
+        return names
+
+    @classmethod
+    def to_ndjson(cls, messages: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Format messages as newline delimited JSON
+
+        Return:
+            Iterator of lines
+        """
+        for message in messages:
+            yield json.dumps(message, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+    @classmethod
+    def to_csv(cls, messages: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Format messages as CSV with header
+
+        Text cells starting like a formula are prefixed with a quote,
+        so spreadsheets show them as text instead of evaluating them.
+        Return:
+            Iterator of lines
+        """
+        writer = csv.writer(_Echo())
+        yield writer.writerow(cls.fields)
+        for message in messages:
+            yield writer.writerow([cls._escape_formula(message[key]) for key in cls.fields])
+
+    @classmethod
+    def _escape_formula(cls, value: Any) -> Any:
+        """Prefix text starting like a formula with a quote"""
+        if isinstance(value, str) and value.startswith(cls.formula_prefixes):
+            return "'" + value
+        return value
+
+    @classmethod
+    async def aiter_chunks(cls, lines: Iterator[str]) -> AsyncIterator[str]:
+        """
+        Stream lines of an export to an ASGI response in bounded chunks
+
+        Django reads a sync iterator of an ASGI response to the end before the first byte
+        is sent, so lines are pulled `chunk_size` at a time in the thread of sync code,
+        where the server-side cursors of the export live.
+        Args:
+            lines: Iterator[str] of `to_ndjson` or `to_csv`
+        Return:
+            AsyncIterator of chunks
+        """
+        next_chunk = sync_to_async(lambda: "".join(islice(lines, cls.chunk_size)))
+        while True:
+            chunk = await next_chunk()
+            if not chunk:
+                return
+            yield chunk
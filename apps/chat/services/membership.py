@@ -0,0 +1,94 @@
+from typing import FrozenSet, Iterable, List
+
+from django.core.cache import cache
+from django.db import router, transaction
+
+from apps.chat.models import ThreadUserRelation
+from apps.utils import LRUCache
+
+
+class MembershipService:
+    """
+    Cached participant ids of threads
+
+    Lookups go through the in-process LRU, then the shared cache, then the database.
+    Changes of `ThreadUserRelation` delete the shared entry, other processes
+    pick them up when their local entry expires, `local_cache.ttl` seconds at most.
+    """
+
+    local_cache = LRUCache(maxsize=10000, ttl=10)
+    cache_timeout = 60 * 60
+    key_prefix = "chat:thread-members:%s"
+
+    @classmethod
+    def get_participant_ids(cls, thread_id: int) -> FrozenSet[int]:
+        """
+        Get participant ids of thread
+
+        Args:
+            thread_id: int
+        Return:
+            participant_ids: FrozenSet[int]
+        """
+        participant_ids = cls.local_cache.get(thread_id)
+        if participant_ids is not None:
+            return participant_ids
+        key = cls.key_prefix % thread_id
+        cached = cache.get(key)
+        if cached is None:
+            # Read from the primary, a lagging replica would cache a stale membership until it expires
+            participant_ids = frozenset(
+                ThreadUserRelation.objects.using(router.db_for_write(ThreadUserRelation))
+                .filter(thread_id=thread_id)
+                .values_list("user_id", flat=True)
+            )
+            cache.set(key, list(participant_ids), cls.cache_timeout)
+        else:
+            participant_ids = frozenset(cached)
+        cls.local_cache.set(thread_id, participant_ids)
+        return participant_ids
+
+    @classmethod
+    def is_participant(cls, thread_id: int, user_id: int) -> bool:
+        """
+        Is user participant of thread
+
+        Args:
+            thread_id: int
+            user_id: int
+        Return:
+            bool
+        """
+        return user_id in cls.get_participant_ids(thread_id)
+
+    @classmethod
+    def invalidate(cls, thread_id: int):
+        """
+        Drop cached participants of thread
+
+        Dropped again after commit, so a concurrent request cannot
+        put back the participants read before the change is visible.
+        Args:
+            thread_id: int
+        """
+        cls.invalidate_many([thread_id])
+
+    @classmethod
+    def invalidate_many(cls, thread_ids: Iterable[int]):
+        """
+        Drop cached participants of threads
+
+        One shared cache round trip now and one after commit, whatever the number of threads.
+        Args:
+            thread_ids: Iterable[int]
+        """
+        thread_ids = list(thread_ids)
+        cls._delete(thread_ids)
+        transaction.on_commit(lambda: cls._delete(thread_ids))
+
+    @classmethod
+    def _delete(cls, thread_ids: List[int]):
+        """Delete local and shared entries"""
+        for thread_id in thread_ids:
+            cls.local_cache.delete(thread_id)
+        cache.delete_many([cls.key_prefix % thread_id for thread_id in thread_ids])
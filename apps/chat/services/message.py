@@ -1,6 +1,14 @@
-from typing import TYPE_CHECKING, Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from apps.chat.models import Message
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Concat, Greatest
+from django.utils import timezone
+
+from apps.chat.models import ArchivedMessage, Message, Thread, ThreadUserRelation, UserChatState
+from apps.chat.services.realtime import RealtimeService
+from apps.chat.services.search import SearchService
+from apps.chat.services.version import VersionService
 
 if TYPE_CHECKING:
     from django.contrib.auth.models import User
@@ -21,25 +29,219 @@ class MessageService:
         return Message.objects.create(**data)
 
     @classmethod
+    @transaction.atomic
     def create(cls, data: Dict[str, Any]) -> Message:
         """
         Create message
+
+        Thread activity, search index and unread counters of the other participants
+        are updated in the same transaction, subscribers are notified after commit.
         Args:
             data: Dict[str, Any]
         Return:
             message: Message
         """
-        return cls._create(data)
+        message = cls._create(data)
+        cls._update_thread_activity(message)
+        SearchService.index(message)
+        user_ids = cls._increment_unread_count(message)
+        transaction.on_commit(lambda: RealtimeService.publish_message(message), robust=True)
+        transaction.on_commit(lambda: RealtimeService.publish_unread_counts(user_ids), robust=True)
+        return message
+
+    @classmethod
+    def _update_thread_activity(cls, message: Message):
+        """
+        Point thread to its new last message and bump its message count and version
+
+        Single `UPDATE ... SET message_count = message_count + 1`, the row lock
+        serializes concurrent writers of the same thread.
+        Args:
+            message: Message
+        """
+        Thread.objects.filter(pk=message.thread_id).update(
+            last_message=message,
+            last_message_at=message.created,
+            message_count=F("message_count") + 1,
+            updated=message.created,
+            **VersionService.get_bump(),
+        )
+
+    @classmethod
+    def get_thread_messages(cls, thread: Thread) -> "QuerySet[Message]":
+        """
+        Lazy queryset of thread messages with senders joined
+
+        Nothing is fetched until the caller slices a page out of it,
+        so only the requested window of the thread is loaded.
+        Args:
+            thread: Thread
+        Return:
+            messages: QuerySet[Message]
+        """
+        return Message.objects.filter(thread=thread).select_related("sender")
+
+    @classmethod
+    def get_sender_name(cls) -> Concat:
+        """Full name of message sender computed by the database"""
+        return Concat("sender__first_name", Value(" "), "sender__last_name")
+
+    @classmethod
+    def get_thread_message_rows(cls, thread: Thread) -> QuerySet:
+        """
+        Lazy queryset of thread message rows
+
+        Named tuples of `id`, `sender_name`, `text`, `created` and `is_read`,
+        no model instances are built.
+        Args:
+            thread: Thread
+        Return:
+            rows: QuerySet of named tuples
+        """
+        return (
+            Message.objects.filter(thread=thread)
+            .annotate(sender_name=cls.get_sender_name())
+            .values_list("id", "sender_name", "text", "created", "is_read", named=True)
+        )
+
+    @classmethod
+    def get_archived_thread_message_rows(cls, thread: Thread) -> QuerySet:
+        """
+        Lazy queryset of archived thread message rows
+
+        Same row shape as `get_thread_message_rows`, `text` is still compressed.
+        Args:
+            thread: Thread
+        Return:
+            rows: QuerySet of named tuples
+        """
+        return (
+            ArchivedMessage.objects.filter(thread=thread)
+            .annotate(sender_name=cls.get_sender_name(), text=F("compressed_text"))
+            .values_list("id", "sender_name", "text", "created", "is_read", named=True)
+        )
+
+    @classmethod
+    def get_archived_thread_messages(cls, thread: Thread) -> "QuerySet[ArchivedMessage]":
+        """
+        Lazy queryset of archived thread messages with senders joined
+
+        Args:
+            thread: Thread
+        Return:
+            messages: QuerySet[ArchivedMessage]
+        """
+        return ArchivedMessage.objects.filter(thread=thread).select_related("sender")
+
+    @classmethod
+    def get_user_messages_after(cls, user: "User", message_id: int) -> "QuerySet[Message]":
+        """
+        Messages of every thread of user created after the given message
+
+        Args:
+            user: User
+            message_id: int
+        Return:
+            messages: QuerySet[Message] in ascending order
+        """
+        return (
+            Message.objects.filter(
+                thread__in=ThreadUserRelation.objects.filter(user=user).values("thread"), id__gt=message_id
+            )
+            .select_related("sender")
+            .order_by("id")
+        )
 
     @classmethod
-    def read(cls, message: Message) -> None:
+    def read(cls, message: Message, user: "User") -> ThreadUserRelation:
         """
         Read message
+
+        Compatibility wrapper, advances the read watermark up to the message.
         Args:
             message: Message
+            user: User
+        Return:
+            relation: ThreadUserRelation
+        """
+        return cls.read_up_to(message.thread, user, message.id)
+
+    @classmethod
+    @transaction.atomic
+    def read_up_to(cls, thread: Thread, user: "User", message_id: Optional[int] = None) -> ThreadUserRelation:
+        """
+        Mark thread as read up to the message
+
+        The watermark never moves backwards. Unread counters are recalculated
+        from the watermark and `is_read` of the newly read messages
+        is set by a single update, which bumps the thread version when it changes anything.
+        Args:
+            thread: Thread
+            user: User
+            message_id: id of the last read message, the latest message by default
+        Return:
+            relation: ThreadUserRelation
+        """
+        relation = ThreadUserRelation.objects.select_for_update().get(thread=thread, user=user)
+        if message_id is None:
+            message_id = Message.objects.filter(thread=thread).order_by("-id").values_list("id", flat=True).first()
+        watermark = relation.last_read_message_id or 0
+        if message_id is None or message_id <= watermark:
+            return relation
+
+        others = Message.objects.filter(thread=thread).exclude(sender=user)
+        if others.filter(id__gt=watermark, id__lte=message_id, is_read=False).update(is_read=True):
+            VersionService.bump_threads([thread.pk])
+        unread_count = others.filter(id__gt=message_id).count()
+        if unread_count < relation.unread_count:
+            UserChatState.objects.filter(user=user).update(
+                unread_count=Greatest(F("unread_count") - (relation.unread_count - unread_count), 0)
+            )
+        relation.unread_count = unread_count
+        relation.last_read_message_id = message_id
+        relation.last_read_at = timezone.now()
+        relation.save(update_fields=["unread_count", "last_read_message_id", "last_read_at"])
+        transaction.on_commit(lambda: RealtimeService.publish_read(relation), robust=True)
+        transaction.on_commit(lambda: RealtimeService.publish_unread_counts([relation.user_id]), robust=True)
+        return relation
+
+    @classmethod
+    def _increment_unread_count(cls, message: Message) -> List[int]:
+        """
+        Increment unread counters of every participant except the sender
+
+        Thread lists of all participants show the new activity, so the inbox order
+        of every relation moves in the same update and their versions are bumped
+        by the same update of user states.
+        Args:
+            message: Message
+        Return:
+            user_ids: List[int] of recipients
+        """
+        relations = ThreadUserRelation.objects.filter(thread_id=message.thread_id)
+        user_ids = list(relations.exclude(user_id=message.sender_id).values_list("user_id", flat=True))
+        relations.update(
+            unread_count=F("unread_count") + Case(When(user_id=message.sender_id, then=Value(0)), default=Value(1)),
+            last_activity_at=message.created,
+        )
+        UserChatState.objects.filter(user_id__in=[*user_ids, message.sender_id]).update(
+            unread_count=F("unread_count") + Case(When(user_id=message.sender_id, then=Value(0)), default=Value(1)),
+            **VersionService.get_bump(),
+        )
+        return user_ids
+
+    @classmethod
+    def get_unread_count(cls, user: "User") -> int:
         """
-        message.is_read = True
-        message.save(update_fields=["is_read"])
+        Get count of unread messages for user
+
+        Args:
+            user: User
+        Return:
+            count: int
+        """
+        count = UserChatState.objects.filter(user=user).values_list("unread_count", flat=True).first()
+        return count or 0
 
     @classmethod
     def is_user_sender(cls, obj: Message, user: "User") -> bool:
@@ -52,3 +254,74 @@ class MessageService:
         Return: bool
         """
         return obj.sender == user
+
+    @classmethod
+    def _expected_unread_counts(cls) -> Tuple[Coalesce, Coalesce]:
+        """
+        Expressions computing unread counters from scratch
+
+        Return:
+            Tuple(relation count expression, user total expression)
+        """
+        messages = (
+            Message.objects.filter(thread=OuterRef("thread"), id__gt=Coalesce(OuterRef("last_read_message_id"), 0))
+            .exclude(sender=OuterRef("user"))
+            .order_by()
+            .values("thread")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        relations = (
+            ThreadUserRelation.objects.filter(user=OuterRef("user"))
+            .order_by()
+            .values("user")
+            .annotate(total=Sum("unread_count"))
+            .values("total")
+        )
+        return Coalesce(Subquery(messages), Value(0)), Coalesce(Subquery(relations), Value(0))
+
+    @classmethod
+    def check_unread_counters(cls) -> Tuple[int, int]:
+        """
+        Count stale unread counters
+
+        Return:
+            Tuple(stale thread relations, stale or missing user states)
+        """
+        relation_count, user_total = cls._expected_unread_counts()
+        relations = (
+            ThreadUserRelation.objects.annotate(expected=relation_count)
+            .exclude(unread_count=F("expected"))
+            .count()
+        )
+        states = (
+            UserChatState.objects.annotate(expected=user_total)
+            .exclude(unread_count=F("expected"))
+            .count()
+        )
+        missing = (
+            ThreadUserRelation.objects.exclude(user__in=UserChatState.objects.values("user"))
+            .values("user")
+            .distinct()
+            .count()
+        )
+        return relations, states + missing
+
+    @classmethod
+    @transaction.atomic
+    def rebuild_unread_counters(cls) -> Tuple[int, int]:
+        """
+        Recalculate every unread counter from messages
+
+        Return:
+            Tuple(thread relations, user states)
+        """
+        relation_count, user_total = cls._expected_unread_counts()
+        missing = ThreadUserRelation.objects.exclude(user__in=UserChatState.objects.values("user"))
+        UserChatState.objects.bulk_create(
+            [UserChatState(user_id=user_id) for user_id in missing.values_list("user", flat=True).distinct()],
+            ignore_conflicts=True,
+        )
+        relations = ThreadUserRelation.objects.update(unread_count=relation_count)
+        states = UserChatState.objects.update(unread_count=user_total)
+        return relations, states
@@ -0,0 +1,166 @@
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+if TYPE_CHECKING:
+    from apps.chat.models import Message, Thread, ThreadUserRelation
+
+logger = logging.getLogger(__name__)
+
+
+class RealtimeService:
+    """Publish chat events to the channel layer"""
+
+    @staticmethod
+    def get_thread_group(thread_id: int) -> str:
+        """Channel layer group of thread subscribers"""
+        return "chat.thread.%s" % thread_id
+
+    @staticmethod
+    def get_user_group(user_id: int) -> str:
+        """Channel layer group of user connections"""
+        return "chat.user.%s" % user_id
+
+    @classmethod
+    def _send(cls, group: str, event: Dict[str, Any]) -> None:
+        """
+        Send event to group
+
+        Delivery is best effort, a broken channel layer must not fail the write path.
+
+        Args:
+            group: str
+            event: Dict[str, Any]
+        """
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(group, event)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Cannot publish %s to %s", event["type"], group)
+
+    @classmethod
+    def _send_many(cls, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Send events to groups in one event loop round trip
+
+        Args:
+            events: List of (group, event)
+        """
+        channel_layer = get_channel_layer()
+        if channel_layer is None or not events:
+            return
+
+        async def send():
+            for group, event in events:
+                try:
+                    await channel_layer.group_send(group, event)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("Cannot publish %s to %s", event["type"], group)
+
+        async_to_sync(send)()
+
+    @classmethod
+    def publish_message(cls, message: "Message") -> None:
+        """
+        Publish created message to thread subscribers
+
+        Args:
+            message: Message
+        """
+        from apps.chat.api.serializers import MessageSerializer  # pylint: disable=import-outside-toplevel
+
+        cls._send(
+            cls.get_thread_group(message.thread_id),
+            {"type": "chat.message", "thread": message.thread_id, "message": MessageSerializer(message).data},
+        )
+
+    @classmethod
+    def publish_messages(cls, messages: Iterable["Message"]) -> None:
+        """
+        Publish created messages to their thread subscribers
+
+        Args:
+            messages: Iterable[Message]
+        """
+        from apps.chat.api.serializers import MessageSerializer  # pylint: disable=import-outside-toplevel
+
+        messages = list(messages)
+        # One list serializer binds fields once instead of once per message
+        data = MessageSerializer(messages, many=True).data
+        cls._send_many(
+            [
+                (
+                    cls.get_thread_group(message.thread_id),
+                    {"type": "chat.message", "thread": message.thread_id, "message": item},
+                )
+                for message, item in zip(messages, data)
+            ]
+        )
+
+    @classmethod
+    def publish_thread(cls, thread: "Thread", user_ids: Iterable[int]) -> None:
+        """
+        Publish new thread to participants so open connections subscribe to it
+
+        Args:
+            thread: Thread
+            user_ids: Iterable[int]
+        """
+        for user_id in user_ids:
+            cls._send(cls.get_user_group(user_id), {"type": "chat.thread", "thread": thread.id})
+
+    @classmethod
+    def publish_threads(cls, threads: Iterable["Thread"]) -> None:
+        """
+        Publish new direct threads to both participants
+
+        Args:
+            threads: Iterable[Thread] with participant pair
+        """
+        cls._send_many(
+            [
+                (cls.get_user_group(user_id), {"type": "chat.thread", "thread": thread.id})
+                for thread in threads
+                for user_id in (thread.min_user_id, thread.max_user_id)
+            ]
+        )
+
+    @classmethod
+    def publish_read(cls, relation: "ThreadUserRelation") -> None:
+        """
+        Publish read watermark of participant to thread subscribers
+
+        Args:
+            relation: ThreadUserRelation
+        """
+        cls._send(
+            cls.get_thread_group(relation.thread_id),
+            {
+                "type": "chat.read",
+                "thread": relation.thread_id,
+                "user": relation.user_id,
+                "last_read_message_id": relation.last_read_message_id,
+            },
+        )
+
+    @classmethod
+    def publish_unread_counts(cls, user_ids: Iterable[int]) -> None:
+        """
+        Publish current unread counters to users
+
+        Args:
+            user_ids: Iterable[int]
+        """
+        from apps.chat.models import UserChatState  # pylint: disable=import-outside-toplevel
+
+        states = UserChatState.objects.filter(user_id__in=list(user_ids)).values_list("user_id", "unread_count")
+        cls._send_many(
+            [
+                (cls.get_user_group(user_id), {"type": "chat.unread", "count": unread_count})
+                for user_id, unread_count in states
+            ]
+        )
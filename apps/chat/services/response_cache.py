@@ -0,0 +1,82 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+
+
+class ResponseCacheService:
+    """
+    Serialized API responses under versioned keys
+
+    Keys contain the version stamp of the resource, so writes never delete entries:
+    a bumped version makes the next lookup miss and the old entries expire
+    after `cache_timeout`. Hits and misses are counted in the shared cache.
+    """
+
+    cache_timeout = 5 * 60
+    key_prefix = "chat:response:%s:%s"
+    stats_key_prefix = "chat:response-cache:%s"
+    stats = ("hits", "misses")
+
+    @classmethod
+    def get_key(cls, version: str, uri: str) -> str:
+        """
+        Get cache key of response
+
+        Args:
+            version: str, unique version of the resource, e.g. its ETag
+            uri: str, absolute URI of the request, links of pages depend on it
+        Return:
+            key: str
+        """
+        return cls.key_prefix % (version.strip('"'), hashlib.md5(uri.encode()).hexdigest())
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Any]:
+        """
+        Get cached response data and count the lookup
+
+        Args:
+            key: str
+        Return:
+            data or None on miss
+        """
+        data = cache.get(key)
+        cls._count("misses" if data is None else "hits")
+        return data
+
+    @classmethod
+    def set(cls, key: str, data: Any):
+        """
+        Cache response data
+
+        Args:
+            key: str
+            data: serialized data of response
+        """
+        cache.set(key, data, cls.cache_timeout)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, int]:
+        """
+        Get hit and miss counters
+
+        Return:
+            Dict with `hits` and `misses`
+        """
+        values = cache.get_many([cls.stats_key_prefix % name for name in cls.stats])
+        return {name: int(values.get(cls.stats_key_prefix % name, 0)) for name in cls.stats}
+
+    @classmethod
+    def reset_stats(cls):
+        """Reset hit and miss counters"""
+        cache.delete_many([cls.stats_key_prefix % name for name in cls.stats])
+
+    @classmethod
+    def _count(cls, name: str):
+        """Increment counter, atomic on Redis"""
+        key = cls.stats_key_prefix % name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
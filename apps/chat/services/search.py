@@ -0,0 +1,271 @@
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from apps.chat.models import Message
+
+if TYPE_CHECKING:
+    from django.contrib.auth.models import User
+
+# (score, message id), lower score is a better match
+Position = Tuple[float, int]
+
+
+class SearchBackend:
+    """
+    Full-text index of message text
+
+    Backends rank matches by a score where lower is better, so a page of results
+    is ordered by `(score, id)` and the last row of a page is the cursor of the next one.
+    Only the newest `max_candidates` matches are ranked, which bounds the cost
+    of frequent words regardless of the table size.
+    """
+
+    vendor: str
+    max_candidates = 1000
+
+    def install(self, schema_editor):
+        """Create index structures"""
+        raise NotImplementedError
+
+    def uninstall(self, schema_editor):
+        """Drop index structures"""
+        raise NotImplementedError
+
+    def index(self, message: Message):
+        """Add new message to index"""
+        self.index_many([message])
+
+    def index_many(self, messages: List[Message]):
+        """Add new messages to index"""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Index every stored message"""
+        raise NotImplementedError
+
+    def get_query(self, text: str) -> Optional[str]:
+        """Convert user input to backend query, None when nothing can match"""
+        raise NotImplementedError
+
+    def get_sql(self) -> str:
+        """
+        SQL of one page, parameters are user id, query, candidates, position and limit
+
+        Columns of the result are message id and score.
+        """
+        raise NotImplementedError
+
+    def search(self, user_id: int, text: str, after: Optional[Position], limit: int) -> List[Position]:
+        """
+        Run search
+
+        Args:
+            user_id: int, only threads of this user are searched
+            text: str
+            after: Position of the last row of the previous page or None
+            limit: int
+        Return:
+            List of (score, message id)
+        """
+        query = self.get_query(text)
+        if query is None:
+            return []
+        score, pk = after if after is not None else (float("-inf"), 0)
+        with connection.cursor() as cursor:
+            cursor.execute(self.get_sql(), [user_id, query, self.max_candidates, score, score, pk, limit])
+            return [(row_score, row_id) for row_id, row_score in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Generated `tsvector` column with GIN index
+
+    The column is computed by PostgreSQL in the INSERT of the message,
+    so the index never lags behind the table.
+    """
+
+    vendor = "postgresql"
+    config = "simple"
+
+    def install(self, schema_editor):
+        """Create index structures"""
+        schema_editor.execute(
+            "ALTER TABLE chat_message ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('%s'::regconfig, text)) STORED" % self.config
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS chat_message_search_idx ON chat_message USING GIN (search_vector)"
+        )
+
+    def uninstall(self, schema_editor):
+        """Drop index structures"""
+        schema_editor.execute("DROP INDEX IF EXISTS chat_message_search_idx")
+        schema_editor.execute("ALTER TABLE chat_message DROP COLUMN IF EXISTS search_vector")
+
+    def index_many(self, messages: List[Message]):
+        """Generated column is filled by the INSERT itself"""
+
+    def rebuild(self):
+        """Generated column is always up to date"""
+
+    def get_query(self, text: str) -> Optional[str]:
+        """Plain text is parsed by `plainto_tsquery`"""
+        return text.strip() or None
+
+    def get_sql(self) -> str:
+        """SQL of one page"""
+        return """
+            SELECT id, score FROM (
+                SELECT m.id, -ts_rank(m.search_vector, q.query) AS score
+                FROM chat_message m
+                JOIN chat_threaduserrelation r ON r.thread_id = m.thread_id AND r.user_id = %%s
+                CROSS JOIN plainto_tsquery('%s'::regconfig, %%s) AS q(query)
+                WHERE m.search_vector @@ q.query
+                ORDER BY m.id DESC
+                LIMIT %%s
+            ) AS matches
+            WHERE score > %%s OR (score = %%s AND id > %%s)
+            ORDER BY score, id
+            LIMIT %%s
+        """ % self.config
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    FTS5 external content table over `chat_message`
+
+    Rows of deleted messages stay in the index until `rebuild`,
+    they are dropped by the join with the message table.
+    """
+
+    vendor = "sqlite"
+    table = "chat_message_fts"
+    token_re = re.compile(r"\w+", re.UNICODE)
+
+    def install(self, schema_editor):
+        """Create index structures"""
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(text, content='chat_message', content_rowid='id')"
+            % self.table
+        )
+        schema_editor.execute("INSERT INTO %s (%s) VALUES ('rebuild')" % (self.table, self.table))
+
+    def uninstall(self, schema_editor):
+        """Drop index structures"""
+        schema_editor.execute("DROP TABLE IF EXISTS %s" % self.table)
+
+    def index_many(self, messages: List[Message]):
+        """Add new messages to index"""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO %s (rowid, text) VALUES (%%s, %%s)" % self.table,
+                [(message.id, message.text) for message in messages],
+            )
+
+    def rebuild(self):
+        """Index every stored message"""
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO %s (%s) VALUES ('rebuild')" % (self.table, self.table))
+
+    def get_query(self, text: str) -> Optional[str]:
+        """Every word is quoted, so user input cannot use FTS5 query syntax"""
+        tokens = self.token_re.findall(text)
+        if not tokens:
+            return None
+        return " ".join('"%s"' % token for token in tokens)
+
+    def get_sql(self) -> str:
+        """SQL of one page"""
+        return """
+            SELECT id, score FROM (
+                SELECT m.id, bm25({table}) AS score
+                FROM {table} f
+                JOIN chat_message m ON m.id = f.rowid
+                JOIN chat_threaduserrelation r ON r.thread_id = m.thread_id AND r.user_id = %s
+                WHERE {table} MATCH %s
+                ORDER BY f.rowid DESC
+                LIMIT %s
+            )
+            WHERE score > %s OR (score = %s AND id > %s)
+            ORDER BY score, id
+            LIMIT %s
+        """.format(table=self.table)
+
+
+class MessageSearch:
+    """Search of one user, paginated by `SearchCursorPagination`"""
+
+    def __init__(self, backend: SearchBackend, user: "User", text: str):
+        self.backend = backend
+        self.user = user
+        self.text = text
+
+    def fetch(self, after: Optional[Position], limit: int) -> List[Tuple[float, Message]]:
+        """
+        Fetch one page of matches
+
+        Ranking runs on the index only, messages of the page are loaded by primary key.
+        Return:
+            List of (score, message)
+        """
+        positions = self.backend.search(self.user.pk, self.text, after, limit)
+        messages: Dict[int, Message] = Message.objects.select_related("sender").in_bulk([pk for _, pk in positions])
+        return [(score, messages[pk]) for score, pk in positions if pk in messages]
+
+
+class SearchService:
+    """Message search service"""
+
+    backends = {backend.vendor: backend for backend in (PostgresSearchBackend(), SQLiteSearchBackend())}
+
+    @classmethod
+    def get_backend(cls, vendor: Optional[str] = None) -> SearchBackend:
+        """
+        Get backend of database
+
+        Args:
+            vendor: str, vendor of the default connection when omitted
+        Return:
+            SearchBackend
+        """
+        vendor = vendor or connection.vendor
+        try:
+            return cls.backends[vendor]
+        except KeyError:
+            raise ImproperlyConfigured("Message search does not support %s database" % vendor)
+
+    @classmethod
+    def index(cls, message: Message):
+        """
+        Add new message to index
+
+        Args:
+            message: Message
+        """
+        cls.get_backend().index(message)
+
+    @classmethod
+    def index_many(cls, messages: List[Message]):
+        """
+        Add new messages to index
+
+        Args:
+            messages: List[Message] with primary keys
+        """
+        cls.get_backend().index_many(messages)
+
+    @classmethod
+    def search(cls, user: "User", text: str) -> MessageSearch:
+        """
+        Search messages of user threads
+
+        Args:
+            user: User
+            text: str
+        Return:
+            MessageSearch
+        """
+        return MessageSearch(cls.get_backend(), user, text)
@@ -1,25 +1,20 @@
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 
 from django.db import transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Left
 
-from apps.chat.models import Thread, ThreadUserRelation
+from apps.chat.models import Message, Thread, ThreadUserRelation, UserChatState
+from apps.chat.services.membership import MembershipService
+from apps.chat.services.realtime import RealtimeService
+from apps.chat.services.version import VersionService
 
 if TYPE_CHECKING:
     from django.contrib.auth.models import User
 
 
 class ThreadService:
-
-    @classmethod
-    def _create(cls) -> Thread:
-        """
-        Main Create thread
-
-        Return:
-            thread: Thread
-        """
-
-        return Thread.objects.create()
+    preview_length = 100
 
     @classmethod
     @transaction.atomic
@@ -27,6 +22,9 @@ class ThreadService:
         """
         Create thread
 
+        Lookup and insert go through the unique participant pair,
+        so concurrent requests cannot create duplicate threads.
+
         Args:
             participant: User
             user: User
@@ -34,33 +32,67 @@ class ThreadService:
         Return:
             Tuple(Thread, bool)
         """
-        thread = cls.get_one_thread_with_participant(user, participant)
-        created = False
-        if thread is None:
-            created = True
-            thread = cls._create()
-            cls._add_participant(thread, participant)
-            cls._add_participant(thread, user)
+        min_user_id, max_user_id = cls.get_participants_key(user, participant)
+        thread, created = Thread.objects.get_or_create(min_user_id=min_user_id, max_user_id=max_user_id)
+        if created:
+            cls._add_participants(thread, [participant, user])
+            user_ids = {participant.pk, user.pk}
+            transaction.on_commit(lambda: RealtimeService.publish_thread(thread, user_ids), robust=True)
         return thread, created
 
     @classmethod
+    @transaction.atomic
     def delete(cls, thread: Thread):
-        """Delete thread"""
+        """
+        Delete thread
+
+        Unread messages of the thread are subtracted from participant totals,
+        thread lists of the participants get a new version.
+        """
+        VersionService.bump_users(ThreadUserRelation.objects.filter(thread=thread).values("user_id"))
+        relations = ThreadUserRelation.objects.filter(thread=thread, unread_count__gt=0)
+        for user_id, unread_count in relations.values_list("user_id", "unread_count"):
+            UserChatState.objects.filter(user_id=user_id, unread_count__gte=unread_count).update(
+                unread_count=F("unread_count") - unread_count
+            )
         thread.delete()
 
     @classmethod
-    def _add_participant(cls, thread: Thread, participant: "User"):
+    def _add_participants(cls, thread: Thread, participants: Iterable["User"]):
         """
-        Add participant to thread
+        Add participants to thread
+
+        Bulk insert sends no signals, so cached membership is dropped here
+        and thread list versions of the participants are bumped.
 
         Args:
             thread: Thread
+            participants: Iterable[User]
+        """
+        user_ids = {participant.pk for participant in participants}
+        ThreadUserRelation.objects.bulk_create([ThreadUserRelation(thread=thread, user_id=pk) for pk in user_ids])
+        UserChatState.objects.bulk_create([UserChatState(user_id=pk) for pk in user_ids], ignore_conflicts=True)
+        VersionService.bump_users(user_ids)
+        MembershipService.invalidate(thread.pk)
+
+    @staticmethod
+    def get_participants_key(user: "User", participant: "User") -> Tuple[int, int]:
+        """
+        Get normalized participant pair of a direct thread
+
+        Args:
+            user: User
             participant: User
+
+        Return:
+            Tuple(min_user_id, max_user_id)
         """
-        ThreadUserRelation.objects.create(thread=thread, user=participant)
+        if user.pk < participant.pk:
+            return user.pk, participant.pk
+        return participant.pk, user.pk
 
     @classmethod
-    def get_one_thread_with_participant(cls, user: "User", participant: "User"):
+    def get_one_thread_with_participant(cls, user: "User", participant: "User") -> Optional[Thread]:
         """
         Get one with participant
 
@@ -68,16 +100,16 @@ class ThreadService:
             user: User
             participant: User
         """
-        return Thread.objects.filter(
-            id__in=ThreadUserRelation.objects.filter(user=participant).values("thread"),
-            participants=user
-        ).distinct().first()
+        min_user_id, max_user_id = cls.get_participants_key(user, participant)
+        return Thread.objects.filter(min_user_id=min_user_id, max_user_id=max_user_id).first()
 
     @classmethod
     def is_participant_of_thread(cls, thread: Thread, user: "User") -> bool:
         """
         Is participant of thread
 
+        Answered from cached membership, no query in the steady state.
+
         Args:
             thread: Thread
             user: User
@@ -85,4 +117,87 @@ class ThreadService:
         Return:
             bool
         """
-        return thread.participants.filter(id=user.id).exists()
+        return MembershipService.is_participant(thread.pk, user.pk)
+
+    @classmethod
+    def get_thread_ids(cls, user: "User") -> List[int]:
+        """
+        Get ids of threads where user is participant
+
+        Args:
+            user: User
+
+        Return:
+            List[int]
+        """
+        return list(ThreadUserRelation.objects.filter(user=user).values_list("thread_id", flat=True))
+
+    @classmethod
+    def get_inbox(cls, user: "User") -> "QuerySet[ThreadUserRelation]":
+        """
+        Get inbox of user
+
+        Every thread relation of the user is annotated with the other participant
+        by a correlated subquery and with the denormalized last message of the thread,
+        so a page of the inbox is a single query. The order is the activity denormalized
+        onto the relation, a range scan of `relation_user_activity_idx`.
+
+        Args:
+            user: User
+
+        Return:
+            QuerySet[ThreadUserRelation] ordered by last activity
+        """
+        participant = ThreadUserRelation.objects.filter(thread=OuterRef("thread")).exclude(user=user)
+        return (
+            ThreadUserRelation.objects.filter(user=user)
+            .annotate(
+                participant_id=Subquery(participant.values("user_id")[:1]),
+                participant_name=Subquery(
+                    participant.annotate(
+                        name=Concat("user__first_name", Value(" "), "user__last_name")
+                    ).values("name")[:1]
+                ),
+                last_message_id=F("thread__last_message_id"),
+                last_message_text=Left("thread__last_message__text", cls.preview_length),
+                last_message_sender_id=F("thread__last_message__sender_id"),
+                last_message_created=F("thread__last_message_at"),
+                last_activity=F("last_activity_at"),
+            )
+            .order_by("-last_activity_at", "-thread_id")
+        )
+
+    @classmethod
+    def backfill_activity(cls, batch_size: int = 1000) -> int:
+        """
+        Recalculate last message, message count and inbox activity of every thread from messages
+
+        Threads are updated in primary key batches, so the command can be
+        stopped and rerun on a live database.
+
+        Args:
+            batch_size: int
+
+        Return:
+            count of updated threads
+        """
+        messages = Message.objects.filter(thread=OuterRef("pk"))
+        last_message = messages.order_by("-created", "-id")[:1]
+        message_count = messages.order_by().values("thread").annotate(count=Count("id")).values("count")
+        activity = Thread.objects.filter(pk=OuterRef("thread_id")).values(
+            last_activity=Coalesce("last_message_at", "created")
+        )
+        updated, last_id = 0, 0
+        while True:
+            ids = list(
+                Thread.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return updated
+            updated += Thread.objects.filter(pk__in=ids).update(
+                last_message=Subquery(last_message.values("id")),
+                last_message_at=Subquery(last_message.values("created")),
+                message_count=Coalesce(Subquery(message_count), 0),
+            )
+            ThreadUserRelation.objects.filter(thread_id__in=ids).update(last_activity_at=Subquery(activity))
+            last_id = ids[-1]
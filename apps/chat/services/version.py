@@ -0,0 +1,74 @@
+from typing import Any, Dict, Iterable
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from apps.chat.models import Thread, UserChatState
+
+
+class VersionService:
+    """
+    Version stamps of chat resources
+
+    `Thread.version` changes with the message list of the thread, `UserChatState.version`
+    with the thread list of the user. Stamps are bumped in the same statements which
+    change the resources, so validators of a response never outlive its content.
+    """
+
+    @classmethod
+    def get_bump(cls) -> Dict[str, Any]:
+        """
+        Update values bumping a version stamp
+
+        Return:
+            Dict of `update()` keyword arguments
+        """
+        return {"version": F("version") + 1, "versioned_at": timezone.now()}
+
+    @classmethod
+    def bump_threads(cls, thread_ids: Iterable[int]):
+        """
+        Bump version of threads
+
+        Args:
+            thread_ids: Iterable[int]
+        """
+        Thread.objects.filter(pk__in=thread_ids).update(**cls.get_bump())
+
+    @classmethod
+    def bump_users(cls, user_ids: Iterable[int]):
+        """
+        Bump version of thread lists of users
+
+        Args:
+            user_ids: Iterable[int]
+        """
+        UserChatState.objects.filter(user_id__in=user_ids).update(**cls.get_bump())
+
+    @classmethod
+    def get_thread_etag(cls, thread: Thread) -> str:
+        """
+        Get ETag of the message list of thread, read from the loaded thread
+
+        Only the ETag is a validator, `versioned_at` has whole second precision
+        in `Last-Modified` and would miss changes within the same second.
+        Args:
+            thread: Thread
+        Return:
+            ETag: str
+        """
+        return quote_etag("thread-%s-%s" % (thread.pk, thread.version))
+
+    @classmethod
+    def get_user_etag(cls, user_id: int) -> str:
+        """
+        Get ETag of the thread list of user, one primary key lookup
+
+        Args:
+            user_id: int
+        Return:
+            ETag: str
+        """
+        version = UserChatState.objects.filter(user_id=user_id).values_list("version", flat=True).first() or 0
+        return quote_etag("user-threads-%s-%s" % (user_id, version))
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.chat.models import ThreadUserRelation
+from apps.chat.services.membership import MembershipService
+
+
+@receiver(post_save, sender=ThreadUserRelation)
+@receiver(post_delete, sender=ThreadUserRelation)
+def invalidate_thread_membership(sender, instance: ThreadUserRelation, **kwargs):
+    """Drop cached participants when membership of thread changes"""
+    MembershipService.invalidate(instance.thread_id)
@@ -0,0 +1,74 @@
+from rest_framework import serializers
+from drf_spectacular.utils import OpenApiExample, inline_serializer
+
+from apps.core.api.serializers import BatchSerializer
+from apps.utils import SwaggerWrapper
+
+
+class BatchSwagger(SwaggerWrapper):
+    """Batch Documentation"""
+
+    summary = "Batch"
+    description = (
+        "Execute up to 20 chat requests in one round trip. Sub-requests run in order with the user "
+        "of the batch and share a budget of database queries. With `atomic` the first failed "
+        "sub-request rolls back the whole batch and the rest are not executed, otherwise every "
+        "sub-request is committed or rolled back on its own. `committed` is true only when every "
+        "sub-request succeeded, check `status` of every response otherwise. Long polling and streaming "
+        "endpoints cannot be batched."
+    )
+    tags = ["Batch"]
+
+    responses = {
+        "200": BatchSerializer(),
+        "400": BatchSerializer(),
+        "401": inline_serializer(name="Authorization Error", fields={'detail': serializers.CharField()}),
+    }
+    request = BatchSerializer()
+
+    examples = [
+        OpenApiExample(
+            name="Success",
+            value={
+                "atomic": False,
+                "requests": [
+                    {"method": "GET", "path": "/api/v1/chat/message/user/unread/"},
+                    {"method": "GET", "path": "/api/v1/chat/thread/1/message/?cursor=&limit=20"},
+                    {"method": "POST", "path": "/api/v1/chat/thread/1/read/", "body": {"message": 15}},
+                ]
+            },
+            summary="Example",
+            description="Success example",
+            request_only=True,
+        ),
+        OpenApiExample(
+            name="Success",
+            summary="Example",
+            description="Success example",
+            value={
+                "committed": True,
+                "responses": [
+                    {"status": 200, "body": {"count": 3}},
+                    {"status": 200, "body": {"next": None, "results": []}},
+                    {
+                        "status": 200,
+                        "body": {
+                            "last_read_message_id": 15,
+                            "last_read_at": "2024-04-05T13:18:33.198295+03:00",
+                            "unread_count": 0
+                        }
+                    },
+                ]
+            },
+            response_only=True,
+            status_codes=["200"]
+        ),
+        OpenApiExample(
+            name="Validation Error",
+            value={"requests": ["Ensure this field has no more than 20 elements."]},
+            summary="Validation error",
+            description="Errors",
+            response_only=True,
+            status_codes=["400"]
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import transaction
+
+
+class NonAtomicRequestsMixin:
+    """
+    Run requests of the view in autocommit even with `ATOMIC_REQUESTS`
+
+    For views that only read, or whose writes are atomic in the service layer:
+    reads skip BEGIN/COMMIT and do not hold a transaction snapshot for the whole request.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """View function excluded from `ATOMIC_REQUESTS`"""
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
@@ -0,0 +1,82 @@
+import math
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson
+
+    Output is byte-for-byte the output of `JSONRenderer`: types orjson does not
+    serialize the same way (datetimes, lazy strings, querysets) go through
+    the DRF encoder, and U+2028/U+2029 are escaped. Indented output, ASCII output
+    and payloads orjson renders differently are rendered by `JSONRenderer`, as is
+    everything when orjson is not installed. Those are payloads with integers beyond
+    64 bits, Decimals, floats Python writes in exponent form (below 1e-4 or from 1e16,
+    orjson writes `0.00001` and `1e16` for `1e-05` and `1e+16`) and NaN or infinity,
+    which orjson writes as `null` where `JSONRenderer` raises ValueError.
+    """
+
+    encoder = JSONEncoder()
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if orjson
+        else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        """Render `data` into JSON, returning a bytestring"""
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or self.ensure_ascii or not self.compact or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.has_foreign_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+    def default(self, obj):
+        """Serialize types unknown to orjson by the DRF encoder, Decimals are left to `JSONRenderer`"""
+        if isinstance(obj, Decimal):
+            raise TypeError("Decimal is rendered by JSONRenderer")
+        return self.encoder.default(obj)
+
+    @classmethod
+    def has_foreign_float(cls, data) -> bool:
+        """
+        Find floats orjson writes unlike `json` in nested dicts, lists and tuples
+
+        Exact type checks of the common scalars come first, they keep the walk
+        a fraction of the `json` encoding cost.
+        """
+        if not isinstance(data, (dict, list, tuple)):
+            return type(data) is float and cls.is_foreign_float(data)
+        stack = [data]
+        while stack:
+            value = stack.pop()
+            for item in value.values() if isinstance(value, dict) else value:
+                item_type = type(item)
+                if item_type is str or item_type is int or item_type is bool or item is None:
+                    continue
+                if item_type is float:
+                    if cls.is_foreign_float(item):
+                        return True
+                elif isinstance(item, (dict, list, tuple)):
+                    stack.append(item)
+        return False
+
+    @staticmethod
+    def is_foreign_float(value: float) -> bool:
+        """NaN, infinity and floats `json` writes in exponent form"""
+        return not math.isfinite(value) or 0 < abs(value) < 1e-4 or abs(value) >= 1e16
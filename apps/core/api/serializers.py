@@ -0,0 +1,27 @@
+from rest_framework import serializers
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Sub-request of batch"""
+
+    method = serializers.ChoiceField(choices=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False)
+
+
+class BatchResponseItemSerializer(serializers.Serializer):
+    """Response of sub-request"""
+
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Batch serializer"""
+
+    max_requests = 20
+
+    requests = BatchItemSerializer(many=True, write_only=True, min_length=1, max_length=max_requests)
+    atomic = serializers.BooleanField(default=False, write_only=True)
+    committed = serializers.BooleanField(read_only=True)
+    responses = BatchResponseItemSerializer(many=True, read_only=True)
@@ -0,0 +1,31 @@
+from rest_framework import status
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from apps.core.api.docs import BatchSwagger
+from apps.core.api.mixins import NonAtomicRequestsMixin
+from apps.core.api.serializers import BatchSerializer
+from apps.core.services import BatchService
+
+
+class BatchAPIView(NonAtomicRequestsMixin, GenericAPIView):
+    """
+    Endpoint for batch
+
+    Method post - execute several chat requests in one round trip,
+    transactions of sub-requests are managed by `BatchService`
+    """
+    serializer_class = BatchSerializer
+    permission_classes = [IsAuthenticated]
+    service_class = BatchService
+
+    @BatchSwagger.extend_schema
+    def post(self, request, *args, **kwargs):
+        """Post method"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = self.service_class.execute(
+            request, serializer.validated_data["requests"], atomic=serializer.validated_data["atomic"]
+        )
+        return Response(self.get_serializer(result).data, status=status.HTTP_200_OK)
@@ -0,0 +1,105 @@
+"""
+PostgreSQL backend with a psycopg 3 connection pool per process
+
+Backport of `OPTIONS["pool"]` of Django 5.1: `True` or keyword arguments of
+`psycopg_pool.ConnectionPool` (`min_size`, `max_size`, `timeout`, `max_idle`, ...).
+Connections are checked out when Django connects and returned when it closes them,
+so `CONN_MAX_AGE` must be 0; `CONN_HEALTH_CHECKS` makes the pool check connections
+before handing them out. Without the option it is the stock backend.
+"""
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+from django.utils.asyncio import async_unsafe
+
+from apps.core.services.pool_stats import PoolStatsService
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL database wrapper checking connections out of a pool"""
+
+    _connection_pools = {}
+    _connection_pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Pool of the alias, created on first use, None when pooling is off"""
+        pool_options = self.settings_dict["OPTIONS"].get("pool")
+        if self.alias == NO_DB_ALIAS or not pool_options:
+            return None
+        if self.alias not in self._connection_pools:
+            if self.settings_dict["CONN_MAX_AGE"] != 0:
+                raise ImproperlyConfigured("Pooling doesn't support persistent connections, set CONN_MAX_AGE to 0.")
+            if not is_psycopg3:
+                raise ImproperlyConfigured("Pooling requires psycopg >= 3.")
+            from psycopg_pool import ConnectionPool
+
+            connect_kwargs = self.get_connection_params()
+            # Connections are idle in the pool, Django sets autocommit after checkout
+            connect_kwargs["autocommit"] = True
+            pool = ConnectionPool(
+                kwargs=connect_kwargs,
+                open=False,
+                check=ConnectionPool.check_connection if self.settings_dict["CONN_HEALTH_CHECKS"] else None,
+                name="%s-%s" % (self.alias, self.settings_dict["NAME"]),
+                **({} if pool_options is True else pool_options),
+            )
+            with self._connection_pools_lock:
+                self._connection_pools.setdefault(self.alias, pool)
+        return self._connection_pools[self.alias]
+
+    def close_pool(self):
+        """Close pool of the alias, e.g. when settings change in tests"""
+        pool = self._connection_pools.pop(self.alias, None)
+        if pool is not None:
+            pool.close()
+
+    def get_connection_params(self):
+        """Connection parameters without the pool options"""
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        """Check connection out of the pool, counting the wait"""
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        from psycopg_pool import PoolTimeout
+
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        try:
+            self.isolation_level = IsolationLevel(
+                IsolationLevel.READ_COMMITTED if isolation_level is None else isolation_level
+            )
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {isolation_level} "
+                f"specified. Use one of the psycopg.IsolationLevel values."
+            )
+        # Opens the pool on first checkout of the process, after the server forked its workers
+        pool.open()
+        start = time.perf_counter()
+        try:
+            connection = pool.getconn()
+        except PoolTimeout:
+            PoolStatsService.record(self.alias, time.perf_counter() - start, timeout=True)
+            raise
+        PoolStatsService.record(self.alias, time.perf_counter() - start)
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        """Return connection to the pool instead of closing it"""
+        if self.connection is None or self.pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # The pool that handed the connection out, it may have been replaced since
+            self.connection._pool.putconn(self.connection)
+            self.connection = None
@@ -0,0 +1,104 @@
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from apps.utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_read_alias: ContextVar[Optional[str]] = ContextVar("read_alias", default=None)
+
+
+@contextmanager
+def use_replica(alias: Optional[str]) -> Iterator[None]:
+    """
+    Route reads of the current context to one database, None for the primary
+
+    Every read of the context goes to the same replica, so rows of one request agree
+    with each other. Contexts are copied into `sync_to_async` threads, so reads of async views follow it too.
+    """
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Route reads to read replicas
+
+    Reads go to the replica chosen for the request by `choose_replica()` inside `use_replica()`,
+    everything else goes to the primary. Lag of every replica is checked at most once
+    per `lag_check_interval` seconds, replicas lagging more than `DATABASE_REPLICA_MAX_LAG`
+    seconds or failing the check are skipped and reads fall back to the primary.
+    """
+
+    lag_check_interval = 5
+    lag_cache = LRUCache(maxsize=64, ttl=lag_check_interval)
+    # Zero while the replica has replayed everything it received, so an idle primary is not reported as lag
+    postgresql_lag_sql = (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    )
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        """Get database of reads, the replica of `use_replica()`"""
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints) -> str:
+        """Writes always go to the primary"""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        """Replicas hold the same data as the primary"""
+        return True
+
+    @classmethod
+    def choose_replica(cls) -> Optional[str]:
+        """Get random replica lagging no more than allowed, None when every replica lags"""
+        replicas = cls.get_available_replicas()
+        return random.choice(replicas) if replicas else None
+
+    @classmethod
+    def get_available_replicas(cls) -> List[str]:
+        """Get replicas lagging no more than allowed"""
+        return [
+            alias for alias in settings.DATABASE_REPLICAS if cls.get_lag(alias) <= settings.DATABASE_REPLICA_MAX_LAG
+        ]
+
+    @classmethod
+    def get_lag(cls, alias: str) -> float:
+        """
+        Get replication lag of replica
+
+        Args:
+            alias: str, database alias
+        Return:
+            lag in seconds, infinite when the replica cannot be checked
+        """
+        lag = cls.lag_cache.get(alias)
+        if lag is None:
+            try:
+                lag = cls.check_lag(alias)
+            except DatabaseError:
+                logger.warning("Replica %s is unavailable, reads fall back to the primary", alias, exc_info=True)
+                lag = float("inf")
+            cls.lag_cache.set(alias, lag)
+        return lag
+
+    @classmethod
+    def check_lag(cls, alias: str) -> float:
+        """Query replication lag, only PostgreSQL replicas report it"""
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(cls.postgresql_lag_sql)
+            (lag,) = cursor.fetchone()
+        return float(lag or 0)
@@ -0,0 +1,133 @@
+import hashlib
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+from django.middleware import common, csrf, locale
+
+from apps.core.db.routers import ReplicaRouter, use_replica
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send reads of safe requests to replicas, with read-your-writes
+
+    A successful unsafe request pins its client to the primary for `DATABASE_REPLICA_PIN_SECONDS`,
+    so the following reads see the write even if replicas lag. Clients are identified by
+    their credential, the `Authorization` header, the `token` query parameter or the session.
+    The pin is kept in the shared cache to be seen by every process.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+    key_prefix = "core:primary-pin:%s"
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with use_replica(self.get_read_alias(request)):
+            response = self.get_response(request)
+        self.process_response(request, response)
+        return response
+
+    async def __acall__(self, request: HttpRequest):
+        with use_replica(await sync_to_async(self.get_read_alias)(request)):
+            response = await self.get_response(request)
+        await sync_to_async(self.process_response)(request, response)
+        return response
+
+    def get_read_alias(self, request: HttpRequest) -> Optional[str]:
+        """Get replica serving every read of the request, None for the primary"""
+        return ReplicaRouter.choose_replica() if self.is_replica_allowed(request) else None
+
+    def is_replica_allowed(self, request: HttpRequest) -> bool:
+        """Safe request of a client not pinned to the primary"""
+        if request.method not in self.safe_methods:
+            return False
+        key = self.get_key(request)
+        return key is None or cache.get(key) is None
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> None:
+        """Pin client to the primary after a successful write"""
+        if request.method in self.safe_methods or response.status_code >= 400:
+            return
+        key = self.get_key(request)
+        if key is not None:
+            cache.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+    @classmethod
+    def get_key(cls, request: HttpRequest) -> Optional[str]:
+        """Get pin key of the client, None for anonymous clients"""
+        credentials = (
+            request.META.get("HTTP_AUTHORIZATION"),
+            request.GET.get("token"),
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+        )
+        credential = next(filter(None, credentials), None)
+        if not credential:
+            return None
+        return cls.key_prefix % hashlib.sha256(credential.encode()).hexdigest()
+
+
+class APIExemptMiddlewareMixin:
+    """
+    Skip the middleware for API requests
+
+    The API authenticates with JWT, never with cookies, so sessions, CSRF and messages
+    protect the admin only, and English is the only language. API requests go straight
+    to the next middleware.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.api_path_prefix = settings.API_PATH_PREFIX
+
+    def __call__(self, request: HttpRequest):
+        if request.path_info.startswith(self.api_path_prefix):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(APIExemptMiddlewareMixin, sessions_middleware.SessionMiddleware):
+    """Sessions outside of the API"""
+
+
+class LocaleMiddleware(APIExemptMiddlewareMixin, locale.LocaleMiddleware):
+    """Language negotiation outside of the API"""
+
+
+class CsrfViewMiddleware(APIExemptMiddlewareMixin, csrf.CsrfViewMiddleware):
+    """CSRF protection outside of the API, views of the API are CSRF exempt"""
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        """Check the token of requests outside of the API"""
+        if request.path_info.startswith(self.api_path_prefix):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(APIExemptMiddlewareMixin, auth_middleware.AuthenticationMiddleware):
+    """Session user outside of the API, DRF authenticates API requests"""
+
+
+class MessageMiddleware(APIExemptMiddlewareMixin, messages_middleware.MessageMiddleware):
+    """Messages framework outside of the API"""
+
+
+class BrokenLinkEmailsMiddleware(APIExemptMiddlewareMixin, common.BrokenLinkEmailsMiddleware):
+    """Broken link emails outside of the API"""
@@ -0,0 +1,5 @@
+from .batch import BatchService
+
+__all__ = [
+    "BatchService"
+]
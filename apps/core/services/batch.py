@@ -0,0 +1,174 @@
+import asyncio
+import io
+import json
+import logging
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from django.db import connection, transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBudgetExceeded(APIException):
+    """Batch used more database queries than allowed"""
+
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "Batch query budget exceeded."
+    default_code = "batch_budget_exceeded"
+
+
+class QueryBudget:
+    """`connection.execute_wrapper` failing queries above the budget"""
+
+    transaction_statements = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.used = 0
+
+    @property
+    def exceeded(self) -> bool:
+        """Is budget exhausted"""
+        return self.used >= self.max_queries
+
+    def __call__(self, execute, sql, params, many, context):
+        # Transaction control of the batch itself is never refused
+        if sql.startswith(self.transaction_statements):
+            return execute(sql, params, many, context)
+        if self.exceeded:
+            raise BatchBudgetExceeded()
+        self.used += 1
+        return execute(sql, params, many, context)
+
+
+class BatchService:
+    """
+    Execute sub-requests in-process
+
+    Every sub-request is dispatched to the resolved view with the user of the batch,
+    on the same database connection. In atomic mode the batch is one transaction,
+    which is rolled back by the first failed sub-request, otherwise every
+    sub-request is rolled back on its own failure.
+    """
+
+    allowed_prefix = "/api/v1/chat/"
+    max_queries = 200
+
+    @classmethod
+    def execute(cls, request: HttpRequest, items: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+        """
+        Execute sub-requests
+
+        Args:
+            request: HttpRequest of the batch, authenticated
+            items: List of dicts with `method`, `path` and optional `body`
+            atomic: bool
+        Return:
+            Dict with `responses` of `status` and `body`, and `committed`,
+            true only when every sub-request succeeded and is committed
+        """
+        budget = QueryBudget(cls.max_queries)
+        responses: List[Dict[str, Any]] = []
+        failed = False
+        with ExitStack() as stack:
+            stack.enter_context(connection.execute_wrapper(budget))
+            if atomic:
+                stack.enter_context(transaction.atomic())
+            for item in items:
+                if failed or budget.exceeded:
+                    responses.append(cls._skipped(budget))
+                    continue
+                response = cls._execute_one(request, item, atomic)
+                responses.append(response)
+                if atomic and response["status"] >= status.HTTP_400_BAD_REQUEST:
+                    failed = True
+                    transaction.set_rollback(True)
+        committed = all(response["status"] < status.HTTP_400_BAD_REQUEST for response in responses)
+        return {"committed": committed, "responses": responses}
+
+    @classmethod
+    def _execute_one(cls, request: HttpRequest, item: Dict[str, Any], atomic: bool) -> Dict[str, Any]:
+        """Execute one sub-request"""
+        url = urlsplit(item["path"])
+        if not url.path.startswith(cls.allowed_prefix):
+            return cls._error(status.HTTP_400_BAD_REQUEST, "Only %s endpoints can be batched." % cls.allowed_prefix)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return cls._error(status.HTTP_404_NOT_FOUND, "Not found.")
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = getattr(view, "sync_view", None)
+            if view is None:
+                return cls._error(status.HTTP_400_BAD_REQUEST, "Endpoint cannot be batched.")
+
+        sub_request = cls._build_request(request, item["method"], url.path, url.query, item.get("body"))
+        sub_request.resolver_match = match
+        try:
+            if atomic:
+                response = view(sub_request, *match.args, **match.kwargs)
+            else:
+                with transaction.atomic():
+                    response = view(sub_request, *match.args, **match.kwargs)
+                    if response.status_code >= status.HTTP_400_BAD_REQUEST:
+                        transaction.set_rollback(True)
+        except BatchBudgetExceeded as exc:
+            return cls._error(exc.status_code, exc.detail)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Batch sub-request %s %s failed", item["method"], item["path"])
+            return cls._error(status.HTTP_500_INTERNAL_SERVER_ERROR, "Server error.")
+        if response.streaming:
+            return cls._error(status.HTTP_400_BAD_REQUEST, "Streaming endpoints cannot be batched.")
+        return {"status": response.status_code, "body": getattr(response, "data", None)}
+
+    @staticmethod
+    def _build_request(
+        request: HttpRequest, method: str, path: str, query: str, body: Optional[Any]
+    ) -> HttpRequest:
+        """
+        Build sub-request sharing the user of the batch
+
+        DRF authenticates a request with `_force_auth_user` without parsing the token again.
+        """
+        content = json.dumps(body, cls=JSONEncoder).encode() if body is not None else b""
+        sub_request = HttpRequest()
+        sub_request.method = method
+        sub_request.path = sub_request.path_info = path
+        sub_request.META = {
+            **{
+                key: value
+                for key, value in request.META.items()
+                if not key.startswith(("CONTENT_", "HTTP_ACCEPT", "HTTP_IF_", "wsgi."))
+            },
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(content)),
+        }
+        sub_request.GET = QueryDict(query)
+        sub_request._stream = io.BytesIO(content)  # pylint: disable=protected-access
+        sub_request._read_started = False  # pylint: disable=protected-access
+        sub_request.user = request.user
+        sub_request._force_auth_user = request.user  # pylint: disable=protected-access
+        sub_request._force_auth_token = getattr(request, "auth", None)  # pylint: disable=protected-access
+        return sub_request
+
+    @staticmethod
+    def _error(status_code: int, detail: Any) -> Dict[str, Any]:
+        """Error response of sub-request"""
+        return {"status": status_code, "body": {"detail": detail}}
+
+    @classmethod
+    def _skipped(cls, budget: QueryBudget) -> Dict[str, Any]:
+        """Response of sub-request which was not executed"""
+        if budget.exceeded:
+            return cls._error(BatchBudgetExceeded.status_code, BatchBudgetExceeded.default_detail)
+        return cls._error(status.HTTP_424_FAILED_DEPENDENCY, "Not executed, previous sub-request failed.")
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsService:
+    """
+    Checkout wait of pooled database connections
+
+    Checkouts are counted in memory and added to counters in the shared cache at most
+    once per `flush_interval` seconds, so every process of the deployment is summed up
+    without a cache round trip per request.
+    """
+
+    flush_interval = 10
+    slow_checkout = 0.05
+    stats_key_prefix = "core:db-pool:%s:%s"
+    stats = ("checkouts", "slow", "timeouts", "wait_us")
+
+    _lock = threading.Lock()
+    _pending: Dict[str, Counter] = {}
+    _flushed_at = 0.0
+
+    @classmethod
+    def record(cls, alias: str, wait: float, timeout: bool = False):
+        """
+        Count checkout
+
+        Args:
+            alias: str, database alias
+            wait: float, seconds spent waiting for the connection
+            timeout: bool, no connection became available in time
+        """
+        slow = wait >= cls.slow_checkout
+        if slow:
+            logger.warning("Waited %.0f ms for a %s database connection", wait * 1000, alias)
+        with cls._lock:
+            counter = cls._pending.setdefault(alias, Counter())
+            counter.update(checkouts=1, slow=int(slow), timeouts=int(timeout), wait_us=int(wait * 1_000_000))
+            if time.monotonic() - cls._flushed_at < cls.flush_interval:
+                return
+            cls._flushed_at = time.monotonic()
+            pending, cls._pending = cls._pending, {}
+        cls._flush(pending)
+
+    @classmethod
+    def flush(cls):
+        """Add pending counters to the shared cache"""
+        with cls._lock:
+            cls._flushed_at = time.monotonic()
+            pending, cls._pending = cls._pending, {}
+        cls._flush(pending)
+
+    @classmethod
+    def get_stats(cls, alias: str) -> Dict[str, int]:
+        """
+        Get counters of all processes
+
+        Args:
+            alias: str, database alias
+        Return:
+            Dict with `checkouts`, `slow`, `timeouts` and `wait_us`
+        """
+        keys = {name: cls.stats_key_prefix % (alias, name) for name in cls.stats}
+        values = cache.get_many(keys.values())
+        return {name: int(values.get(key, 0)) for name, key in keys.items()}
+
+    @classmethod
+    def reset_stats(cls, alias: str):
+        """Reset counters of database"""
+        cache.delete_many([cls.stats_key_prefix % (alias, name) for name in cls.stats])
+
+    @classmethod
+    def _flush(cls, pending: Dict[str, Counter]):
+        """Increment shared counters, atomic on Redis"""
+        for alias, counter in pending.items():
+            for name, value in counter.items():
+                if not value:
+                    continue
+                key = cls.stats_key_prefix % (alias, name)
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    cache.add(key, value, timeout=None)
@@ -6,3 +6,7 @@ class UsersConfig(AppConfig):
     name = "apps.users"
     verbose_name = _("Users")
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        """Connect signal receivers and register schema extensions"""
+        from apps.users import schema, signals  # noqa: F401
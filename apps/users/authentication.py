@@ -0,0 +1,178 @@
+import time
+from typing import Optional, Tuple, Union
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.http import HttpRequest
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from apps.utils import LRUCache
+
+UserModel = get_user_model()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without signature verification and user query on every request
+
+    Verified tokens are memoized in a bounded in-process LRU until they expire.
+    Users are resolved from the in-process LRU, then the shared cache, then the database.
+    Only the primary key, `is_active` and the digest of the password hash are cached,
+    other fields of the user are deferred. Saving or deleting a user moves it to a new
+    shared version, other processes pick the change up when their local entry expires,
+    `user_cache.ttl` seconds at most.
+    """
+
+    token_cache = LRUCache(maxsize=10000, ttl=5 * 60)
+    user_cache = LRUCache(maxsize=10000, ttl=10)
+    cache_timeout = 60
+    key_prefix = "users:auth-user:%s:%s"
+    version_key_prefix = "users:auth-user-version:%s"
+
+    def get_validated_token(self, raw_token: bytes) -> Token:
+        """Validate token, verified tokens are reused until they expire"""
+        validated_token = self.token_cache.get(raw_token)
+        if validated_token is not None and validated_token.get("exp", 0) > time.time():
+            return validated_token
+        validated_token = super().get_validated_token(raw_token)
+        self.token_cache.set(raw_token, validated_token)
+        return validated_token
+
+    def get_user(self, validated_token: Token) -> User:
+        """Get user of token, same checks as JWTAuthentication on a cached user"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cached = self.get_cached_user(user_id)
+        if cached is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        user, password_digest = cached
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+    @classmethod
+    def get_cached_user(cls, user_id) -> Optional[Tuple[User, str]]:
+        """
+        Get user by `USER_ID_FIELD` with the digest of its password hash
+
+        Field values are cached rather than instances, every request gets its own instance.
+        Fields other than the primary key and `is_active` are loaded on first access.
+        Args:
+            user_id: value of the user id claim
+        Return:
+            Tuple(user, password digest) or None when missing
+        """
+        values = cls.user_cache.get(user_id)
+        if values is None:
+            values = cls._get_shared_values(user_id)
+            cls.user_cache.set(user_id, values)
+        if not values:
+            return None
+        pk, is_active, password_digest = values
+        user = UserModel.from_db(DEFAULT_DB_ALIAS, [UserModel._meta.pk.attname, "is_active"], (pk, is_active))
+        return user, password_digest
+
+    @classmethod
+    def invalidate(cls, user: User):
+        """
+        Drop cached user
+
+        The user is moved to a new version now and again after commit, so a concurrent
+        request which loaded the old row before the commit caches it under a version
+        nobody reads anymore.
+        Args:
+            user: User
+        """
+        user_id = getattr(user, api_settings.USER_ID_FIELD)
+        cls._bump_version(user_id)
+        transaction.on_commit(lambda: cls._bump_version(user_id))
+
+    @classmethod
+    def _bump_version(cls, user_id):
+        """Move cached user to a new version"""
+        cls.user_cache.delete(user_id)
+        # A clock value never repeats an expired version, the key outlives the entries of older versions
+        cache.set(cls.version_key_prefix % user_id, time.time_ns(), cls.cache_timeout * 2)
+
+    @classmethod
+    def _get_shared_values(cls, user_id) -> Tuple:
+        """Get cached values of the current version, loaded from the database on a miss"""
+        version = cache.get(cls.version_key_prefix % user_id, 0)
+        key = cls.key_prefix % (user_id, version)
+        values = cache.get(key)
+        if values is None:
+            values = cls._get_user_values(user_id)
+            cache.add(key, values, cls.cache_timeout)
+        return values
+
+    @classmethod
+    def _get_user_values(cls, user_id) -> Tuple:
+        """Load primary key, `is_active` and password digest of user from the primary, empty tuple when missing"""
+        row = (
+            UserModel.objects.using(router.db_for_write(UserModel))
+            .filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list(UserModel._meta.pk.attname, "is_active", "password")
+            .first()
+        )
+        if row is None:
+            return ()
+        pk, is_active, password = row
+        return pk, is_active, get_md5_hash_password(password)
+
+
+def get_user_by_token(raw_token: Optional[str]) -> Union[User, AnonymousUser]:
+    """
+    Resolve user from SimpleJWT access token
+
+    Used by transports without DRF request, e.g. WebSocket connections.
+
+    Args:
+        raw_token: str
+    Return:
+        user: User or AnonymousUser when token is missing or invalid
+    """
+    if not raw_token:
+        return AnonymousUser()
+    authentication = CachedJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token.encode())
+        return authentication.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+def get_user_by_request(request: HttpRequest) -> Union[User, AnonymousUser]:
+    """
+    Resolve user of plain Django request
+
+    The token is read from `Authorization` header or `token` query parameter,
+    EventSource and WebSocket clients in browsers cannot set headers.
+
+    Args:
+        request: HttpRequest
+    Return:
+        user: User or AnonymousUser
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token:
+        return get_user_by_token(raw_token.decode())
+    return get_user_by_token(request.GET.get("token"))
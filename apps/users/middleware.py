@@ -0,0 +1,35 @@
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.users.authentication import get_user_by_token
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Populate `scope["user"]` of ASGI connections from SimpleJWT access token
+
+    Browsers cannot set headers on WebSocket handshake,
+    so the token is also accepted in the `token` query parameter.
+    """
+
+    token_query_param = "token"
+
+    async def __call__(self, scope, receive, send):
+        """Authenticate connection"""
+        scope = dict(scope)
+        scope["user"] = await database_sync_to_async(get_user_by_token)(self.get_raw_token(scope))
+        return await super().__call__(scope, receive, send)
+
+    def get_raw_token(self, scope: Dict[str, Any]) -> Optional[str]:
+        """Get raw token from `Authorization` header or query string"""
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                raw_token = JWTAuthentication().get_raw_token(value)
+                return raw_token.decode() if raw_token else None
+        query = parse_qs(scope.get("query_string", b"").decode())
+        tokens = query.get(self.token_query_param)
+        return tokens[0] if tokens else None
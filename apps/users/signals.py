@@ -0,0 +1,14 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.authentication import CachedJWTAuthentication
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    """Drop cached user when it is changed, e.g. deactivated or its password is changed"""
+    CachedJWTAuthentication.invalidate(instance)
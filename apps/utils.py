@@ -1,6 +1,8 @@
 import functools
+import threading
 import time
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 
 from django.db import connection, reset_queries
 from django.utils.encoding import force_bytes, force_str
@@ -62,6 +64,56 @@ class SwaggerWrapper:
         return decorator
 
 
+class LRUCache:
+    """
+    Thread safe in-process LRU cache with optional expiration
+
+    Holds at most `maxsize` entries, the least recently used one is evicted first.
+    Entries older than `ttl` seconds are treated as missing.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value or default when missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if self.ttl is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Set value, evicting the least recently used entry when full"""
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Delete value"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Delete every value"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
 def encode_uid(pk: str) -> str:
     """Encode uid"""
     return force_str(urlsafe_base64_encode(force_bytes(pk)))
@@ -2,6 +2,8 @@ from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
+from apps.core.api.views import BatchAPIView
+
 if settings.DEBUG:
     router = DefaultRouter()
 else:
@@ -13,4 +15,5 @@ urlpatterns = router.urls
 urlpatterns += [
     path("users/", include("apps.users.api.urls", namespace="users_app")),
     path("chat/", include("apps.chat.api.urls", namespace="chat_app")),
+    path("batch/", BatchAPIView.as_view(), name="batch"),
 ]
@@ -0,0 +1,30 @@
+"""
+ASGI config for simple-chat project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests are served by Django, WebSocket connections are authenticated
+with SimpleJWT access tokens and routed to chat consumers.
+"""
+import os
+import sys
+
+from django.core.asgi import get_asgi_application
+
+app_path = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(app_path, "apps"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+# Initialize Django before importing code that uses models.
+django_asgi_application = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa E402
+
+from apps.chat.routing import websocket_urlpatterns  # noqa E402
+from apps.users.middleware import JWTAuthMiddleware  # noqa E402
+
+application = ProtocolTypeRouter(
+    {
+        "http": django_asgi_application,
+        "websocket": JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+    }
+)
@@ -55,6 +55,18 @@ LOCALE_PATHS = [ROOT_DIR.path("locale")]
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = False
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica-1/chat,postgres://replica-2/chat
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), start=1):
+    DATABASES["replica_%s" % index] = env.db_url_config(url)
+    DATABASES["replica_%s" % index]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append("replica_%s" % index)
+# https://docs.djangoproject.com/en/dev/topics/db/multi-db/#automatic-database-routing
+DATABASE_ROUTERS = ["apps.core.db.routers.ReplicaRouter"]
+# Replicas lagging more than this many seconds are skipped
+DATABASE_REPLICA_MAX_LAG = env.float("DATABASE_REPLICA_MAX_LAG", default=2.0)
+# Clients read from the primary for this many seconds after they write
+DATABASE_REPLICA_PIN_SECONDS = env.int("DATABASE_REPLICA_PIN_SECONDS", default=5)
 
 # URLS
 # ------------------------------------------------------------------------------
@@ -62,6 +74,8 @@ DATABASES["default"]["ATOMIC_REQUESTS"] = False
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# https://channels.readthedocs.io/en/stable/deploying.html
+ASGI_APPLICATION = "config.asgi.application"
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -122,18 +136,24 @@ AUTH_PASSWORD_VALIDATORS = [
 # MIDDLEWARE
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
+# Middleware of apps.core.middleware other than ReplicaRoutingMiddleware are the Django ones,
+# skipped for requests of API_PATH_PREFIX. Frame options stay for every request,
+# the browsable API renders HTML.
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.locale.LocaleMiddleware",
+    "apps.core.middleware.SessionMiddleware",
+    "apps.core.middleware.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.common.BrokenLinkEmailsMiddleware",
+    "apps.core.middleware.CsrfViewMiddleware",
+    "apps.core.middleware.AuthenticationMiddleware",
+    "apps.core.middleware.ReplicaRoutingMiddleware",
+    "apps.core.middleware.MessageMiddleware",
+    "apps.core.middleware.BrokenLinkEmailsMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# Stateless JWT API, session, CSRF, locale and messages middleware do not run for it
+API_PATH_PREFIX = "/api/"
 
 # STATIC
 # ------------------------------------------------------------------------------
@@ -247,9 +267,18 @@ LOGGING = {
 # -------------------------------------------------------------------------------
 # django-rest-framework - https://www.django-rest-framework.org/api-guide/settings/
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("apps.users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "apps.core.api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "apps.core.api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
 }
@@ -270,6 +299,17 @@ CORS_ORIGIN_ALLOW_ALL = False
 CORS_ALLOW_CREDENTIALS = True
 CSRF_TRUSTED_ORIGINS = env.list("CSRF_TRUSTED_ORIGINS")
 
+# CHANNELS
+# ------------------------------------------------------------------------------
+# https://channels.readthedocs.io/en/stable/topics/channel_layers.html
+# In-memory layer only delivers events inside one process, see production settings for multi-node.
+CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# CHAT
+# ------------------------------------------------------------------------------
+# Messages older than this are moved to the compressed archive by `archive_messages`
+CHAT_ARCHIVE_AFTER_DAYS = env.int("CHAT_ARCHIVE_AFTER_DAYS", default=365)
+
 # DRF SPECTACULAR
 # ------------------------------------------------------------------------------
 SPECTACULAR_SETTINGS = {
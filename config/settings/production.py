@@ -15,6 +15,50 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["example.com"])
 DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
 DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
 DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405  # noqa
+for alias in DATABASE_REPLICAS:  # noqa F405
+    DATABASES[alias]["CONN_MAX_AGE"] = DATABASES["default"]["CONN_MAX_AGE"]  # noqa F405
+# Pool of connections per process instead of a persistent connection per thread,
+# at most DATABASE_POOL_MAX_SIZE connections of every server process, per database
+if env.bool("DATABASE_POOL", default=False):
+    for alias in ["default", *DATABASE_REPLICAS]:  # noqa F405
+        DATABASES[alias]["ENGINE"] = "apps.core.db.backends.postgresql"  # noqa F405
+        DATABASES[alias]["CONN_MAX_AGE"] = 0  # noqa F405
+        DATABASES[alias]["CONN_HEALTH_CHECKS"] = env.bool("DATABASE_POOL_HEALTH_CHECKS", default=True)  # noqa F405
+        DATABASES[alias].setdefault("OPTIONS", {})["pool"] = {  # noqa F405
+            "min_size": env.int("DATABASE_POOL_MIN_SIZE", default=2),
+            "max_size": env.int("DATABASE_POOL_MAX_SIZE", default=4),
+            # Seconds a request waits for a connection before failing
+            "timeout": env.float("DATABASE_POOL_TIMEOUT", default=5.0),
+            "max_idle": env.float("DATABASE_POOL_MAX_IDLE", default=600.0),
+            "max_lifetime": env.float("DATABASE_POOL_MAX_LIFETIME", default=3600.0),
+        }
+
+# CACHES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#caches
+# Shared by every process, membership and response caches rely on it
+REDIS_URL = env("REDIS_URL", default=env("CHANNEL_LAYER_REDIS_URL", default=None))
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": env("CACHE_KEY_PREFIX", default="simple_chat"),
+            "TIMEOUT": env.int("CACHE_TIMEOUT", default=300),
+        }
+    }
+
+# CHANNELS
+# ------------------------------------------------------------------------------
+# https://github.com/django/channels_redis
+CHANNEL_LAYER_REDIS_URL = env("CHANNEL_LAYER_REDIS_URL", default=None)
+if CHANNEL_LAYER_REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [CHANNEL_LAYER_REDIS_URL]},
+        }
+    }
 
 
 # SECURITY
@@ -1,7 +1,35 @@
+import asyncio
+import csv
+import io
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from apps.chat.api.serializers import NewMessageQuerySerializer
+from apps.chat.api.views import InboxStream, ThreadMessageAPIViews, ThreadNewMessageAPIView
+from apps.chat.models import ArchivedMessage, Message, Thread, ThreadUserRelation
+from apps.chat.services import ThreadService
+from apps.chat.services.archive import ArchiveService
+from apps.chat.services.export import ExportService
+from apps.chat.services.membership import MembershipService
+from apps.chat.services.message import MessageService
+from apps.chat.services.realtime import RealtimeService
+from apps.chat.services.response_cache import ResponseCacheService
+from apps.core.db.routers import ReplicaRouter, use_replica
 from tests.chat.factory import MessageFactory
 from tests.chat.factory.thread import ThreadFactory
 from tests.users.factory import UserFactory
@@ -47,6 +75,78 @@ class TestCreateThread(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["id"], thread.id)
 
+    def test_create_thread_from_other_participant(self):
+        """Test thread is shared by both participants of a pair"""
+        participant = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        created = self.client.post(self.url, {"participant": participant.id})
+        self.client.force_authenticate(user=participant)
+        response = self.client.post(self.url, {"participant": self.user.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], created.data["id"])
+        self.assertEqual(Thread.objects.get(id=created.data["id"]).participants.count(), 2)
+
+
+class TestBroadcast(APITestCase):
+    """Test broadcast"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.admin = UserFactory(is_staff=True)
+        self.recipients = UserFactory.create_batch(5)
+        self.thread = ThreadFactory.create(participants=[self.admin, self.recipients[0]])
+        self.url = reverse("api:chat_app:broadcast")
+
+    def test_url(self):
+        """Test url"""
+        self.assertEqual(self.url, "/api/v1/chat/broadcast/")
+
+    def test_not_admin(self):
+        """Test broadcast is available to staff only"""
+        self.client.force_authenticate(user=self.recipients[0])
+        response = self.client.post(self.url, {"recipients": [self.recipients[1].id], "text": "hi"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unknown_recipient(self):
+        """Test unknown recipient"""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url, {"recipients": [self.recipients[1].id, 0], "text": "hi"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {"recipients": [10 ** 6], "text": "hi"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data.keys()), ["recipients"])
+
+    def test_broadcast(self):
+        """Test message is delivered to existing and new direct threads"""
+        self.client.force_authenticate(user=self.admin)
+        recipient_ids = [user.id for user in self.recipients] + [self.admin.id]
+        response = self.client.post(self.url, {"recipients": recipient_ids, "text": "Maintenance"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"messages": 5, "created_threads": 4})
+        for recipient in self.recipients:
+            thread = ThreadService.get_one_thread_with_participant(self.admin, recipient)
+            self.assertEqual(thread.last_message.text, "Maintenance")
+            self.assertEqual(thread.message_count, 1)
+            self.assertTrue(ThreadService.is_participant_of_thread(thread, recipient))
+            self.assertEqual(MessageService.get_unread_count(recipient), 1)
+        self.assertEqual(Thread.objects.count(), 5)
+        self.assertEqual(MessageService.check_unread_counters(), (0, 0))
+
+    def test_broadcast_query_count(self):
+        """Test query count does not grow with the number of recipients"""
+        self.client.force_authenticate(user=self.admin)
+
+        def broadcast(recipients):
+            with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks() as callbacks:
+                with mock.patch.object(cache, "delete_many", wraps=cache.delete_many) as delete_many:
+                    response = self.client.post(
+                        self.url, {"recipients": [user.id for user in recipients], "text": "hi"}, format="json"
+                    )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(context.captured_queries), len(callbacks), delete_many.call_count
+
+        self.assertEqual(broadcast(UserFactory.create_batch(2)), broadcast(UserFactory.create_batch(20)))
+
 
 class TestListThreadByUser(APITestCase):
     """Test list thread by user"""
@@ -75,6 +175,98 @@ class TestListThreadByUser(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["count"], 10)
 
+    def test_not_modified(self):
+        """Test unchanged thread list is answered by the version lookup only"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_modified_after_new_thread(self):
+        """Test new thread of the user changes the thread list version"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post(reverse("api:chat_app:thread"), {"participant": UserFactory().id})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 11)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_modified_after_new_message(self):
+        """Test new message changes thread lists of both participants"""
+        self.client.force_authenticate(user=self.user)
+        thread = self.threads[0]
+        participant = thread.participants.exclude(id=self.user.id).get()
+        participant_url = reverse("api:chat_app:thread_user", kwargs={"user_id": participant.id})
+        etag = self.client.get(self.url)["ETag"]
+        participant_etag = self.client.get(participant_url)["ETag"]
+        self.client.post(reverse("api:chat_app:message", kwargs={"pk": thread.pk}), {"text": "hi"})
+        for url, previous in ((self.url, etag), (participant_url, participant_etag)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=previous)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestInbox(APITestCase):
+    """Test inbox"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participants = UserFactory.create_batch(3)
+        self.threads = [
+            ThreadFactory.create(participants=[self.user, participant]) for participant in self.participants
+        ]
+        MessageFactory.create_batch(2, thread=self.threads[2], sender=self.participants[2])
+        MessageFactory.create(thread=self.threads[0], sender=self.participants[0])
+        self.last_message = MessageFactory.create(thread=self.threads[0], sender=self.user)
+        self.url = reverse("api:chat_app:inbox")
+
+    def test_url(self):
+        """Test url"""
+        url = "/api/v1/chat/inbox/"
+        response = self.client.get(self.url)
+        self.assertEqual(url, self.url)
+        self.assertNotIn(response.status_code, [status.HTTP_404_NOT_FOUND, status.HTTP_405_METHOD_NOT_ALLOWED])
+
+    def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inbox(self):
+        """Test threads are ordered by last activity with preview and unread count"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([item["id"] for item in results], [self.threads[0].id, self.threads[2].id, self.threads[1].id])
+        participant = self.participants[0]
+        self.assertEqual(results[0]["participant"], participant.id)
+        self.assertEqual(results[0]["participant_name"], "%s %s" % (participant.first_name, participant.last_name))
+        self.assertEqual(results[0]["last_message"]["id"], self.last_message.id)
+        self.assertEqual(results[0]["last_message"]["sender"], self.user.id)
+        self.assertEqual(results[0]["last_message"]["text"], self.last_message.text)
+        self.assertEqual([item["unread_count"] for item in results], [1, 2, 0])
+        self.assertIsNone(results[2]["last_message"])
+
+    def test_inbox_order_by_index(self):
+        """Test inbox is ordered by the columns of the relation activity index"""
+        (index,) = [i for i in ThreadUserRelation._meta.indexes if i.name == "relation_user_activity_idx"]
+        self.assertEqual(index.fields, ["user", "-last_activity_at", "-thread"])
+        self.assertEqual(ThreadService.get_inbox(self.user).query.order_by, ("-last_activity_at", "-thread_id"))
+
+    def test_inbox_constant_queries(self):
+        """Test inbox query count does not depend on number of threads"""
+        for participant in UserFactory.create_batch(5):
+            thread = ThreadFactory.create(participants=[self.user, participant])
+            MessageFactory.create(thread=thread, sender=participant)
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 8)
+
 
 class TestCreateMessage(APITestCase):
     """Test create message"""
@@ -121,6 +313,17 @@ class TestCreateMessage(APITestCase):
         response = self.client.post(self.url, data={"text": "test"})
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_message_updates_thread_activity(self):
+        """Test create message updates last message and message count of thread"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(self.url, data={"text": "first"})
+        self.client.post(self.url, data={"text": "second"})
+        self.thread.refresh_from_db()
+        message = Message.objects.get(text="second")
+        self.assertEqual(self.thread.last_message, message)
+        self.assertEqual(self.thread.last_message_at, message.created)
+        self.assertEqual(self.thread.message_count, 2)
+
 
 class TestListMessagesForThread(APITestCase):
     """Test list message for thread"""
@@ -164,6 +367,510 @@ class TestListMessagesForThread(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["count"], 10)
 
+    def test_get_message_with_cursor(self):
+        """Test get message with cursor pagination"""
+        self.client.force_authenticate(user=self.user)
+        ids = []
+        response = self.client.get(self.url, {"cursor": "", "limit": 4})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [message["id"] for message in response.data["results"]]
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(ids, sorted(set(ids), reverse=True))
+
+    def test_get_message_with_invalid_cursor(self):
+        """Test get message with invalid cursor"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"cursor": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_not_modified(self):
+        """Test unchanged messages are answered by the thread lookup only"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_modified_within_the_same_second(self):
+        """Test If-Modified-Since alone never answers 304, changes within a second would be missed"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertNotIn("Last-Modified", response)
+        if_modified_since = http_date(time.time() + 1)
+        self.client.post(self.url, {"text": "hi"})
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=if_modified_since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 11)
+
+    def test_modified_after_new_message(self):
+        """Test new message changes the thread version"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post(self.url, {"text": "hi"})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 11)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_modified_after_read(self):
+        """Test reading messages changes the thread version, reading nothing does not"""
+        participant = self.thread.participants.exclude(id=self.user.id).get()
+        MessageFactory.create(thread=self.thread, sender=participant)
+        self.client.force_authenticate(user=self.user)
+        read_url = reverse("api:chat_app:thread_read", kwargs={"pk": self.thread.pk})
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post(read_url)
+        etag_after_read = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)["ETag"]
+        self.assertNotEqual(etag_after_read, etag)
+        self.client.post(read_url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag_after_read)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TestResponseCache(APITestCase):
+    """Test versioned response cache"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        cache.clear()
+        self.user = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, UserFactory()])
+        MessageFactory.create_batch(3, thread=self.thread)
+        self.url = reverse("api:chat_app:message", kwargs={"pk": self.thread.pk})
+        self.client.force_authenticate(user=self.user)
+
+    def test_first_page(self):
+        """Test first page is served from cache without message queries"""
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(ResponseCacheService.get_stats(), {"hits": 1, "misses": 1})
+
+    def test_new_version(self):
+        """Test write bumps the version, the next request misses"""
+        self.client.get(self.url)
+        self.client.post(self.url, {"text": "hi"})
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 4)
+
+    def test_other_pages_not_cached(self):
+        """Test only the newest page is cached"""
+        self.client.get(self.url, {"cursor": "", "limit": 2})
+        self.assertEqual(self.client.get(self.url, {"cursor": "", "limit": 2})["X-Cache"], "HIT")
+        next_page = self.client.get(self.url, {"cursor": "", "limit": 2}).data["next"]
+        self.assertNotIn("X-Cache", self.client.get(next_page))
+        self.assertNotIn("X-Cache", self.client.get(self.url, {"offset": 2}))
+
+    def test_thread_list(self):
+        """Test thread list of user is cached until the user gets a new thread"""
+        url = reverse("api:chat_app:thread_user", kwargs={"user_id": self.user.id})
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        self.client.post(reverse("api:chat_app:thread"), {"participant": UserFactory().id})
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 2)
+
+
+class TestListArchivedMessages(APITestCase):
+    """Test cursor pages continue into archived messages"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(7, thread=self.thread, sender=self.participant)
+        MessageService.read_up_to(self.thread, self.user)
+        Message.objects.filter(id__in=[m.id for m in self.messages[:4]]).update(
+            created=timezone.now() - timedelta(days=400)
+        )
+        list(ArchiveService.archive(timezone.now() - timedelta(days=365)))
+        self.url = reverse("api:chat_app:message", kwargs={"pk": self.thread.pk})
+        self.client.force_authenticate(user=self.user)
+
+    def test_cursor_pages(self):
+        """Test every message is returned once, newest first"""
+        self.assertEqual(ArchivedMessage.objects.count(), 4)
+        ids, texts = [], []
+        response = self.client.get(self.url, {"cursor": "", "limit": 3})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in response.data["results"])
+            texts.extend(item["text"] for item in response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(ids, [m.id for m in reversed(self.messages)])
+        self.assertEqual(texts, [m.text for m in reversed(self.messages)])
+
+    def test_offset_pages(self):
+        """Test offset pages and count continue into archived messages"""
+        ids = []
+        for offset in range(0, 9, 3):
+            response = self.client.get(self.url, {"limit": 3, "offset": offset})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["count"], 7)
+            ids.extend(item["id"] for item in response.data["results"])
+        self.assertEqual(ids, [m.id for m in reversed(self.messages)])
+
+    def test_rows_match_model_serializer(self):
+        """Test rows of hot and archived messages render the same JSON as MessageSerializer"""
+        self.participant.first_name, self.participant.last_name = "Тарас", "O'Neil"
+        self.participant.save()
+        for params in ({}, {"limit": 3, "offset": 2}, {"cursor": "", "limit": 5}):
+            rows = self.client.get(self.url, params)
+            with mock.patch.object(ThreadMessageAPIViews, "row_serializer_class", None):
+                models = self.client.get(self.url, params)
+            self.assertEqual(rows.status_code, status.HTTP_200_OK)
+            self.assertEqual(rows.content, models.content)
+
+
+class TestListMessagesForLargeThread(APITestCase):
+    """Test list message does not depend on thread size"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, UserFactory()])
+        MessageFactory.create_batch(12, thread=self.thread)
+        self.url = reverse("api:chat_app:message", kwargs={"pk": self.thread.pk})
+        self.client.force_authenticate(user=self.user)
+        # Warm up membership cache, so only message queries are compared
+        MembershipService.get_participant_ids(self.thread.pk)
+
+    def get_message_queries(self, params):
+        """Request one page and return captured queries"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query["sql"] for query in context.captured_queries]
+
+    def test_constant_query_count(self):
+        """Test query count does not grow with thread size"""
+        for params in ({}, {"cursor": ""}):
+            small = self.get_message_queries(params)
+            MessageFactory.create_batch(40, thread=self.thread)
+            large = self.get_message_queries(params)
+            self.assertEqual(len(small), len(large))
+
+    def test_bounded_row_fetch(self):
+        """Test only the requested page of messages is fetched"""
+        for params in ({"limit": 5}, {"limit": 5, "offset": 10}, {"cursor": "", "limit": 5}):
+            queries = self.get_message_queries(params)
+            message_queries = [sql for sql in queries if 'FROM "chat_message"' in sql and "COUNT(" not in sql]
+            self.assertEqual(len(message_queries), 1)
+            self.assertRegex(message_queries[0], r"LIMIT [56]\b")
+            self.assertIn('"auth_user"', message_queries[0])
+
+    def test_bounded_row_fetch_with_archive(self):
+        """Test deep offset pages of a thread with archived messages cut the window in the database"""
+        Message.objects.filter(thread=self.thread).update(is_read=True)
+        oldest = list(Message.objects.filter(thread=self.thread).order_by("id").values_list("id", flat=True)[:4])
+        Message.objects.filter(id__in=oldest).update(created=timezone.now() - timedelta(days=400))
+        list(ArchiveService.archive(timezone.now() - timedelta(days=365)))
+        queries = self.get_message_queries({"limit": 5, "offset": 6})
+        row_queries = [sql for sql in queries if "COUNT(" not in sql and "chat_threaduserrelation" not in sql]
+        self.assertTrue(any("UNION ALL" in sql and "LIMIT 5 OFFSET 6" in sql for sql in row_queries))
+        self.assertFalse([sql for sql in row_queries if "LIMIT 11" in sql])
+
+
+class TestExportThread(APITestCase):
+    """Test thread export"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(3, thread=self.thread, sender=self.participant)
+        self.messages.append(MessageFactory.create(thread=self.thread, sender=self.user, text='Say "hi",\nthen go'))
+        MessageService.read_up_to(self.thread, self.user)
+        Message.objects.filter(id=self.messages[0].id).update(created=timezone.now() - timedelta(days=400))
+        list(ArchiveService.archive(timezone.now() - timedelta(days=365)))
+        self.url = reverse("api:chat_app:thread_export", kwargs={"pk": self.thread.pk})
+
+    def test_url(self):
+        """Test url"""
+        self.assertEqual(self.url, "/api/v1/chat/thread/%s/export/" % self.thread.pk)
+
+    def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_not_participant_of_thread(self):
+        """Test not participant of thread"""
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.get(self.url, {"format": "csv"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_ndjson(self):
+        """Test NDJSON export includes archived messages, oldest first"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"format": "ndjson"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(ArchivedMessage.objects.count(), 1)
+        self.assertEqual([line["id"] for line in lines], [m.id for m in self.messages])
+        self.assertEqual(lines[-1]["text"], self.messages[-1].text)
+        self.assertEqual(lines[-1]["sender"], "%s %s" % (self.user.first_name, self.user.last_name))
+        self.assertEqual(lines[0]["sender_id"], self.participant.id)
+
+    def test_export_csv(self):
+        """Test CSV export"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"format": "csv"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('filename="thread-%s.csv"' % self.thread.pk, response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([int(row["id"]) for row in rows], [m.id for m in self.messages])
+        self.assertEqual(rows[-1]["text"], self.messages[-1].text)
+
+    def test_export_dates_like_api(self):
+        """Test both formats render dates like the messages API"""
+        self.client.force_authenticate(user=self.user)
+        api = self.client.get(reverse("api:chat_app:message", kwargs={"pk": self.thread.pk}), {"limit": 1})
+        expected = api.data["results"][0]["created"]
+        response = self.client.get(self.url, {"format": "ndjson"})
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines[-1]["created"], expected)
+        response = self.client.get(self.url, {"format": "csv"})
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[-1]["created"], expected)
+
+    def test_export_csv_formula(self):
+        """Test CSV cells starting like a formula are quoted, NDJSON keeps the text"""
+        text = '=HYPERLINK("http://example.com","x")'
+        MessageFactory.create(thread=self.thread, sender=self.participant, text=text)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"format": "csv"})
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[-1]["text"], "'" + text)
+        response = self.client.get(self.url, {"format": "ndjson"})
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines[-1]["text"], text)
+
+    async def test_export_asgi_chunks(self):
+        """Test export is sent in bounded chunks through the ASGI handler"""
+        headers = {"Authorization": "Bearer %s" % AccessToken.for_user(self.user)}
+        with mock.patch.object(ExportService, "chunk_size", 2):
+            response = await self.async_client.get(self.url, headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 2])
+        lines = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+        self.assertEqual([line["id"] for line in lines], [m.id for m in self.messages])
+
+    def test_export_sender_queries(self):
+        """Test sender names are loaded once per chunk, not per message"""
+        MessageFactory.create_batch(20, thread=self.thread, sender=self.participant)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 24)
+        self.assertEqual(len(context.captured_queries), 3)
+
+
+class TestWaitNewMessages(APITestCase):
+    """Test long polling for new messages"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(3, thread=self.thread, sender=self.participant)
+        self.url = reverse("api:chat_app:message", kwargs={"pk": self.thread.pk})
+
+    def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = self.client.get(self.url, {"after": 0, "wait": 1})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_not_participant_of_thread(self):
+        """Test not participant of thread"""
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.get(self.url, {"after": 0, "wait": 1})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_params(self):
+        """Test invalid params"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"after": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data.keys()), ["after"])
+
+    def test_new_messages_exist(self):
+        """Test request returns immediately when newer messages exist"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"after": self.messages[0].id, "wait": 30})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([message["id"] for message in response.data["results"]], [m.id for m in self.messages[1:]])
+        with mock.patch.object(ThreadNewMessageAPIView, "row_serializer_class", None):
+            models = self.client.get(self.url, {"after": self.messages[0].id, "wait": 30})
+        self.assertEqual(response.content, models.content)
+
+    def test_timeout(self):
+        """Test request returns empty result after timeout"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"after": self.messages[-1].id, "wait": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+    async def test_wait_for_new_message(self):
+        """Test parked request is woken up by a new message"""
+        group = RealtimeService.get_thread_group(self.thread.pk)
+        channel_layer = get_channel_layer()
+        headers = {"Authorization": "Bearer %s" % AccessToken.for_user(self.user)}
+        request = asyncio.ensure_future(
+            self.async_client.get(self.url, {"after": self.messages[-1].id, "wait": 10}, headers=headers)
+        )
+        while not channel_layer.groups.get(group):
+            await asyncio.sleep(0.01)
+
+        def create_message():
+            with self.captureOnCommitCallbacks(execute=True):
+                return MessageFactory.create(thread=self.thread, sender=self.participant)
+
+        message = await sync_to_async(create_message)()
+        response = await asyncio.wait_for(request, timeout=5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.json()["results"]], [message.id])
+
+    async def test_wait_out_of_range(self):
+        """Test wait above the limit is rejected instead of being clamped"""
+        headers = {"Authorization": "Bearer %s" % AccessToken.for_user(self.user)}
+        for wait in (NewMessageQuerySerializer.max_wait + 1, -1):
+            response = await self.async_client.get(self.url, {"after": 0, "wait": wait}, headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(list(response.json().keys()), ["wait"])
+        response = await self.async_client.get(self.url, {"after": 0, "wait": 31})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_wait_reads_from_primary_after_wake_up(self):
+        """Test messages announced by an event are read from the primary, replicas may lag"""
+        aliases = []
+        get = ThreadNewMessageAPIView.get
+
+        def record_alias(view, request, *args, **kwargs):
+            aliases.append(ReplicaRouter().db_for_read(Message))
+            return get(view, request, *args, **kwargs)
+
+        group = RealtimeService.get_thread_group(self.thread.pk)
+        channel_layer = get_channel_layer()
+        headers = {"Authorization": "Bearer %s" % AccessToken.for_user(self.user)}
+        with mock.patch.object(ThreadNewMessageAPIView, "get", record_alias):
+            # The alias of the test database stands for the replica chosen by the middleware
+            with use_replica("default"):
+                request = asyncio.ensure_future(
+                    self.async_client.get(self.url, {"after": self.messages[-1].id, "wait": 10}, headers=headers)
+                )
+            while not channel_layer.groups.get(group):
+                await asyncio.sleep(0.01)
+            await channel_layer.group_send(group, {"type": "chat.message"})
+            response = await asyncio.wait_for(request, timeout=5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(aliases, ["default", None])
+
+
+class TestSearchMessage(APITestCase):
+    """Test message search"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.other_thread = ThreadFactory.create(participants=[self.user, UserFactory()])
+        self.best = MessageFactory.create(thread=self.thread, sender=self.participant, text="deploy deploy deploy")
+        self.matches = [
+            MessageFactory.create(thread=self.thread, sender=self.user, text="deploy is done, see the report"),
+            MessageFactory.create(thread=self.other_thread, sender=self.user, text="Deploy tomorrow after lunch"),
+        ]
+        MessageFactory.create(thread=self.thread, sender=self.participant, text="nothing to see here")
+        foreign_thread = ThreadFactory.create(participants=UserFactory.create_batch(2))
+        MessageFactory.create(thread=foreign_thread, sender=foreign_thread.participants.first(), text="deploy")
+        self.url = reverse("api:chat_app:search")
+
+    def test_url(self):
+        """Test url"""
+        self.assertEqual(self.url, "/api/v1/chat/search/")
+
+    def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = self.client.get(self.url, {"q": "deploy"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_missing_query(self):
+        """Test missing query"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data.keys()), ["q"])
+
+    def test_search(self):
+        """Test only messages of user threads are found, best match first"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"q": "deploy"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(results[0]["id"], self.best.id)
+        self.assertEqual(results[0]["thread"], self.thread.id)
+        self.assertEqual({item["id"] for item in results[1:]}, {message.id for message in self.matches})
+        self.assertIsNone(response.data["next"])
+
+    def test_search_all_words(self):
+        """Test every word of the query must match"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"q": "deploy report"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.matches[0].id])
+
+    def test_search_pages(self):
+        """Test cursor pages cover every match once"""
+        self.client.force_authenticate(user=self.user)
+        ids, params = [], {"q": "deploy", "limit": 1}
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(ids[0], self.best.id)
+        self.assertCountEqual(ids, [self.best.id] + [message.id for message in self.matches])
+
+    def test_search_syntax_is_not_interpreted(self):
+        """Test query operators of the backend are treated as plain text"""
+        self.client.force_authenticate(user=self.user)
+        for query in ['deploy AND (', '"deploy', "***", "NEAR(deploy"]:
+            response = self.client.get(self.url, {"q": query})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_cursor(self):
+        """Test invalid cursor"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"q": "deploy", "cursor": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class TestReadMessage(APITestCase):
     """Test read message"""
@@ -216,6 +923,86 @@ class TestReadMessage(APITestCase):
         self.message.refresh_from_db()
         self.assertTrue(self.message.is_read)
 
+    def test_read_message_decrements_unread_count(self):
+        """Test read message decrements unread count once"""
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(MessageService.get_unread_count(self.user), 1)
+        self.client.post(self.url)
+        self.client.post(self.url)
+        self.assertEqual(MessageService.get_unread_count(self.user), 0)
+        self.assertEqual(MessageService.get_unread_count(self.participant), 0)
+
+
+class TestReadThread(APITestCase):
+    """Test read thread"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(5, thread=self.thread, sender=self.participant)
+        self.url = reverse("api:chat_app:thread_read", kwargs={"pk": self.thread.pk})
+
+    def test_url(self):
+        """Test url"""
+        url = "/api/v1/chat/thread/%s/read/" % self.thread.id
+        response = self.client.post(self.url)
+        self.assertEqual(url, self.url)
+        self.assertNotIn(response.status_code, [status.HTTP_404_NOT_FOUND, status.HTTP_405_METHOD_NOT_ALLOWED])
+
+    def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_not_participant_of_thread(self):
+        """Test not participant of thread"""
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_read_thread_success(self):
+        """Test read whole thread"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["last_read_message_id"], self.messages[-1].id)
+        self.assertEqual(response.data["unread_count"], 0)
+        self.assertEqual(MessageService.get_unread_count(self.user), 0)
+        self.assertFalse(Message.objects.filter(thread=self.thread, is_read=False).exists())
+
+    def test_read_thread_up_to_message(self):
+        """Test read thread up to message"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, {"message": self.messages[2].id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["unread_count"], 2)
+        self.assertEqual(MessageService.get_unread_count(self.user), 2)
+
+    def test_read_thread_does_not_move_back(self):
+        """Test watermark does not move backwards"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(self.url)
+        response = self.client.post(self.url, {"message": self.messages[0].id})
+        self.assertEqual(response.data["last_read_message_id"], self.messages[-1].id)
+        self.assertEqual(MessageService.get_unread_count(self.user), 0)
+
+    def test_read_thread_message_from_other_thread(self):
+        """Test message from other thread"""
+        message = MessageFactory.create()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, {"message": message.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data.keys()), ["message"])
+
+    def test_new_message_after_read(self):
+        """Test new message after read is unread"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(self.url)
+        MessageFactory.create(thread=self.thread, sender=self.participant)
+        self.assertEqual(MessageService.get_unread_count(self.user), 1)
+
 
 class TestCountUnreadMessage(APITestCase):
     """Test count unread message"""
@@ -246,3 +1033,103 @@ class TestCountUnreadMessage(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["count"], 10)
+
+    def test_count_unread_message_single_query(self):
+        """Test count unread message reads one row"""
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 10)
+
+    def test_count_unread_message_after_thread_deleted(self):
+        """Test count unread message after thread deleted"""
+        other_thread = ThreadFactory.create(participants=[self.user, UserFactory()])
+        MessageFactory.create_batch(
+            3, thread=other_thread, sender=other_thread.participants.exclude(id=self.user.id)[0]
+        )
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url).data["count"], 13)
+        self.client.delete(reverse("api:chat_app:thread_detail", kwargs={"pk": other_thread.pk}))
+        self.assertEqual(self.client.get(self.url).data["count"], 10)
+
+
+class TestInboxStream(APITestCase):
+    """Test inbox event stream"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(3, thread=self.thread, sender=self.participant)
+        self.url = reverse("api:chat_app:stream")
+
+    def test_url(self):
+        """Test url"""
+        self.assertEqual(self.url, "/api/v1/chat/stream/")
+
+    async def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_invalid_token(self):
+        """Test invalid token"""
+        response = await self.async_client.get(self.url, {"token": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_not_asgi(self):
+        """Test endless stream is not served under WSGI"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_replay_every_page(self):
+        """Test every missed message is replayed when the backlog is longer than a page"""
+        messages = self.messages + await sync_to_async(MessageFactory.create_batch)(
+            2, thread=self.thread, sender=self.participant
+        )
+        headers = {
+            "Authorization": "Bearer %s" % AccessToken.for_user(self.user),
+            "Last-Event-ID": str(messages[0].id),
+        }
+        with mock.patch.object(InboxStream, "replay_page_size", 2):
+            response = await self.async_client.get(self.url, headers=headers)
+            stream = aiter(response.streaming_content)
+            try:
+                self.assertTrue((await anext(stream)).startswith(b"retry:"))
+                for message in messages[1:]:
+                    chunk = await anext(stream)
+                    self.assertTrue(chunk.startswith(b"id: %d\nevent: message\n" % message.id))
+                self.assertEqual(await anext(stream), b'event: unread\ndata: {"count":5}\n\n')
+            finally:
+                await stream.aclose()
+
+    async def test_stream_events(self):
+        """Test missed messages are replayed before unread counter and live messages"""
+        headers = {
+            "Authorization": "Bearer %s" % AccessToken.for_user(self.user),
+            "Last-Event-ID": str(self.messages[0].id),
+        }
+        response = await self.async_client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertTrue((await anext(stream)).startswith(b"retry:"))
+            for message in self.messages[1:]:
+                chunk = await anext(stream)
+                self.assertTrue(chunk.startswith(b"id: %d\nevent: message\n" % message.id))
+            self.assertEqual(await anext(stream), b'event: unread\ndata: {"count":3}\n\n')
+
+            def create_message():
+                with self.captureOnCommitCallbacks(execute=True):
+                    return MessageFactory.create(thread=self.thread, sender=self.participant)
+
+            message = await sync_to_async(create_message)()
+            chunk = await asyncio.wait_for(anext(stream), timeout=5)
+            self.assertTrue(chunk.startswith(b"id: %d\nevent: message\n" % message.id))
+            chunk = await asyncio.wait_for(anext(stream), timeout=5)
+            self.assertEqual(chunk, b'event: unread\ndata: {"count":4}\n\n')
+        finally:
+            await stream.aclose()
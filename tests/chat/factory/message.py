@@ -1,6 +1,7 @@
 import factory
 
 from apps.chat.models import Message
+from apps.chat.services.message import MessageService
 from tests.users.factory import UserFactory
 
 from .thread import ThreadFactory
@@ -14,3 +15,8 @@ class MessageFactory(factory.django.DjangoModelFactory):
 
     class Meta:
         model = Message
+
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        """Create message through the service to keep counters consistent"""
+        return MessageService.create(kwargs)
@@ -1,6 +1,7 @@
 import factory
 
 from apps.chat.models import Thread
+from apps.chat.services import ThreadService
 from tests.users.factory import UserFactory
 
 
@@ -21,5 +22,10 @@ class ThreadFactory(factory.django.DjangoModelFactory):
             tags = extracted
         else:
             tags = [UserFactory() for x in range(2)]
-        for tag in tags:
-            self.participants.add(tag)
+        ThreadService._add_participants(self, tags)
+        if len(tags) == 2:
+            # Like the data migration, only the first thread of a pair gets the key
+            min_user_id, max_user_id = ThreadService.get_participants_key(*tags)
+            if not Thread.objects.filter(min_user_id=min_user_id, max_user_id=max_user_id).exists():
+                Thread.objects.filter(pk=self.pk).update(min_user_id=min_user_id, max_user_id=max_user_id)
+                self.min_user_id, self.max_user_id = min_user_id, max_user_id
@@ -0,0 +1,161 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.chat.models import ArchivedMessage, Message, Thread, ThreadUserRelation, UserChatState
+from apps.chat.services.message import MessageService
+from apps.chat.services.response_cache import ResponseCacheService
+from apps.core.services.pool_stats import PoolStatsService
+from tests.chat.factory import MessageFactory, ThreadFactory
+from tests.users.factory import UserFactory
+
+
+class TestRebuildUnreadCounters(TestCase):
+    """Test rebuild unread counters command"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        MessageFactory.create_batch(5, thread=self.thread, sender=self.participant)
+
+    def test_check_consistent(self):
+        """Test check consistent counters"""
+        out = StringIO()
+        call_command("rebuild_unread_counters", "--check", stdout=out)
+        self.assertIn("consistent", out.getvalue())
+
+    def test_check_stale(self):
+        """Test check stale counters"""
+        ThreadUserRelation.objects.filter(user=self.user).update(unread_count=0)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_unread_counters", "--check", stdout=StringIO())
+
+    def test_rebuild(self):
+        """Test rebuild counters"""
+        ThreadUserRelation.objects.update(unread_count=7)
+        UserChatState.objects.all().delete()
+        call_command("rebuild_unread_counters", stdout=StringIO())
+        self.assertEqual(MessageService.get_unread_count(self.user), 5)
+        self.assertEqual(MessageService.get_unread_count(self.participant), 0)
+        call_command("rebuild_unread_counters", "--check", stdout=StringIO())
+
+
+class TestBackfillThreadActivity(TestCase):
+    """Test backfill thread activity command"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, UserFactory()])
+        self.messages = MessageFactory.create_batch(3, thread=self.thread, sender=self.user)
+        self.empty_thread = ThreadFactory.create(participants=[self.user, UserFactory()])
+
+    def test_backfill(self):
+        """Test backfill activity"""
+        Thread.objects.update(last_message=None, last_message_at=None, message_count=0)
+        out = StringIO()
+        call_command("backfill_thread_activity", "--batch-size", "1", stdout=out)
+        self.assertIn("2 threads", out.getvalue())
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.last_message_id, self.messages[-1].id)
+        self.assertEqual(self.thread.last_message_at, self.messages[-1].created)
+        self.assertEqual(self.thread.message_count, 3)
+        self.empty_thread.refresh_from_db()
+        self.assertIsNone(self.empty_thread.last_message_id)
+        self.assertEqual(self.empty_thread.message_count, 0)
+
+    def test_backfill_inbox_activity(self):
+        """Test relations get the last message time, or the thread creation without messages"""
+        ThreadUserRelation.objects.update(last_activity_at=timezone.now() - timedelta(days=1))
+        call_command("backfill_thread_activity", stdout=StringIO())
+        for thread, activity in [(self.thread, self.messages[-1].created), (self.empty_thread, None)]:
+            thread.refresh_from_db()
+            activities = ThreadUserRelation.objects.filter(thread=thread).values_list("last_activity_at", flat=True)
+            self.assertEqual(set(activities), {activity or thread.created})
+
+
+class TestArchiveMessages(TestCase):
+    """Test archive messages command"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.old = MessageFactory.create_batch(5, thread=self.thread, sender=self.participant)
+        self.unread = MessageFactory.create(thread=self.thread, sender=self.user)
+        self.recent = MessageFactory.create_batch(2, thread=self.thread, sender=self.participant)
+        MessageService.read_up_to(self.thread, self.user)
+        Message.objects.filter(id__in=[m.id for m in self.old] + [self.unread.id]).update(
+            created=timezone.now() - timedelta(days=400)
+        )
+
+    def test_archive(self):
+        """Test old read messages are moved with their text"""
+        call_command("archive_messages", "--older-than-days", "365", stdout=StringIO())
+        self.assertFalse(Message.objects.filter(id__in=[m.id for m in self.old]).exists())
+        self.assertTrue(Message.objects.filter(id=self.unread.id).exists())
+        self.assertEqual(Message.objects.filter(id__in=[m.id for m in self.recent]).count(), 2)
+        archived = ArchivedMessage.objects.order_by("id")
+        self.assertEqual([m.id for m in archived], [m.id for m in self.old])
+        self.assertEqual([m.text for m in archived], [m.text for m in self.old])
+        self.assertEqual(archived[0].sender_id, self.participant.id)
+        call_command("rebuild_unread_counters", "--check", stdout=StringIO())
+
+    def test_archive_resume(self):
+        """Test interrupted archiving continues where it stopped"""
+        call_command("archive_messages", "--batch-size", "2", "--max-batches", "1", stdout=StringIO())
+        self.assertEqual(ArchivedMessage.objects.count(), 2)
+        call_command("archive_messages", "--batch-size", "2", stdout=StringIO())
+        self.assertEqual(ArchivedMessage.objects.count(), 5)
+
+    def test_keep_last_message(self):
+        """Test last message of thread stays hot"""
+        thread = ThreadFactory.create(participants=[self.user, self.participant])
+        message = MessageFactory.create(thread=thread, sender=self.participant, is_read=True)
+        Message.objects.filter(id=message.id).update(created=timezone.now() - timedelta(days=400))
+        call_command("archive_messages", stdout=StringIO())
+        self.assertTrue(Message.objects.filter(id=message.id).exists())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TestResponseCacheStats(TestCase):
+    """Test response cache stats command"""
+
+    def test_stats(self):
+        """Test counters are shown and reset"""
+        ResponseCacheService.reset_stats()
+        for key in ("a", "b", "b", "b"):
+            if ResponseCacheService.get(key) is None:
+                ResponseCacheService.set(key, {})
+        out = StringIO()
+        call_command("response_cache_stats", "--reset", stdout=out)
+        self.assertIn("Hits: 2, misses: 2, hit ratio: 50.0%", out.getvalue())
+        self.assertEqual(ResponseCacheService.get_stats(), {"hits": 0, "misses": 0})
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TestDBPoolStats(TestCase):
+    """Test database pool stats command"""
+
+    def test_stats(self):
+        """Test checkouts of processes are summed, shown and reset"""
+        PoolStatsService.reset_stats("default")
+        PoolStatsService.record("default", 0.001)
+        PoolStatsService.record("default", 0.003)
+        PoolStatsService.record("default", 0.2)
+        PoolStatsService.record("default", 5.0, timeout=True)
+        PoolStatsService.flush()
+        self.assertEqual(
+            PoolStatsService.get_stats("default"),
+            {"checkouts": 4, "slow": 2, "timeouts": 1, "wait_us": 5_204_000},
+        )
+        out = StringIO()
+        call_command("db_pool_stats", "--reset", stdout=out)
+        self.assertIn("default: checkouts: 4, mean wait: 1301.00 ms, slow: 2, timeouts: 1", out.getvalue())
+        self.assertEqual(PoolStatsService.get_stats("default")["checkouts"], 0)
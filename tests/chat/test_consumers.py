@@ -0,0 +1,115 @@
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.chat.services import ThreadService
+from apps.chat.services.message import MessageService
+from config.asgi import application
+from tests.chat.factory import ThreadFactory
+from tests.users.factory import UserFactory
+
+
+class TestChatConsumer(TestCase):
+    """Test chat WebSocket consumer"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.path = "/ws/chat/?token=%s" % AccessToken.for_user(self.user)
+
+    def create_message(self):
+        """Create message and run on commit callbacks"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return MessageService.create({"thread": self.thread, "sender": self.participant, "text": "Hello"})
+
+    def create_thread(self, participant):
+        """Create thread and run on commit callbacks"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return ThreadService.create(participant, self.user)[0]
+
+    def test_not_authenticated(self):
+        """Test connection without token is rejected"""
+
+        async def run():
+            communicator = WebsocketCommunicator(application, "/ws/chat/")
+            connected, code = await communicator.connect()
+            self.assertFalse(connected)
+            self.assertEqual(code, 4401)
+
+        async_to_sync(run)()
+
+    def test_invalid_token(self):
+        """Test connection with invalid token is rejected"""
+
+        async def run():
+            communicator = WebsocketCommunicator(application, "/ws/chat/?token=invalid")
+            connected, _ = await communicator.connect()
+            self.assertFalse(connected)
+
+        async_to_sync(run)()
+
+    def test_receive_message(self):
+        """Test new message is pushed after commit"""
+
+        async def run():
+            communicator = WebsocketCommunicator(application, self.path)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            message = await database_sync_to_async(self.create_message)()
+            event = await communicator.receive_json_from()
+            self.assertEqual(event["type"], "message")
+            self.assertEqual(event["thread"], self.thread.id)
+            self.assertEqual(event["message"]["id"], message.id)
+            self.assertEqual(event["message"]["text"], "Hello")
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_authorization_header(self):
+        """Test token in authorization header"""
+
+        async def run():
+            headers = [(b"authorization", b"Bearer %s" % str(AccessToken.for_user(self.user)).encode())]
+            communicator = WebsocketCommunicator(application, "/ws/chat/", headers=headers)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_subscribe_to_new_thread(self):
+        """Test connection subscribes to thread created after connect"""
+
+        async def run():
+            communicator = WebsocketCommunicator(application, self.path)
+            await communicator.connect()
+            participant = await database_sync_to_async(UserFactory)()
+            thread = await database_sync_to_async(self.create_thread)(participant)
+            event = await communicator.receive_json_from()
+            self.assertEqual(event, {"type": "thread", "thread": thread.id})
+            self.thread = thread
+            self.participant = participant
+            await database_sync_to_async(self.create_message)()
+            event = await communicator.receive_json_from()
+            self.assertEqual(event["thread"], thread.id)
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_other_threads_are_not_pushed(self):
+        """Test messages of foreign threads are not pushed"""
+
+        async def run():
+            communicator = WebsocketCommunicator(application, "/ws/chat/?token=%s" % AccessToken.for_user(
+                await database_sync_to_async(UserFactory)()
+            ))
+            await communicator.connect()
+            await database_sync_to_async(self.create_message)()
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        async_to_sync(run)()
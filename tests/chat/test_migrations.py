@@ -0,0 +1,34 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+
+from apps.chat.models import ThreadUserRelation, UserChatState
+from apps.chat.services.message import MessageService
+from tests.chat.factory import MessageFactory, ThreadFactory
+from tests.users.factory import UserFactory
+
+
+class TestBackfillUnreadCounters(TestCase):
+    """Test unread counters migration of users without chat state"""
+
+    migration = import_module("apps.chat.migrations.0012_backfill_unread_counters")
+
+    def setUp(self) -> None:
+        """Set up threads as they were before the counters"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(3, thread=self.thread, sender=self.participant)
+        MessageFactory.create(thread=self.thread, sender=self.user)
+        MessageService.read_up_to(self.thread, self.user, self.messages[0].id)
+        UserChatState.objects.all().delete()
+        ThreadUserRelation.objects.update(unread_count=0)
+
+    def test_backfill(self):
+        """Test missing states are created and both counters are counted from unread messages"""
+        self.migration.backfill_unread_counters(apps, None)
+        self.assertEqual(MessageService.check_unread_counters(), (0, 0))
+        self.assertEqual(MessageService.get_unread_count(self.user), 2)
+        self.assertEqual(MessageService.get_unread_count(self.participant), 1)
+        self.assertEqual(set(UserChatState.objects.values_list("version", flat=True)), {1})
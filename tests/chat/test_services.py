@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from apps.chat.models import ThreadUserRelation
+from apps.chat.services import ThreadService
+from apps.chat.services.membership import MembershipService
+from tests.chat.factory import ThreadFactory
+from tests.users.factory import UserFactory
+
+
+class TestMembershipService(TestCase):
+    """Test cached thread membership"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+
+    def test_is_participant(self):
+        """Test membership is read once and then served from cache"""
+        with self.assertNumQueries(1):
+            self.assertTrue(ThreadService.is_participant_of_thread(self.thread, self.user))
+        with self.assertNumQueries(0):
+            self.assertTrue(ThreadService.is_participant_of_thread(self.thread, self.participant))
+            self.assertFalse(ThreadService.is_participant_of_thread(self.thread, UserFactory.build(id=0)))
+
+    def test_invalidate_on_relation_delete(self):
+        """Test removed participant loses access"""
+        self.assertTrue(MembershipService.is_participant(self.thread.pk, self.participant.pk))
+        ThreadUserRelation.objects.get(thread=self.thread, user=self.participant).delete()
+        self.assertFalse(MembershipService.is_participant(self.thread.pk, self.participant.pk))
+
+    def test_invalidate_on_relation_create(self):
+        """Test added participant gains access"""
+        user = UserFactory()
+        self.assertFalse(MembershipService.is_participant(self.thread.pk, user.pk))
+        ThreadUserRelation.objects.create(thread=self.thread, user=user)
+        self.assertTrue(MembershipService.is_participant(self.thread.pk, user.pk))
+
+    def test_invalidate_on_thread_delete(self):
+        """Test deleted thread has no participants"""
+        thread_id = self.thread.pk
+        self.assertTrue(MembershipService.is_participant(thread_id, self.user.pk))
+        ThreadService.delete(self.thread)
+        self.assertFalse(MembershipService.is_participant(thread_id, self.user.pk))
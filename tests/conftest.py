@@ -4,3 +4,34 @@ import pytest
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
     """This fixture applies @pytest.mark.django_db to each test"""
+
+
+@pytest.fixture(autouse=True)
+def clear_membership_cache():
+    """Database ids are reused between tests, cached thread membership must not leak"""
+    from apps.chat.services.membership import MembershipService
+
+    MembershipService.local_cache.clear()
+    yield
+    MembershipService.local_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_authentication_cache():
+    """Database ids are reused between tests, cached users must not leak"""
+    from apps.users.authentication import CachedJWTAuthentication
+
+    CachedJWTAuthentication.user_cache.clear()
+    yield
+    CachedJWTAuthentication.user_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Test database is created without migrations, install full-text index of messages"""
+    from django.db import connection
+
+    from apps.chat.services.search import SearchService
+
+    with django_db_blocker.unblock(), connection.schema_editor() as schema_editor:
+        SearchService.get_backend().install(schema_editor)
@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.chat.models import Message
+from apps.core.services import BatchService
+from tests.chat.factory import MessageFactory, ThreadFactory
+from tests.users.factory import UserFactory
+
+
+class TestBatch(APITestCase):
+    """Test batch"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        self.messages = MessageFactory.create_batch(3, thread=self.thread, sender=self.participant)
+        self.url = reverse("api:batch")
+        self.messages_path = "/api/v1/chat/thread/%s/message/" % self.thread.pk
+
+    def test_url(self):
+        """Test url"""
+        self.assertEqual(self.url, "/api/v1/batch/")
+
+    def test_not_authenticated(self):
+        """Test not authenticated"""
+        response = self.client.post(self.url, {"requests": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_too_many_requests(self):
+        """Test number of sub-requests is limited"""
+        self.client.force_authenticate(user=self.user)
+        requests = [{"method": "GET", "path": "/api/v1/chat/message/user/unread/"}] * 21
+        response = self.client.post(self.url, {"requests": requests}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data.keys()), ["requests"])
+
+    def test_batch(self):
+        """Test sub-requests are executed in order with the user of the batch"""
+        self.client.force_authenticate(user=self.user)
+        requests = [
+            {"method": "GET", "path": "/api/v1/chat/message/user/unread/"},
+            {"method": "GET", "path": self.messages_path + "?cursor=&limit=2"},
+            {"method": "GET", "path": self.messages_path + "?after=%s" % self.messages[0].id},
+            {"method": "POST", "path": "/api/v1/chat/thread/%s/read/" % self.thread.pk, "body": {}},
+            {"method": "GET", "path": "/api/v1/chat/message/user/unread/"},
+            {"method": "GET", "path": "/api/v1/chat/thread/0/message/"},
+        ]
+        response = self.client.post(self.url, {"requests": requests}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        responses = response.data["responses"]
+        self.assertEqual([item["status"] for item in responses], [200, 200, 200, 200, 200, 404])
+        self.assertEqual(responses[0]["body"], {"count": 3})
+        self.assertEqual([item["id"] for item in responses[1]["body"]["results"]], [m.id for m in self.messages[:0:-1]])
+        self.assertEqual([item["id"] for item in responses[2]["body"]["results"]], [m.id for m in self.messages[1:]])
+        self.assertEqual(responses[3]["body"]["unread_count"], 0)
+        self.assertEqual(responses[4]["body"], {"count": 0})
+        self.assertFalse(response.data["committed"])
+
+    def test_committed(self):
+        """Test batch is committed when every sub-request succeeded"""
+        self.client.force_authenticate(user=self.user)
+        requests = [
+            {"method": "POST", "path": self.messages_path, "body": {"text": "first"}},
+            {"method": "GET", "path": self.messages_path},
+        ]
+        for atomic in (False, True):
+            with self.subTest(atomic=atomic):
+                response = self.client.post(self.url, {"requests": requests, "atomic": atomic}, format="json")
+                self.assertEqual([item["status"] for item in response.data["responses"]], [201, 200])
+                self.assertTrue(response.data["committed"])
+
+    def test_permissions_apply(self):
+        """Test sub-requests are authorized as the user of the batch"""
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.post(
+            self.url, {"requests": [{"method": "GET", "path": self.messages_path}]}, format="json"
+        )
+        self.assertEqual(response.data["responses"][0]["status"], status.HTTP_403_FORBIDDEN)
+
+    def test_not_batchable(self):
+        """Test endpoints outside chat, streaming endpoints and the batch itself are rejected"""
+        self.client.force_authenticate(user=self.user)
+        requests = [
+            {"method": "POST", "path": "/api/v1/batch/"},
+            {"method": "GET", "path": "/api/v1/chat/stream/"},
+            {"method": "GET", "path": "/api/v1/chat/thread/%s/export/" % self.thread.pk},
+            {"method": "GET", "path": "/api/v1/chat/unknown/"},
+        ]
+        response = self.client.post(self.url, {"requests": requests}, format="json")
+        self.assertEqual([item["status"] for item in response.data["responses"]], [400, 400, 400, 404])
+
+    def test_atomic(self):
+        """Test failed sub-request rolls back the atomic batch"""
+        self.client.force_authenticate(user=self.user)
+        requests = [
+            {"method": "POST", "path": self.messages_path, "body": {"text": "first"}},
+            {"method": "POST", "path": self.messages_path, "body": {}},
+            {"method": "POST", "path": self.messages_path, "body": {"text": "third"}},
+        ]
+        response = self.client.post(self.url, {"requests": requests, "atomic": True}, format="json")
+        self.assertEqual([item["status"] for item in response.data["responses"]], [201, 400, 424])
+        self.assertFalse(response.data["committed"])
+        self.assertFalse(Message.objects.filter(text__in=["first", "third"]).exists())
+
+    def test_not_atomic(self):
+        """Test sub-requests are committed on their own"""
+        self.client.force_authenticate(user=self.user)
+        requests = [
+            {"method": "POST", "path": self.messages_path, "body": {"text": "first"}},
+            {"method": "POST", "path": self.messages_path, "body": {}},
+            {"method": "POST", "path": self.messages_path, "body": {"text": "third"}},
+        ]
+        response = self.client.post(self.url, {"requests": requests}, format="json")
+        self.assertEqual([item["status"] for item in response.data["responses"]], [201, 400, 201])
+        self.assertFalse(response.data["committed"])
+        self.assertEqual(Message.objects.filter(text__in=["first", "third"]).count(), 2)
+
+    def test_query_budget(self):
+        """Test sub-requests stop when the batch exceeds its query budget"""
+        self.client.force_authenticate(user=self.user)
+        requests = [{"method": "GET", "path": self.messages_path + "?cursor="}] * 5
+        with mock.patch.object(BatchService, "max_queries", 8):
+            response = self.client.post(self.url, {"requests": requests}, format="json")
+        statuses = [item["status"] for item in response.data["responses"]]
+        self.assertEqual(statuses[0], status.HTTP_200_OK)
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,123 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.chat.api.serializers import MessageSerializer
+from apps.core.api.parsers import FastJSONParser
+from apps.core.api.renderers import FastJSONRenderer
+from tests.chat.factory import MessageFactory, ThreadFactory
+from tests.users.factory import UserFactory
+
+
+class TestFastJSONRenderer(SimpleTestCase):
+    """Test orjson renderer matches JSONRenderer"""
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        """Assert both renderers produce the same bytes"""
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_payload_types(self):
+        """Test types handled by the DRF encoder"""
+        self.assertSameOutput(
+            {
+                "eet": datetime.datetime(2026, 10, 18, 21, 12, 5, 120, tzinfo=ZoneInfo("EET")),
+                "utc": datetime.datetime(2026, 10, 18, 21, 12, tzinfo=datetime.timezone.utc),
+                "date": datetime.date(2026, 10, 18),
+                "duration": datetime.timedelta(minutes=5),
+                "decimal": Decimal("12.50"),
+                "decimal_small": Decimal("0.00001"),
+                "decimal_big": Decimal("12345678901234567"),
+                "uuid": uuid.uuid4(),
+                "lazy": _("Invalid cursor"),
+                "separators": "line paragraph ",
+                "unicode": "привіт 👍",
+                "int_keys": {1: "a", 2: None},
+                "float": 0.1,
+                "float_big": 1e16,
+                "float_small": [1e-7, -2.5e-300],
+                "nested": [True, False, None, (1, 2)],
+            }
+        )
+
+    def test_exponent_only(self):
+        """Test floats in exponent form alone, in a payload with null"""
+        for value in (1e16, 1e-5, 1.5e300):
+            with self.subTest(value):
+                self.assertSameOutput({"value": value, "next": None})
+
+    def test_scalars(self):
+        """Test payloads which are not containers"""
+        for value in (5, "text", 1e16, 0.5, True):
+            with self.subTest(value):
+                self.assertSameOutput(value)
+
+    def test_non_finite(self):
+        """Test NaN and infinity are rejected like JSONRenderer does"""
+        for value in (float("nan"), float("inf"), [1, {"a": float("-inf")}], Decimal("NaN")):
+            with self.subTest(value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({"value": value})
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({"value": value})
+
+    def test_indent(self):
+        """Test indented output falls back to JSONRenderer"""
+        self.assertSameOutput({"a": [1, {"b": 2}]}, "application/json; indent=4")
+
+    def test_big_integer(self):
+        """Test integers beyond 64 bits fall back to JSONRenderer"""
+        self.assertSameOutput({"id": 2**70})
+
+    def test_none(self):
+        """Test empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+class TestFastJSONRendererMessages(TestCase):
+    """Test orjson renderer on message pages"""
+
+    def test_messages(self):
+        """Test serialized messages"""
+        thread = ThreadFactory.create()
+        MessageFactory.create_batch(5, thread=thread, text="hi   👍")
+        data = {"results": MessageSerializer(thread.messages.all(), many=True).data}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_api(self):
+        """Test API responses are rendered by the fast renderer"""
+        user = UserFactory()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get(reverse("api:chat_app:inbox"))
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+
+class TestFastJSONParser(SimpleTestCase):
+    """Test orjson parser matches JSONParser"""
+
+    def test_parse(self):
+        """Test parsed data"""
+        content = '{"text":"привіт \\u2028","ids":[1,2,3],"nested":{"a":null,"b":1.5,"c":true}}'.encode()
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(content)), JSONParser().parse(io.BytesIO(content))
+        )
+
+    def test_invalid(self):
+        """Test parse error"""
+        for content in (b"{", b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(content))
@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tests.chat.factory import MessageFactory, ThreadFactory
+from tests.users.factory import UserFactory
+
+
+def get_api_views(patterns=None, namespace=""):
+    """Map namespaced URL names of the API to view functions"""
+    views = {}
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = "%s%s:" % (namespace, pattern.namespace) if pattern.namespace else namespace
+            views.update(get_api_views(pattern.url_patterns, prefix))
+        elif isinstance(pattern, URLPattern) and pattern.name and namespace.startswith("api:"):
+            views[namespace + pattern.name] = pattern.callback
+    return views
+
+
+class TestTransactionPolicy(TestCase):
+    """
+    Test transaction policy of API endpoints under `ATOMIC_REQUESTS`
+
+    Reads run in autocommit, writes are atomic in the service layer. Endpoints that
+    write outside of an atomic service keep the request transaction.
+    """
+
+    autocommit = {
+        "api:batch",
+        "api:chat_app:thread_user",
+        "api:chat_app:inbox",
+        "api:chat_app:message",
+        "api:chat_app:thread_export",
+        "api:chat_app:message_user",
+        "api:chat_app:search",
+        "api:chat_app:stream",
+    }
+    atomic = {
+        "api:users_app:login",
+        "api:users_app:refresh",
+        "api:chat_app:thread",
+        "api:chat_app:thread_detail",
+        "api:chat_app:broadcast",
+        "api:chat_app:thread_read",
+        "api:chat_app:message_read",
+    }
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.participant = UserFactory()
+        self.thread = ThreadFactory.create(participants=[self.user, self.participant])
+        MessageFactory.create_batch(3, thread=self.thread, sender=self.participant)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_policy(self):
+        """Test every endpoint has a policy and its view follows it"""
+        views = get_api_views()
+        self.assertFalse(set(views) - self.autocommit - self.atomic, "Endpoint without transaction policy")
+        for name, view in views.items():
+            with self.subTest(name):
+                non_atomic = DEFAULT_DB_ALIAS in getattr(view, "_non_atomic_requests", set())
+                self.assertEqual(non_atomic, name in self.autocommit)
+
+    def count_savepoints(self, method, url, data=None):
+        """Count transactions opened by request inside the test transaction"""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, status.HTTP_400_BAD_REQUEST)
+        return sum(query["sql"].startswith("SAVEPOINT") for query in queries)
+
+    def test_reads_in_autocommit(self):
+        """Test reads open no transaction with ATOMIC_REQUESTS"""
+        urls = [
+            reverse("api:chat_app:inbox"),
+            reverse("api:chat_app:thread_user", kwargs={"user_id": self.user.id}),
+            reverse("api:chat_app:message", kwargs={"pk": self.thread.id}),
+            reverse("api:chat_app:message_user"),
+        ]
+        with mock.patch.dict(connections.settings[DEFAULT_DB_ALIAS], ATOMIC_REQUESTS=True):
+            for url in urls:
+                with self.subTest(url):
+                    self.assertEqual(self.count_savepoints("get", url), 0)
+
+    def test_writes_atomic(self):
+        """Test writes are atomic in the service layer and atomic views keep the request transaction"""
+        message_url = reverse("api:chat_app:message", kwargs={"pk": self.thread.id})
+        read_url = reverse("api:chat_app:thread_read", kwargs={"pk": self.thread.id})
+        self.assertEqual(self.count_savepoints("post", message_url, {"text": "hi"}), 1)
+        self.assertEqual(self.count_savepoints("post", read_url), 1)
+        with mock.patch.dict(connections.settings[DEFAULT_DB_ALIAS], ATOMIC_REQUESTS=True):
+            self.assertEqual(self.count_savepoints("post", message_url, {"text": "hi"}), 1)
+            self.assertEqual(self.count_savepoints("post", read_url), 2)
@@ -0,0 +1,133 @@
+from unittest import mock
+
+from django.db import DatabaseError, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.chat.models import Message
+from apps.core.db.routers import ReplicaRouter, use_replica
+from tests.chat.factory import ThreadFactory
+from tests.users.factory import UserFactory
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], DATABASE_REPLICA_MAX_LAG=2.0)
+class TestReplicaRouter(TestCase):
+    """Test replica router"""
+
+    databases = {"default", "replica"}
+
+    def setUp(self) -> None:
+        """Set up"""
+        ReplicaRouter.lag_cache.clear()
+        self.addCleanup(ReplicaRouter.lag_cache.clear)
+        self.router = ReplicaRouter()
+
+    def test_primary_by_default(self):
+        """Test reads outside `use_replica()` are not routed"""
+        self.assertIsNone(self.router.db_for_read(Message))
+        self.assertEqual(self.router.db_for_write(Message), "default")
+
+    def test_replica(self):
+        """Test reads inside `use_replica()` go to its replica, writes to the primary"""
+        with use_replica(ReplicaRouter.choose_replica()):
+            self.assertEqual(self.router.db_for_read(Message), "replica")
+            self.assertEqual(self.router.db_for_write(Message), "default")
+            with use_replica(None):
+                self.assertIsNone(self.router.db_for_read(Message))
+        self.assertIsNone(self.router.db_for_read(Message))
+
+    @override_settings(DATABASE_REPLICAS=["replica", "default"])
+    def test_one_replica_per_context(self):
+        """Test every read of a context goes to the replica chosen once"""
+        with mock.patch("apps.core.db.routers.random.choice", side_effect=lambda replicas: replicas[0]) as choice:
+            with use_replica(ReplicaRouter.choose_replica()):
+                self.assertEqual({self.router.db_for_read(Message) for _ in range(10)}, {"replica"})
+        choice.assert_called_once_with(["replica", "default"])
+
+    def test_lagging_replica(self):
+        """Test lagging replica falls back to the primary, lag is checked once per interval"""
+        with mock.patch.object(ReplicaRouter, "check_lag", return_value=30.0) as check_lag:
+            self.assertIsNone(ReplicaRouter.choose_replica())
+            self.assertIsNone(ReplicaRouter.choose_replica())
+        check_lag.assert_called_once_with("replica")
+
+    def test_unavailable_replica(self):
+        """Test unavailable replica falls back to the primary"""
+        with mock.patch.object(ReplicaRouter, "check_lag", side_effect=DatabaseError):
+            self.assertIsNone(ReplicaRouter.choose_replica())
+
+    def test_check_lag(self):
+        """Test replicas without lag reporting have no lag"""
+        self.assertEqual(ReplicaRouter.check_lag("replica"), 0.0)
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica"],
+    DATABASE_REPLICA_PIN_SECONDS=5,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class TestReplicaRoutingMiddleware(TransactionTestCase):
+    """
+    Test safe requests read from replicas until the client writes
+
+    The replica is a second connection to the test database, data must be committed to be seen by it.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self) -> None:
+        """Set up"""
+        ReplicaRouter.lag_cache.clear()
+        self.addCleanup(ReplicaRouter.lag_cache.clear)
+        self.user, self.other = UserFactory.create_batch(2)
+        self.thread = ThreadFactory.create(participants=[self.user, self.other])
+        self.client.defaults["HTTP_AUTHORIZATION"] = "Bearer %s" % AccessToken.for_user(self.user)
+        self.url = reverse("api:chat_app:message", kwargs={"pk": self.thread.pk})
+
+    def get(self):
+        """List messages, return response and queries sent to the replica"""
+        with CaptureQueriesContext(connections["replica"]) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, queries
+
+    def test_read_your_writes(self):
+        """Test client reads from the primary after it writes"""
+        _, queries = self.get()
+        self.assertTrue(queries)
+
+        with CaptureQueriesContext(connections["replica"]) as queries:
+            response = self.client.post(self.url, {"text": "hello"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(queries)
+
+        response, queries = self.get()
+        self.assertFalse(queries)
+        self.assertEqual(response.json()["results"][0]["text"], "hello")
+
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=10**10):
+            _, queries = self.get()
+        self.assertTrue(queries)
+
+    def test_other_client(self):
+        """Test pin is kept per client"""
+        self.client.post(self.url, {"text": "hello"})
+        self.client.defaults["HTTP_AUTHORIZATION"] = "Bearer %s" % AccessToken.for_user(self.other)
+        _, queries = self.get()
+        self.assertTrue(queries)
+
+    def test_failed_write(self):
+        """Test rejected write does not pin the client"""
+        response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        _, queries = self.get()
+        self.assertTrue(queries)
+
+    def test_lagging_replica(self):
+        """Test reads fall back to the primary on replica lag"""
+        with mock.patch.object(ReplicaRouter, "check_lag", return_value=30.0):
+            _, queries = self.get()
+        self.assertFalse(queries)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.test import Client, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tests.users.factory import UserFactory
+
+
+class TestAPIExemptMiddleware(TestCase):
+    """Test browser middleware is skipped for the API and kept for the admin"""
+
+    def test_api(self):
+        """Test API responses carry no session, CSRF or locale headers"""
+        user = UserFactory()
+        response = self.client.get(
+            reverse("api:chat_app:inbox"), HTTP_AUTHORIZATION="Bearer %s" % AccessToken.for_user(user)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertNotIn("Content-Language", response)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertNotIn("Accept-Language", response.get("Vary", ""))
+        self.assertFalse(response.cookies)
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+
+    def test_browsable_api_not_framed(self):
+        """Test HTML pages of the browsable API cannot be framed"""
+        user = UserFactory()
+        response = self.client.get(
+            reverse("api:chat_app:inbox"),
+            HTTP_AUTHORIZATION="Bearer %s" % AccessToken.for_user(user),
+            HTTP_ACCEPT="text/html",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/html"))
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+
+    def test_api_post_without_csrf_token(self):
+        """Test API writes authenticated by JWT need no CSRF token"""
+        user = UserFactory()
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(
+            reverse("api:chat_app:thread"),
+            {"participant": UserFactory().id},
+            HTTP_AUTHORIZATION="Bearer %s" % AccessToken.for_user(user),
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_admin(self):
+        """Test admin keeps sessions, CSRF, locale and frame options"""
+        url = "/%slogin/" % settings.ADMIN_URL
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertIn("Content-Language", response)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(url, {"username": "admin", "password": "admin"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
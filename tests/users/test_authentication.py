@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.authentication import CachedJWTAuthentication
+from tests.users.factory import UserFactory
+
+
+class TestCachedJWTAuthentication(TestCase):
+    """Test cached JWT authentication"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.user = UserFactory()
+        self.token = str(AccessToken.for_user(self.user))
+        self.authentication = CachedJWTAuthentication()
+
+    def authenticate(self, token=None):
+        """Authenticate request with bearer token"""
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION="Bearer %s" % (token or self.token))
+        return self.authentication.authenticate(request)
+
+    def test_authenticate(self):
+        """Test user is loaded once"""
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        with self.assertNumQueries(0):
+            cached, validated_token = self.authenticate()
+        self.assertEqual(cached, user)
+        self.assertIsNot(cached, user)
+        self.assertEqual(cached.username, self.user.username)
+        self.assertEqual(validated_token["user_id"], self.user.pk)
+
+    def test_invalid_token(self):
+        """Test invalid token"""
+        with self.assertRaises(InvalidToken):
+            self.authenticate("invalid")
+
+    def test_expired_token(self):
+        """Test memoized token is verified again after it expires"""
+        self.authenticate()
+        with mock.patch("apps.users.authentication.time.time", return_value=AccessToken(self.token)["exp"] + 1):
+            with mock.patch.object(
+                JWTAuthentication, "get_validated_token", side_effect=InvalidToken()
+            ) as get_validated_token:
+                with self.assertRaises(InvalidToken):
+                    self.authenticate()
+        get_validated_token.assert_called_once()
+
+    def test_deactivated_user(self):
+        """Test deactivation drops cached user"""
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_user(self):
+        """Test deleted user"""
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_api_without_user_query(self):
+        """Test authenticated request runs its own queries only"""
+        url = reverse("api:chat_app:message_user")
+        self.client.get(url, HTTP_AUTHORIZATION="Bearer %s" % self.token)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_AUTHORIZATION="Bearer %s" % self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TestSharedUserCache(TestCase):
+    """Test users in the shared cache"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        cache.clear()
+        self.user = UserFactory()
+        self.token = str(AccessToken.for_user(self.user))
+        self.authentication = CachedJWTAuthentication()
+
+    def authenticate(self):
+        """Authenticate request with bearer token"""
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION="Bearer %s" % self.token)
+        return self.authentication.authenticate(request)
+
+    def test_no_password_hash(self):
+        """Test only primary key, active flag and password digest are cached"""
+        self.authenticate()
+        version = cache.get(CachedJWTAuthentication.version_key_prefix % self.user.pk, 0)
+        values = cache.get(CachedJWTAuthentication.key_prefix % (self.user.pk, version))
+        self.assertEqual(len(values), 3)
+        self.assertEqual(values[:2], (self.user.pk, True))
+        self.assertNotIn(self.user.password, values)
+
+    def test_fill_race(self):
+        """Test row loaded before the user changed is not served after the change"""
+        load = CachedJWTAuthentication._get_user_values
+
+        def load_then_deactivate(user_id):
+            values = load(user_id)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.is_active = False
+                self.user.save()
+            return values
+
+        with mock.patch.object(CachedJWTAuthentication, "_get_user_values", side_effect=load_then_deactivate):
+            self.authenticate()
+        # Another process, without the local entry
+        CachedJWTAuthentication.user_cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()